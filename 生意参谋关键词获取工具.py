@@ -19,16 +19,1490 @@ from typing import Optional
 import math
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 import warnings
+import sys
+import json
+import base64
+import random
+import argparse
+import hashlib
+import queue
+import csv
+import tempfile
+import sqlite3
+import gzip
+import functools
+from array import array
+import multiprocessing
+from collections import deque
+from itertools import compress
+from html.parser import HTMLParser
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import urllib3
 
 # 抑制libpng警告
 warnings.filterwarnings("ignore", category=UserWarning, message="libpng warning: iCCP: known incorrect sRGB profile")
 
+# 生意参谋站点与搜索词排行接口（验证码iframe中出现的同一接口）
+SYCM_BASE_URL = "https://sycm.taobao.com"
+RANK_API_PATH = "/mc/mq/mkt/keyword/rank.json"
+CATEGORY_TREE_TTL_HOURS = 24
+# 根类目汇总表的表头
+KEYWORD_SHEET_HEADER = ["搜索词", "搜索人气"]
+DERIVED_SHEET_HEADER = ["相关关键词", "搜索人数", "支付转化率", "支付人数", "需求供给比", "天猫商品点击占比"]
+# 采集成本历史：每个类目路径参与预测的最近记录数，以及没有任何历史时的默认任务耗时（秒）
+COST_HISTORY_KEEP = 7
+DEFAULT_TASK_SECONDS = 60
+# 断点日志保留的统计日期数
+JOURNAL_KEEP_DAYS = 7
+RANK_API_DEFAULT_PARAMS = {
+    "dateType": "day",
+    "pageSize": 50,
+    "order": "desc",
+    "orderBy": "seIpvUvHits",
+    "device": 0,
+    "seller": -1,
+    "indexCode": "seIpvUvHits",
+}
+
+# 数据提取引擎：dom=解析页面表格（原有方式），rankjson=页面内直接调用rank.json接口
+EXTRACT_ENGINES = {
+    "dom": "页面解析",
+    "rankjson": "接口直取",
+    "cdp": "网络捕获",
+}
+
+# 结果输出格式：excel=通过Excel程序逐格写入（原有方式，会打开表格窗口），其余均不依赖图形界面，直接写文件
+OUTPUT_FORMATS = {
+    "excel": "Excel程序",
+    "xlsx": "xlsx文件",
+    "csv": "CSV",
+    "jsonl": "JSONL",
+    "sqlite": "SQLite",
+    "capture": "原始页面存档",
+}
+
+# 在已登录页面内批量请求rank.json，一次往返取回多页数据
+RANK_FETCH_JS = """
+var done = arguments[arguments.length - 1];
+var apiUrl = arguments[0];
+var baseParams = arguments[1];
+var pages = arguments[2];
+var minThreshold = arguments[3];
+var stopOnLow = arguments[4];
+var includeRaw = arguments[5];
+
+// 与表格提取一致的"万"/"亿"值转换（与Python端parse_popularity_text相同）
+function convertWanValue(valueText) {
+    valueText = String(valueText).replace(/\\s+/g, '').replace(/,/g, '');
+    var unit = valueText.includes('亿') ? '亿' : (valueText.includes('万') ? '万' : '');
+    var num = parseFloat(unit ? valueText.replace(unit, '') : valueText);
+    if (isNaN(num)) {
+        return null;
+    }
+    return unit === '亿' ? num * 100000000 : (unit === '万' ? num * 10000 : num);
+}
+
+function parsePopularity(raw) {
+    if (raw && typeof raw === 'object') {
+        raw = raw.value !== undefined ? raw.value : raw.text;
+    }
+    if (typeof raw === 'number') {
+        return {value: raw, text: String(raw)};
+    }
+    var text = String(raw === undefined || raw === null ? '' : raw).trim();
+    var rangeText = text.replace(/～/g, '~');
+    if (rangeText.includes('~')) {
+        var parts = rangeText.split('~').map(p => convertWanValue(p.trim()));
+        if (parts[0] === null || parts[1] === null) {
+            return null;
+        }
+        return {value: Math.min(parts[0], parts[1]), text: text};
+    }
+    var value = convertWanValue(text);
+    return value === null ? null : {value: value, text: text};
+}
+
+// 兼容不同的返回结构：{data: {data: [...]}} / {data: [...]} / {content: {data: [...]}}
+function pickRecords(json) {
+    var holders = [json && json.data, json && json.content, json];
+    for (var i = 0; i < holders.length; i++) {
+        var holder = holders[i];
+        if (!holder) {
+            continue;
+        }
+        if (Array.isArray(holder)) {
+            return {records: holder, total: null};
+        }
+        if (Array.isArray(holder.data)) {
+            return {records: holder.data, total: holder.recordCount || holder.total || null};
+        }
+    }
+    return null;
+}
+
+function pickKeyword(record) {
+    var raw = record.searchWord || record.keyword || record.word || '';
+    if (raw && typeof raw === 'object') {
+        raw = raw.value || '';
+    }
+    return String(raw).trim();
+}
+
+async function run() {
+    var pageQuery = new URLSearchParams(location.search);
+    var result = {pages: [], total: null, error: null, captcha: false};
+    for (var p = 0; p < pages.length; p++) {
+        var page = pages[p];
+        var query = new URLSearchParams();
+        ['dateRange', 'dateType', 'cateId', 'device', 'seller'].forEach(function (key) {
+            if (pageQuery.get(key)) {
+                query.set(key, pageQuery.get(key));
+            }
+        });
+        Object.keys(baseParams).forEach(function (key) {
+            if (!query.has(key) || key === 'cateId') {
+                query.set(key, baseParams[key]);
+            }
+        });
+        query.set('page', page);
+        query.set('_', Date.now());
+
+        var resp = await fetch(apiUrl + '?' + query.toString(), {
+            credentials: 'include',
+            headers: {'Accept': 'application/json'}
+        });
+        if (resp.url && resp.url.indexOf('action=captcha') !== -1) {
+            result.captcha = true;
+            result.error = '接口返回验证码';
+            break;
+        }
+        if (!resp.ok) {
+            result.error = 'HTTP ' + resp.status;
+            break;
+        }
+        var text = await resp.text();
+        var json = JSON.parse(text);
+        if (json && (json.rgv587_flag || (json.url && String(json.url).indexOf('captcha') !== -1))) {
+            result.captcha = true;
+            result.error = '接口返回验证码';
+            break;
+        }
+        var picked = pickRecords(json);
+        if (!picked) {
+            result.error = '接口返回结构无法识别';
+            break;
+        }
+        if (picked.total !== null) {
+            result.total = picked.total;
+        }
+
+        var rows = [];
+        var foundLowValue = false;
+        picked.records.forEach(function (record) {
+            var keyword = pickKeyword(record);
+            var popularity = parsePopularity(
+                record.seIpvUvHits !== undefined ? record.seIpvUvHits : record.searchPopularity
+            );
+            if (!keyword || !popularity) {
+                return;
+            }
+            if (popularity.value < minThreshold) {
+                foundLowValue = true;
+            }
+            rows.push({
+                keyword: keyword,
+                search_popularity: popularity.value,
+                popularity_text: popularity.text
+            });
+        });
+        var entry = {page: page, rows: rows, foundLowValue: foundLowValue};
+        if (includeRaw) {
+            entry.raw = text;
+        }
+        result.pages.push(entry);
+
+        if (rows.length === 0 || (stopOnLow && foundLowValue)) {
+            break;
+        }
+        if (result.total !== null && page * (baseParams.pageSize || 50) >= result.total) {
+            break;
+        }
+    }
+    return result;
+}
+
+run().then(done, function (e) {
+    done({pages: [], total: null, error: String(e), captcha: false});
+});
+"""
+
+# 页面辅助函数库：每个文档加载时注入一次到window.__sycm，之后按名称调用只需传递少量参数
+SYCM_HELPERS_VERSION = "6"
+SYCM_HELPERS_JS = """
+(function () {
+    if (window.__sycm && window.__sycm.version === 'SYCM_HELPERS_VERSION') {
+        return;
+    }
+    window.__sycm = {
+        version: 'SYCM_HELPERS_VERSION',
+
+        snapshot: function (minThreshold, timeoutMs, debug, done) {
+            var started = Date.now();
+
+            function extractRows() {
+                var results = [];
+                var foundLowValue = false;
+                var debugLogs = []; // 用于调试的日志数组
+
+                // 转换包含"万"/"亿"的数值为实际数字
+                function convertWanValue(valueText) {
+                    // 移除所有空格与千位分隔符 - 使用双重转义避免Python解释器警告
+                    valueText = valueText.replace(/\\s+/g, '').replace(/,/g, '');
+
+                    // 检查是否包含"亿"或"万"
+                    var unit = valueText.includes('亿') ? '亿' : (valueText.includes('万') ? '万' : '');
+                    if (unit) {
+                        // 提取数字部分
+                        var numPart = valueText.replace(unit, '');
+                        // 尝试转换为浮点数
+                        var num = parseFloat(numPart);
+                        // 有效数字则乘以对应单位
+                        if (!isNaN(num)) {
+                            return num * (unit === '亿' ? 100000000 : 10000);
+                        }
+                    } else {
+                        // 普通数字，直接转换
+                        var num = parseFloat(valueText);
+                        if (!isNaN(num)) {
+                            return num;
+                        }
+                    }
+                    return null; // 无法转换
+                }
+
+                // 遍历所有符合条件的行
+                for (var i = 1; i <= 50; i++) {
+                    var rowSelector = 'tr.ant-table-row.oui-table-row-tree-node-' + i + '.ant-table-row-level-0';
+                    var row = document.querySelector(rowSelector);
+
+                    if (!row) {
+                        continue;
+                    }
+
+                    try {
+                        // 提取关键词和搜索人气
+                        var tds = row.querySelectorAll('td');
+                        if (tds.length < 3) {
+                            continue;
+                        }
+
+                        // 关键词在第二个td
+                        var keyword = tds[1].textContent.trim();
+
+                        // 搜索人气在第三个td
+                        var popularityElement = tds[2].querySelector('.alife-dt-card-common-table-sortable-value span');
+                        if (!popularityElement) {
+                            debug && debugLogs.push(`未找到搜索人气元素: 关键词=${keyword}`);
+                            continue;
+                        }
+
+                        var popularityText = popularityElement.textContent.trim();
+                        var popularityValue = 0;
+                        var parsingSuccess = true;
+
+                        // 处理范围值，如"1万 ~ 2万"，取最小值
+                        var rangeText = popularityText.replace(/～/g, '~');
+                        if (rangeText.includes('~')) {
+                            var parts = rangeText.split('~').map(p => p.trim());
+
+                            // 转换两边的值
+                            var value1 = convertWanValue(parts[0]);
+                            var value2 = convertWanValue(parts[1]);
+
+                            // 确保两边都是有效数字
+                            if (value1 !== null && value2 !== null) {
+                                popularityValue = Math.min(value1, value2);
+                            } else {
+                                parsingSuccess = false;
+                                debug && debugLogs.push(`范围值解析失败: "${popularityText}" 部分值无法转换`);
+                            }
+                        }
+                        // 处理单个带"万"/"亿"的值，如"1.5万"
+                        else if (/[万亿]/.test(popularityText)) {
+                            var value = convertWanValue(popularityText);
+                            if (value !== null) {
+                                popularityValue = value;
+                            } else {
+                                parsingSuccess = false;
+                                debug && debugLogs.push(`单值解析失败: "${popularityText}" 无法转换`);
+                            }
+                        }
+                        // 处理普通数字值
+                        else {
+                            var num = parseFloat(popularityText.replace(/,/g, ''));
+                            if (!isNaN(num)) {
+                                popularityValue = num;
+                            } else {
+                                parsingSuccess = false;
+                                debug && debugLogs.push(`数字解析失败: "${popularityText}" 不是有效数字`);
+                            }
+                        }
+
+                        // 调试日志：记录原始文本和解析结果
+                        debug && debugLogs.push(`关键词: ${keyword}, 原始值: "${popularityText}", 解析值: ${popularityValue}, 解析成功: ${parsingSuccess}`);
+
+                        // 只有解析成功的情况下才判断是否为低价值
+                        if (parsingSuccess) {
+                            // 严格判断：只有确实小于阈值才标记
+                            if (popularityValue < minThreshold) {
+                                foundLowValue = true;
+                                debug && debugLogs.push(`>>> 发现低价值数据: ${keyword} (${popularityValue} < ${minThreshold})`);
+                            }
+
+                            results.push({
+                                keyword: keyword,
+                                search_popularity: popularityValue,
+                                popularity_text: popularityText
+                            });
+                        }
+                    } catch (e) {
+                        debug && debugLogs.push(`提取第${i}行数据失败: ${e.message}`);
+                    }
+                }
+
+                return {data: results, foundLowValue: foundLowValue, debugLogs: debugLogs};
+            }
+
+            function pagination() {
+                var active = document.querySelector('li.ant-pagination-item.ant-pagination-item-active');
+                var maxPage = null;
+                document.querySelectorAll('li.ant-pagination-item').forEach(function (item) {
+                    var num = parseInt(item.textContent.trim(), 10);
+                    if (!isNaN(num) && (maxPage === null || num > maxPage)) {
+                        maxPage = num;
+                    }
+                });
+                var next = document.querySelector('li.ant-pagination-next');
+                return {
+                    activePage: active ? parseInt(active.textContent.trim(), 10) || null : null,
+                    maxPage: maxPage,
+                    nextEnabled: !!next && next.className.indexOf('ant-pagination-disabled') === -1
+                };
+            }
+
+            function loading() {
+                return !!document.querySelector('.ant-table-wrapper .ant-spin-spinning');
+            }
+
+            function build(ready) {
+                var result = ready ? extractRows() : {data: [], foundLowValue: false, debugLogs: ['表格加载超时']};
+                var pager = pagination();
+                var captcha = window.__sycmCaptcha;
+                result.ready = ready;
+                result.activePage = pager.activePage;
+                result.maxPage = pager.maxPage;
+                result.nextEnabled = pager.nextEnabled;
+                result.captcha = captcha && captcha.present ? captcha.src : null;
+                result.elapsed = Date.now() - started;
+                return result;
+            }
+
+            // 表格仍在加载时在页面内等待加载结束；没有加载状态时直接读取（无数据行即判定为空）
+            if (!loading()) {
+                done(build(true));
+            } else {
+                var observer = new MutationObserver(function () {
+                    if (!loading()) {
+                        observer.disconnect();
+                        clearTimeout(timer);
+                        done(build(true));
+                    }
+                });
+                var timer = setTimeout(function () {
+                    observer.disconnect();
+                    done(build(false));
+                }, timeoutMs);
+                observer.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['class']});
+            }
+        },
+
+        captureTable: function (minThreshold, timeoutMs, debug, done) {
+            // 存档模式：等待方式与snapshot一致，但只回传表格HTML，行数据留给离线解析
+            window.__sycm.snapshot(minThreshold, timeoutMs, debug, function (result) {
+                var row = document.querySelector('tr.ant-table-row.ant-table-row-level-0');
+                var table = row ? row.closest('table') : null;
+                result.html = table && result.data.length ? table.outerHTML : '';
+                result.data = [];
+                done(result);
+            });
+        },
+
+        tableChange: function (target, expectedPage, timeoutMs, done) {
+            function fingerprint() {
+                var rows = document.querySelectorAll('tr.ant-table-row.ant-table-row-level-0');
+                var active = document.querySelector('li.ant-pagination-item.ant-pagination-item-active');
+                function keyword(row) {
+                    var tds = row.querySelectorAll('td');
+                    return (tds.length > 1 ? tds[1].textContent : row.textContent).trim();
+                }
+                var fp = {
+                    rows: rows.length,
+                    first: rows.length ? keyword(rows[0]) : '',
+                    last: rows.length ? keyword(rows[rows.length - 1]) : '',
+                    active: active ? active.textContent.trim() : '',
+                    loading: !!document.querySelector('.ant-table-wrapper .ant-spin-spinning')
+                };
+                fp.key = fp.first + '|' + fp.last + '|' + fp.active;
+                return fp;
+            }
+
+            var before = fingerprint();
+            var started = Date.now();
+            var finished = false;
+            var timer = null;
+
+            function settled(fp) {
+                // 页码高亮会先于数据切换，必须等首尾关键词也变化才算新页渲染完成
+                return fp.rows > 0 && !fp.loading
+                    && (fp.first !== before.first || fp.last !== before.last)
+                    && (!expectedPage || fp.active === String(expectedPage));
+            }
+
+            var observer = new MutationObserver(check);
+
+            function finish(changed) {
+                if (finished) {
+                    return;
+                }
+                finished = true;
+                observer.disconnect();
+                clearTimeout(timer);
+                done({changed: changed, before: before.key, after: fingerprint().key, elapsed: Date.now() - started});
+            }
+
+            function check() {
+                if (settled(fingerprint())) {
+                    finish(true);
+                }
+            }
+
+            observer.observe(document.body, {childList: true, subtree: true, characterData: true,
+                                             attributes: true, attributeFilter: ['class']});
+            timer = setTimeout(function () { finish(false); }, timeoutMs);
+            if (target) {
+                try {
+                    target.click();
+                } catch (e) {
+                    target.dispatchEvent(new MouseEvent('click', {bubbles: true, cancelable: true, view: window}));
+                }
+            }
+            check();
+        },
+
+        categoryIds: function (item, fallbackParent) {
+            // 读取类目节点的cateId/parentCateId：优先data属性，其次React组件props
+            function numeric(value) {
+                return value !== undefined && value !== null && /^\d+$/.test(String(value)) ? String(value) : null;
+            }
+            var ds = item.dataset || {};
+            var cateId = numeric(ds.cateId || ds.cateid || ds.id || ds.value);
+            var parentId = numeric(ds.parentCateId || ds.parentId || ds.pid);
+            if (!cateId) {
+                var fiber = null;
+                Object.keys(item).some(function (key) {
+                    if (key.indexOf('__reactFiber$') === 0 || key.indexOf('__reactInternalInstance$') === 0) {
+                        fiber = item[key];
+                        return true;
+                    }
+                    return false;
+                });
+                for (var depth = 0; fiber && depth < 8 && !cateId; depth++, fiber = fiber.return) {
+                    var props = fiber.memoizedProps || {};
+                    var candidates = [props.data, props.item, props.node, props.record, props.dataRef, props];
+                    for (var c = 0; c < candidates.length; c++) {
+                        var cand = candidates[c];
+                        if (cand && typeof cand === 'object' && numeric(cand.cateId || cand.id || cand.value)) {
+                            cateId = numeric(cand.cateId || cand.id || cand.value);
+                            parentId = numeric(cand.parentCateId || cand.parentId || cand.pid);
+                            break;
+                        }
+                    }
+                }
+            }
+            return {cateId: cateId, parentCateId: parentId || fallbackParent};
+        },
+
+        describeItem: function (item, level, urlParent) {
+            // 获取类目名称（优先使用title属性，无则用文本内容）
+            var name = item.getAttribute('title') || item.textContent.trim();
+            if (!name) {
+                return null;
+            }
+            var hasChildren = false;
+
+            // 针对二级类目，检查是否有三级类目图标
+            if (level === 2) {
+                var icon = item.querySelector(
+                    'i.anticon.anticon-angle-right.oui-canary-icon.oui-canary-icon-angle-right.sub-tree-icon.sub-common-icon'
+                );
+                hasChildren = !!icon; // 存在图标则表示有子类目
+            }
+
+            var ids = this.categoryIds(item, urlParent);
+            return {
+                name: name,
+                has_children: hasChildren,
+                cate_id: ids.cateId,
+                parent_cate_id: ids.parentCateId
+            };
+        },
+
+        enumerateLevel: function (level, options, done) {
+            // 分步滚动类目列表并累积条目，直到名称集合不再增长；虚拟列表/懒加载列表也能取全
+            var self = this;
+            var container = document.querySelector('ul.tree-menu.common-menu.tree-scroll-menu-level-' + level);
+            if (!container) {
+                done({status: 'error', message: '未找到第' + level + '级类目容器'});
+                return;
+            }
+            var quietMs = options.quietMs || 80;
+            var settleMs = options.settleMs || 300;
+            var started = Date.now();
+            // 节点自身没有父级ID时，以当前页面URL中的cateId（即已选中的上级类目）为父级
+            var urlParent = level > 1 ? new URLSearchParams(location.search).get('cateId') : null;
+            var seen = {};
+            var results = [];
+            var steps = 0;
+            var originalScrollTop = container.scrollTop;
+
+            function collect() {
+                var items = container.querySelectorAll('li.tree-item.common-item');
+                for (var i = 0; i < items.length; i++) {
+                    var entry = self.describeItem(items[i], level, urlParent);
+                    if (entry && !seen[entry.name]) {
+                        seen[entry.name] = true;
+                        entry.index = results.length + 1;  // 索引按列表中的先后顺序从1开始
+                        results.push(entry);
+                    }
+                }
+            }
+
+            function loading() {
+                return !!container.querySelector('.ant-spin-spinning, .tree-loading');
+            }
+
+            // 等待列表安静：出现DOM变化后quietMs内无新变化即回调；maxMs内始终无变化也回调
+            function waitQuiet(maxMs, callback) {
+                var changed = false;
+                var quietTimer = null;
+                var maxTimer = null;
+                var observer = new MutationObserver(function () {
+                    changed = true;
+                    clearTimeout(quietTimer);
+                    quietTimer = setTimeout(finishWait, quietMs);
+                });
+                function finishWait() {
+                    observer.disconnect();
+                    clearTimeout(quietTimer);
+                    clearTimeout(maxTimer);
+                    callback(changed);
+                }
+                maxTimer = setTimeout(finishWait, maxMs);
+                observer.observe(container, {childList: true, subtree: true, characterData: true});
+            }
+
+            function nextScrollTop() {
+                // 已渲染条目一直延伸到列表底部（非虚拟列表）时直接滚到底，否则按视口高度分步滚动
+                var items = container.querySelectorAll('li.tree-item.common-item');
+                if (items.length) {
+                    var last = items[items.length - 1].getBoundingClientRect();
+                    var top = container.getBoundingClientRect().top;
+                    if (last.bottom - top + container.scrollTop >= container.scrollHeight - 2) {
+                        return container.scrollHeight;
+                    }
+                }
+                return container.scrollTop + Math.max(1, Math.floor(container.clientHeight * 0.8));
+            }
+
+            function finish(complete) {
+                container.scrollTop = originalScrollTop;
+                done({status: 'success', data: results, complete: complete, steps: steps,
+                      elapsed: Date.now() - started});
+            }
+
+            function step() {
+                collect();
+                if (Date.now() - started > options.timeoutMs) {
+                    finish(false);
+                    return;
+                }
+                var atBottom = container.scrollTop + container.clientHeight >= container.scrollHeight - 1;
+                if (atBottom && container.scrollHeight <= container.clientHeight + 1 && !loading()) {
+                    // 列表无需滚动，已全部渲染
+                    finish(true);
+                    return;
+                }
+                if (atBottom) {
+                    // 到底后再等一会儿：懒加载追加了条目则继续滚动，否则列表已稳定
+                    var before = results.length;
+                    waitQuiet(settleMs, function (changed) {
+                        collect();
+                        if ((changed && results.length > before) || loading()) {
+                            steps++;
+                            step();
+                        } else {
+                            finish(true);
+                        }
+                    });
+                    return;
+                }
+                steps++;
+                container.scrollTop = nextScrollTop();
+                waitQuiet(quietMs, function () {
+                    step();
+                });
+            }
+
+            container.scrollTop = 0;
+            step();
+        },
+
+        expandCategory: function (sel, targetIndex, targetName, childLevel) {
+            // 先给下一级列表的现有条目打上过期标记，点击后等待出现未标记的新条目即表示子类目已渲染
+            var stale = document.querySelectorAll('ul.tree-scroll-menu-level-' + childLevel + ' li.tree-item');
+            for (var i = 0; i < stale.length; i++) {
+                stale[i].setAttribute('data-sycm-stale', '1');
+            }
+            return this.clickCategory(sel, targetIndex, targetName);
+        },
+
+        clickCategory: function (sel, targetIndex, targetName) {
+            var items = document.querySelectorAll(sel);
+            if (!items || items.length === 0) {
+                return '未找到类目列表元素';
+            }
+            function nameOf(item) {
+                return (item.getAttribute('title') || item.textContent || '').trim();
+            }
+
+            var target = targetIndex >= 1 && targetIndex <= items.length ? items[targetIndex - 1] : null;
+            var actual = target ? nameOf(target) : '';
+            if (!target || (actual && targetName && actual !== targetName.trim())) {
+                // 虚拟列表中渲染位置与序号不一致，按名称在已渲染条目中查找
+                var byName = targetName ? Array.prototype.filter.call(items, function (item) {
+                    return nameOf(item) === targetName.trim();
+                })[0] : null;
+                if (!byName) {
+                    return target ? `名称不匹配: ${actual}` : `索引超出范围(共${items.length}项)`;
+                }
+                target = byName;
+            }
+            try {
+                target.click();
+            } catch (e) {
+                var evt = new MouseEvent('click', {bubbles: true, cancelable: true, view: window});
+                target.dispatchEvent(evt);
+            }
+            return 'success';
+        },
+
+        openPicker: function () {
+            var picker = document.querySelector('div.oui-pro-common-picker.isready');
+            if (!picker) {
+                picker = document.querySelector('div.category-picker');
+            }
+
+            if (!picker) {
+                return '未找到类目选择器容器';
+            }
+
+            picker.classList.add('open');
+            var event = new Event('change', {bubbles: true});
+            picker.dispatchEvent(event);
+            return 'success';
+        }
+    };
+})();
+""".replace("SYCM_HELPERS_VERSION", SYCM_HELPERS_VERSION)
+
+
+# 验证码哨兵：每个文档加载时注入一次，baxia验证码iframe出现/消失时更新window.__sycmCaptcha，
+# Python侧只需读取标志位，无需每页等待超时
+CAPTCHA_SENTINEL_JS = """
+(function () {
+    if (window.__sycmCaptcha) {
+        return;
+    }
+    var flag = window.__sycmCaptcha = {present: false, src: '', hits: 0};
+    var frame = null;
+
+    function isCaptcha(node) {
+        return node && node.tagName === 'IFRAME' && node.id === 'baxia-dialog-content'
+            && (node.getAttribute('src') || '').indexOf('action=captcha') !== -1;
+    }
+
+    function findIn(node) {
+        if (isCaptcha(node)) {
+            return node;
+        }
+        if (node.querySelector) {
+            var inner = node.querySelector('iframe#baxia-dialog-content');
+            return isCaptcha(inner) ? inner : null;
+        }
+        return null;
+    }
+
+    function update(mutations) {
+        if (frame) {
+            // 验证完成后iframe被移除或隐藏，标志位随之复位
+            if (!frame.isConnected || !frame.getClientRects().length) {
+                frame = null;
+                flag.present = false;
+            }
+            return;
+        }
+        for (var i = 0; i < mutations.length; i++) {
+            var m = mutations[i];
+            var candidates = m.type === 'attributes' ? [m.target] : m.addedNodes;
+            for (var j = 0; j < candidates.length; j++) {
+                var found = findIn(candidates[j]);
+                if (found) {
+                    frame = found;
+                    flag.present = true;
+                    flag.src = found.getAttribute('src') || '';
+                    flag.hits += 1;
+                    return;
+                }
+            }
+        }
+    }
+
+    new MutationObserver(update).observe(document, {childList: true, subtree: true,
+                                                    attributes: true, attributeFilter: ['src', 'style', 'class']});
+})();
+"""
+
+CAPTCHA_FLAG_JS = """
+var flag = window.__sycmCaptcha;
+return flag ? {installed: true, present: flag.present, src: flag.src} : {installed: false};
+"""
+
+# 页面内等待引擎：一次execute_async_script完成整个等待，MutationObserver/requestAnimationFrame
+# 在页面内检查条件，满足即返回，不再逐次轮询chromedriver
+PAGE_WAIT_JS = """
+var selector = arguments[0];
+var xpath = arguments[1];
+var options = arguments[2];
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+var finished = false;
+var timer = null;
+var frame = null;
+
+function predicate(el) {
+    /*PREDICATE*/
+    return true;
+}
+
+function locate() {
+    if (selector) {
+        return document.querySelector(selector);
+    }
+    if (xpath) {
+        return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    return document.documentElement;
+}
+
+function visible(el) {
+    var rect = el.getBoundingClientRect();
+    if (!rect.width && !rect.height) {
+        return false;
+    }
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none' && !el.disabled;
+}
+
+function match() {
+    if (options.readyState && document.readyState !== 'complete') {
+        return null;
+    }
+    var el = locate();
+    if (options.gone) {
+        return (!el || !visible(el)) ? document.documentElement : null;
+    }
+    if (!el || (options.visible && !visible(el))) {
+        return null;
+    }
+    try {
+        return predicate(el) ? el : null;
+    } catch (e) {
+        return null;
+    }
+}
+
+var observer = new MutationObserver(check);
+
+function finish(el) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    observer.disconnect();
+    document.removeEventListener('readystatechange', check);
+    clearTimeout(timer);
+    if (frame !== null) {
+        cancelAnimationFrame(frame);
+    }
+    done({found: !!el, element: (el && el !== document.documentElement) ? el : null,
+          elapsed: Date.now() - started});
+}
+
+function check() {
+    var el = match();
+    if (el) {
+        finish(el);
+    }
+}
+
+function tick() {
+    // 可见性取决于布局与动画，DOM变化未必触发观察器，按帧补充检查
+    check();
+    if (!finished) {
+        frame = requestAnimationFrame(tick);
+    }
+}
+
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true, attributes: true});
+document.addEventListener('readystatechange', check);
+timer = setTimeout(function () { finish(null); }, options.timeoutMs);
+check();
+if (!finished && (options.visible || options.gone)) {
+    tick();
+}
+"""
+
+_JS_FLOAT_PREFIX = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+# 搜索人气的数值单位，按优先级排列
+POPULARITY_UNITS = (("亿", 100000000), ("万", 10000))
+# 搜索人气文本的解析缓存条数：区间档位（如"1万 ~ 2万"）在各页之间大量重复
+POPULARITY_CACHE_SIZE = 65536
+
+
+def convert_wan_value(value_text):
+    """与页面脚本convertWanValue一致：去空白与千位分隔符后按parseFloat取数，含"亿"/"万"则乘以对应单位"""
+    text = re.sub(r"\s+", "", str(value_text)).replace(",", "")
+    scale = 1
+    for unit, unit_scale in POPULARITY_UNITS:
+        if unit in text:
+            text = text.replace(unit, "", 1)
+            scale = unit_scale
+            break
+    match = _JS_FLOAT_PREFIX.match(text)
+    if not match:
+        return None
+    value = float(match.group(0)) * scale
+    return value if math.isfinite(value) else None
+
+
+@functools.lru_cache(maxsize=POPULARITY_CACHE_SIZE)
+def parse_popularity_text(text):
+    """解析搜索人气文本，返回(下限, 上限)：单值上下限相同，区间值（"1万 ~ 2万"）按大小排列，无法解析时返回None"""
+    text = str(text).strip().replace("～", "~")
+    if "~" in text:
+        low, high = (convert_wan_value(part.strip()) for part in text.split("~", 1))
+        if low is None or high is None:
+            return None
+        return min(low, high), max(low, high)
+    value = convert_wan_value(text)
+    return None if value is None else (value, value)
+
+
+def parse_popularity_value(raw):
+    """解析接口返回的搜索人气字段，返回(数值, 展示文本)，区间值取下限，无法解析时返回None"""
+    if isinstance(raw, dict):
+        raw = raw.get("value", raw.get("text"))
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+        return raw, str(raw)
+    text = "" if raw is None else str(raw).strip()
+    bounds = parse_popularity_text(text)
+    return None if bounds is None else (bounds[0], text)
+
+
+class PopularityColumns:
+    """一批搜索人气换算出的数值列（array('d')）：下限、上限与中值，无法解析的位置为nan"""
+
+    __slots__ = ("low", "high", "mid", "invalid")
+
+    def __init__(self):
+        self.low = array('d')
+        self.high = array('d')
+        self.mid = array('d')
+        self.invalid = 0
+
+    def __len__(self):
+        return len(self.low)
+
+    def at_least(self, threshold):
+        """下限达到阈值的位置（nan不满足任何比较）"""
+        return [i for i, value in enumerate(self.low) if value >= threshold]
+
+
+def parse_popularity_batch(texts):
+    """批量换算搜索人气文本（一页或整个存档），重复文本直接取缓存"""
+    parse = parse_popularity_text
+    missing = (float("nan"), float("nan"))
+    bounds = [parse(text if isinstance(text, str) else "" if text is None else str(text)) or missing
+              for text in texts]
+    columns = PopularityColumns()
+    columns.low = array('d', [low for low, _ in bounds])
+    columns.high = array('d', [high for _, high in bounds])
+    columns.mid = array('d', [(low + high) / 2 for low, high in bounds])
+    columns.invalid = sum(1 for pair in bounds if pair is missing)
+    return columns
+
+
+def normalize_page_rows(rows, min_threshold):
+    """按Python端解析器重新换算一页数据的搜索人气，各提取引擎统一以此与阈值比较；
+    返回(rows, found_low_value)，无法解析的行丢弃"""
+    columns = parse_popularity_batch(row.get('popularity_text') for row in rows)
+    normalized = []
+    for row, low in zip(rows, columns.low):
+        if low != low:
+            continue
+        if row.get('search_popularity') != low:
+            row = dict(row, search_popularity=low)
+        normalized.append(row)
+    return normalized, any(row['search_popularity'] < min_threshold for row in normalized)
+
+
+def split_rows_by_threshold(rows, min_threshold):
+    """按阈值拆分数据（数据行列表或行存储），返回(达到阈值的行, 低于阈值的行数)"""
+    if isinstance(rows, RowStore):
+        kept = rows.at_least(min_threshold)
+    else:
+        kept = [row for row in rows if row['search_popularity'] >= min_threshold]
+    return kept, len(rows) - len(kept)
+
+
+class RowStore:
+    """紧凑的数据行存储：关键词与搜索人气文本按列存放，数值存入array('d')（缺失为nan）。
+    搜索人气文本经sys.intern驻留（区间档位大量重复）；关键词在一级类目内基本不重复，驻留反而增加驻留表开销，按原样保存。
+    迭代时按需生成与原有结构相同的行字典；输出接口与阈值筛选直接按列读取"""
+
+    __slots__ = ("keywords", "texts", "values")
+
+    def __init__(self, rows=()):
+        self.keywords = []
+        self.texts = []
+        self.values = array('d')
+        self.extend(rows)
+
+    def extend(self, rows):
+        if isinstance(rows, RowStore):
+            self.keywords.extend(rows.keywords)
+            self.texts.extend(rows.texts)
+            self.values.extend(rows.values)
+            return
+        intern = sys.intern
+        nan = float("nan")
+        for row in rows:
+            value = row.get('search_popularity')
+            self.keywords.append(row['keyword'])
+            self.texts.append(intern(row['popularity_text']))
+            self.values.append(nan if value is None else value)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def __iter__(self):
+        for keyword, value, text in self.fields():
+            yield {"keyword": keyword, "search_popularity": value, "popularity_text": text}
+
+    def fields(self):
+        """逐行取出(关键词, 搜索人气数值, 搜索人气文本)，不生成行字典"""
+        return ((keyword, None if value != value else value, text)
+                for keyword, value, text in zip(self.keywords, self.values, self.texts))
+
+    def at_least(self, threshold):
+        """搜索人气达到阈值的行（新的行存储，与原存储共用字符串）"""
+        keep = [value >= threshold for value in self.values]
+        store = RowStore()
+        store.keywords = list(compress(self.keywords, keep))
+        store.texts = list(compress(self.texts, keep))
+        store.values = array('d', compress(self.values, keep))
+        return store
+
+
+def iter_row_fields(rows):
+    """逐行取出(关键词, 搜索人气数值, 搜索人气文本)：行存储按列读取，数据行列表逐个取字段"""
+    if isinstance(rows, RowStore):
+        return rows.fields()
+    return ((item['keyword'], item.get('search_popularity'), item['popularity_text']) for item in rows)
+
+
+def row_storage_footprint(rows):
+    """估算数据占用的内存（字节）：容器本身加上引用的字符串与数值对象（同一对象只计一次）"""
+    seen = set()
+
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    if isinstance(rows, RowStore):
+        total = sys.getsizeof(rows.keywords) + sys.getsizeof(rows.texts) + sys.getsizeof(rows.values)
+        return total + sum(size(item) for item in rows.keywords) + sum(size(item) for item in rows.texts)
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += size(row) + sum(size(value) for value in row.values())
+    return total
+
+
+def merge_row_parts(parts):
+    """按顺序合并多段数据：均为关键词数据时合并为行存储，否则（如存档记录）合并为列表"""
+    parts = list(parts)
+    if all(isinstance(part, RowStore) or all('keyword' in row for row in part[:1]) for part in parts):
+        store = RowStore()
+        for part in parts:
+            store.extend(part)
+        return store
+    return [row for part in parts for row in part]
+
+
+def parse_rank_payload(payload, min_threshold):
+    """将rank.json响应解析为统一的行结构，返回(rows, found_low_value, total)；结构无法识别时返回None"""
+    records, total = None, None
+    for holder in (payload.get("data"), payload.get("content"), payload) if isinstance(payload, dict) else ():
+        if isinstance(holder, list):
+            records = holder
+            break
+        if isinstance(holder, dict) and isinstance(holder.get("data"), list):
+            records = holder["data"]
+            total = holder.get("recordCount") or holder.get("total")
+            break
+    if records is None:
+        return None
+
+    rows = []
+    found_low_value = False
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        keyword = record.get("searchWord") or record.get("keyword") or record.get("word") or ""
+        if isinstance(keyword, dict):
+            keyword = keyword.get("value") or ""
+        keyword = str(keyword).strip()
+        popularity = parse_popularity_value(
+            record["seIpvUvHits"] if "seIpvUvHits" in record else record.get("searchPopularity")
+        )
+        if not keyword or popularity is None:
+            continue
+        value, text = popularity
+        if value < min_threshold:
+            found_low_value = True
+        rows.append({"keyword": keyword, "search_popularity": value, "popularity_text": text})
+    return rows, found_low_value, total
+
+
+class PageNavigationError(RuntimeError):
+    """跳转到指定页失败：与空页不同，调用方应重试或放弃该类目，而不是当作数据到头"""
+
+    def __init__(self, page):
+        super().__init__(f"跳转至第{page}页失败")
+        self.page = page
+
+
+def plan_group_tasks(level1_cats, split=True):
+    """把一级类目展开为群控任务单元：split时有二级类目的一级类目按二级类目拆分，否则整个一级类目为一个单元"""
+    tasks = []
+    for level1_cat in level1_cats:
+        children = level1_cat.get('children') if split else None
+        if children:
+            tasks.extend({"level1": level1_cat, "level2": level2_cat, "level3": None} for level2_cat in children)
+        else:
+            tasks.append({"level1": level1_cat, "level2": None, "level3": None})
+    return tasks
+
+
+def task_unit_key(task):
+    """任务单元在一级类目内的排序键（二级序号, 三级序号），用于按类目树顺序合并结果"""
+    level2_cat, level3_cat = task.get('level2'), task.get('level3')
+    return (level2_cat['index'] if level2_cat else 0, level3_cat['index'] if level3_cat else 0)
+
+
+class GroupTaskQueue:
+    """群控共享任务队列：各窗口处理完手头的任务后自行领取下一个，失败窗口领取的任务退回队列
+
+    拆分成二、三级任务单元的一级类目，在其全部单元结束后按类目树顺序合并结果，由pop_ready取出写入表格。
+    """
+
+    def __init__(self, tasks, max_attempts=3, done=()):
+        self._lock = threading.Lock()
+        self._pending = deque(tasks)
+        self._in_flight = {}
+        self._attempts = {}
+        self._groups = {}
+        self._ready = []
+        self.max_attempts = max_attempts
+        self.total = len(self._pending)
+        self.claimed = {}
+        self.finished = {}
+        self.dropped = []
+        for task in self._pending:
+            if task.get('level2') is not None:
+                self._group_of(task)["outstanding"] += 1
+        # 续采时已完成的单元直接带着断点日志中的数据计入合并结果
+        self._add_done(done)
+        for index in list(self._groups):
+            self._close_group(index)
+
+    def _add_done(self, done):
+        for task, rows in done:
+            self._group_of(task)["parts"].append((task_unit_key(task), rows))
+
+    def _close_group(self, index):
+        group = self._groups[index]
+        if group["outstanding"] <= 0:
+            del self._groups[index]
+            group["parts"].sort(key=lambda part: part[0])
+            self._ready.append(group)
+
+    def _group_of(self, task):
+        level1_cat = task['level1']
+        return self._groups.setdefault(level1_cat['index'], {
+            "level1": level1_cat, "outstanding": 0, "parts": [], "dropped": 0})
+
+    def _settle(self, task, rows):
+        """记录拆分单元的结果（rows为None表示放弃），一级类目的单元全部结束后转入待合并列表"""
+        if task.get('level2') is None:
+            return
+        group = self._group_of(task)
+        if rows is None:
+            group["dropped"] += 1
+        else:
+            group["parts"].append((task_unit_key(task), rows))
+        group["outstanding"] -= 1
+        self._close_group(task['level1']['index'])
+
+    def add_front(self, tasks, done=()):
+        """把运行中拆分出的新单元放到队首，空闲窗口优先领取，使一级类目尽快完成合并；done为已完成的(单元, 数据)"""
+        with self._lock:
+            self._add_done(done)
+            for task in reversed(tasks):
+                self._pending.appendleft(task)
+                if task.get('level2') is not None:
+                    self._group_of(task)["outstanding"] += 1
+            self.total += len(tasks)
+
+    def claim(self, session_id):
+        """领取下一个任务，队列为空时返回None"""
+        with self._lock:
+            if not self._pending:
+                return None
+            task = self._pending.popleft()
+            self._in_flight.setdefault(session_id, []).append(task)
+            self.claimed[session_id] = self.claimed.get(session_id, 0) + 1
+            return task
+
+    def _take_back(self, session_id, task):
+        tasks = self._in_flight.get(session_id, [])
+        for pos, item in enumerate(tasks):
+            if item is task:
+                del tasks[pos]
+                return True
+        return False
+
+    def finish(self, session_id, task, rows=None):
+        """标记任务完成；拆分单元需同时交回其采集结果rows"""
+        with self._lock:
+            if self._take_back(session_id, task):
+                self.finished[session_id] = self.finished.get(session_id, 0) + 1
+                self._settle(task, rows or [])
+
+    def _requeue(self, task):
+        """累计任务失败次数，未达到max_attempts次时放回队尾，否则放弃该任务；返回是否已放回"""
+        attempts = self._attempts.get(id(task), 0) + 1
+        self._attempts[id(task)] = attempts
+        if attempts >= self.max_attempts:
+            self.dropped.append(task)
+            self._settle(task, None)
+            return False
+        self._pending.append(task)
+        return True
+
+    def release(self, session_id, task):
+        """退回任务供其他窗口领取；同一任务失败达到max_attempts次后不再退回，返回是否已退回"""
+        with self._lock:
+            if not self._take_back(session_id, task):
+                return False
+            return self._requeue(task)
+
+    def release_all(self, session_id):
+        """退回该窗口所有未完成的任务（与release一样计入失败次数），返回(退回数量, 放弃数量)"""
+        with self._lock:
+            tasks = self._in_flight.pop(session_id, [])
+            returned = sum(self._requeue(task) for task in tasks)
+            return returned, len(tasks) - returned
+
+    def drained(self):
+        """队列为空且没有任何窗口持有未完成的任务"""
+        with self._lock:
+            return not self._pending and not any(self._in_flight.values())
+
+    def pop_ready(self):
+        """取出所有单元均已结束、可以合并写入的一级类目"""
+        with self._lock:
+            ready, self._ready = self._ready, []
+            return ready
+
+    def counts(self, session_id):
+        """返回(该窗口领取数, 该窗口完成数, 全部完成数)"""
+        with self._lock:
+            return (self.claimed.get(session_id, 0), self.finished.get(session_id, 0),
+                    sum(self.finished.values()))
+
+
+class AsyncResultWriter:
+    """会话的后台写出线程：采集线程把每页数据放入有界队列后立即继续，队列已满时阻塞等待（背压）"""
+
+    def __init__(self, write, maxsize=16, log=print):
+        self._write = write
+        self._log = log
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.batches = 0
+        self.blocked_seconds = 0.0
+        self.error = None
+
+    def run(self):
+        """写出线程主循环：依次执行写出及其附带的断点日志写入，收到None时结束"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            page_data, commit, journal = item
+            try:
+                if page_data or commit:
+                    self._write(page_data, commit)
+                    self.batches += 1
+                # 断点日志在数据写出之后提交；出错后直到下一次flush都不再提交，之后的类目不会被记为已完成
+                if journal is not None and self.error is None:
+                    journal()
+            except Exception as exc:  # pylint: disable=broad-except
+                if self.error is None:
+                    self.error = exc
+                action = "保存" if commit and not page_data else f"写出{len(page_data)}条数据"
+                self._log(f"写出线程{action}失败: {exc}")
+
+    def submit(self, page_data, commit=False, journal=None):
+        started = time.perf_counter()
+        self._queue.put((page_data, commit, journal))
+        self.blocked_seconds += time.perf_counter() - started
+
+    def flush(self):
+        """屏障：等待此前提交的数据全部写出，返回自上次flush以来是否全部写出成功（同时清除错误）"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        error, self.error = self.error, None
+        return error is None
+
+    def close(self):
+        """写完剩余数据后停止写出线程，返回是否全部写出成功"""
+        written = self.flush()
+        self._queue.put(None)
+        return written
+
+
+class StageMetrics:
+    """流水线单个阶段的统计：处理条数、处理耗时、向下游投递时的阻塞时间与下游队列深度"""
+
+    def __init__(self):
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.depth_total = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+
+    def sample_depth(self, depth):
+        self.depth_total += depth
+        self.depth_samples += 1
+        self.depth_max = max(self.depth_max, depth)
+
+    def describe(self, name):
+        per_item = self.busy_seconds / self.items if self.items else 0.0
+        avg_depth = self.depth_total / self.depth_samples if self.depth_samples else 0.0
+        text = f"{name}: {self.items}页，处理 {self.busy_seconds:.2f}s（{per_item * 1000:.0f}ms/页）"
+        if self.depth_samples:
+            text += f"，投递阻塞 {self.blocked_seconds:.2f}s，下游队列 平均{avg_depth:.1f} 最大{self.depth_max}"
+        return text
+
+
+class PagePipeline:
+    """分页采集流水线：浏览器阶段取回已换算的页面数据，筛选去重与写出在下游线程中进行，阶段间用有界队列衔接。
+    筛选阶段的截止判定通过每页的判定事件回传给浏览器阶段，用于提前停止翻页。
+
+    下游线程每个会话只启动一次，逐个类目复用：begin开始一个类目，finish等待该类目已投递的页处理完，close结束线程。
+    """
+
+    STAGES = ("browser", "filter", "sink")
+    STAGE_NAMES = {"browser": "浏览器", "filter": "筛选去重", "sink": "写出"}
+
+    def __init__(self, sink, log=print, maxsize=4):
+        self._sink = sink
+        self._log = log
+        self._filter_queue = queue.Queue(maxsize=maxsize)
+        self._sink_queue = queue.Queue(maxsize=maxsize)
+        self.metrics = {name: StageMetrics() for name in self.STAGES}
+        self._verdict_lock = threading.Lock()
+        self._closed = threading.Event()
+        self.begin(None)
+
+    def begin(self, threshold):
+        """开始一个类目：清空上一个类目的截止判定、去重集合、计数与错误"""
+        self.threshold = threshold
+        self._verdicts = {}
+        self._seen = set()
+        self.cutoff_page = None
+        self.total_collected = 0
+        self.duplicates = 0
+        self.failed = False
+
+    def _verdict(self, page):
+        with self._verdict_lock:
+            return self._verdicts.setdefault(page, threading.Event())
+
+    def _put(self, target, item, metrics):
+        started = time.perf_counter()
+        target.put(item)
+        metrics.blocked_seconds += time.perf_counter() - started
+        metrics.sample_depth(target.qsize())
+
+    def _fail(self, stage, page, exc):
+        """下游阶段出错：记录并通知浏览器阶段停止翻页，线程继续服务后续类目"""
+        self.failed = True
+        self._log(f"分页流水线{stage}阶段处理第 {page} 页时出错: {exc}")
+
+    def submit(self, page, rows, seconds=0.0):
+        """浏览器阶段：投递一页数据（seconds为该页提取耗时）"""
+        metrics = self.metrics["browser"]
+        metrics.items += 1
+        metrics.busy_seconds += seconds
+        self._put(self._filter_queue, (page, rows), metrics)
+
+    def add_browser_seconds(self, seconds):
+        """计入浏览器阶段翻页等不属于某一页提取的耗时"""
+        self.metrics["browser"].busy_seconds += seconds
+
+    def should_stop(self, page, found_low_value):
+        """浏览器阶段翻页前调用：页面带低价值标记时等待筛选阶段的判定，否则只检查已有的截止判定"""
+        if found_low_value:
+            self._verdict(page).wait()
+        return self.cutoff_page is not None or self.failed
+
+    def run_filter(self):
+        """筛选阶段：按阈值筛选、判定截止页并按关键词去重；收到屏障时转交写出阶段，收到None时结束"""
+        metrics = self.metrics["filter"]
+        while True:
+            item = self._filter_queue.get()
+            if item is None or isinstance(item, threading.Event):
+                self._sink_queue.put(item)
+                if item is None:
+                    return
+                continue
+            page, rows = item
+            started = time.perf_counter()
+            filtered = None
+            try:
+                # 截止页之后预取的页丢弃
+                if not self.failed and (self.cutoff_page is None or page <= self.cutoff_page):
+                    filtered = self._filter_page(page, rows)
+            except Exception as exc:  # pylint: disable=broad-except
+                self._fail("筛选", page, exc)
+            finally:
+                metrics.items += 1
+                metrics.busy_seconds += time.perf_counter() - started
+                self._verdict(page).set()
+            if filtered:
+                self._put(self._sink_queue, (page, filtered), metrics)
+
+    def _filter_page(self, page, rows):
+        """rows为浏览器阶段已换算的数据，原样筛选；截止判定只以筛选出的低于阈值行数为准"""
+        valid, low_count = split_rows_by_threshold(rows, self.threshold)
+
+        filtered = []
+        for row in valid:
+            if row['keyword'] in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(row['keyword'])
+            filtered.append(row)
+        self.total_collected += len(filtered)
+        self._log(f"第 {page} 页共找到 {len(rows)} 条数据，筛选出 {len(filtered)} 条符合条件的数据")
+
+        if low_count:
+            self._log(f"在第 {page} 页发现{low_count}条小于 {self.threshold} 的搜索人气，停止提取当前类目")
+            self.cutoff_page = page
+        return filtered
+
+    def run_sink(self):
+        """写出阶段：把筛选后的数据交给会话的写出流程；收到屏障时放行等待的浏览器阶段，收到None时结束"""
+        metrics = self.metrics["sink"]
+        try:
+            while True:
+                item = self._sink_queue.get()
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+                    continue
+                page, rows = item
+                started = time.perf_counter()
+                try:
+                    self._sink(rows, page)
+                except Exception as exc:  # pylint: disable=broad-except
+                    self._fail("写出", page, exc)
+                metrics.items += 1
+                metrics.busy_seconds += time.perf_counter() - started
+        finally:
+            self._closed.set()
+
+    def finish(self):
+        """类目结束：等待下游各阶段处理完该类目已投递的页"""
+        done = threading.Event()
+        self._filter_queue.put(done)
+        done.wait()
+
+    def close(self):
+        """任务结束：处理完已投递的页后结束下游线程"""
+        self._filter_queue.put(None)
+        self._closed.wait()
+
+    def describe(self):
+        return [self.metrics[name].describe(self.STAGE_NAMES[name]) for name in self.STAGES]
+
+
+class CountingChrome(webdriver.Chrome):
+    """统计发往chromedriver的命令数，用于衡量每页的WebDriver往返次数"""
+
+    def __init__(self, *args, **kwargs):
+        self.command_count = 0
+        super().__init__(*args, **kwargs)
+
+    def execute(self, driver_command, params=None):
+        self.command_count += 1
+        return super().execute(driver_command, params)
+
 
 @dataclass
 class BrowserSessionState:
@@ -38,7 +1512,7 @@ class BrowserSessionState:
     browser: Optional[webdriver.Chrome] = None
     categories: dict = field(default_factory=lambda: {1: [], 2: [], 3: []})
     selected_categories: dict = field(default_factory=lambda: {1: None, 2: None, 3: None})
-    collected_data: list = field(default_factory=list)
+    collected_data: RowStore = field(default_factory=RowStore)
     current_level: int = 1
     current_level1_index: int | None = None
     excel_filepath: str = ""
@@ -51,10 +1525,38 @@ class BrowserSessionState:
     stop_event: threading.Event = field(default_factory=threading.Event)
     output_dir: str = ""
     excel_dirty: bool = False
+    output_format: str = "excel"
+    result_sink: Optional["ResultSink"] = None
+    result_writer: Optional["AsyncResultWriter"] = None
+    writer_lock: threading.Lock = field(default_factory=threading.Lock)
+    pipeline: Optional["PagePipeline"] = None
+    threshold_views: Optional["ThresholdViewSink"] = None
     level1_total: int = 0
     level1_current: int = 0
     level2_total: int = 0
     level2_current: int = 0
+    extract_engine: str = "dom"
+    network_capture: bool = False
+    captured_page: Optional[dict] = None
+    category_path: tuple = (None, None, None)
+    current_page: int = 1
+    page_cache: dict = field(default_factory=dict)
+    page_cache_hits: int = 0
+    page_extractions: int = 0
+    script_timeout: float = 0
+    last_snapshot: Optional[dict] = None
+    category_tree: Optional[list] = None
+    rows_collected: int = 0
+    resume: bool = False
+    journal_hits: int = 0
+    level3_visited: int = 0
+    page_commands: int = 0
+    wait_stats: dict = field(default_factory=dict)
+    pipeline_metrics: dict = field(default_factory=dict)
+    # 多阈值采集（如[100, 150]）：按其中最低阈值翻页采集，根类目文件保存达到最低阈值的全部数据，
+    # 其余每个阈值在写出时本地筛选另存一份"{序号}_{名称}_阈值N"文件；run_thresholds为本次运行开始时的快照
+    popularity_thresholds: list = field(default_factory=list)
+    run_thresholds: list = field(default_factory=list)
 
     def __post_init__(self):
         self.pause_event.set()
@@ -103,9 +1605,10 @@ class CategoryAutoExtractor(tk.Tk):
         os.makedirs(self.debug_profile_root, exist_ok=True)
 
         # 数据收集相关配置
-        self.min_popularity_threshold = 150  # 筛选搜索人气大于等于此值的数据
+        self.popularity_threshold = 150  # 筛选搜索人气大于等于此值的数据（会话未设置多阈值时使用）
         self.max_pages = 6  # 最多处理的页数
         self.stop_on_low_value = True  # 遇到小于阈值的值时停止
+        self.debug_level = 0  # 大于0时页面提取返回逐行调试日志
         self.auto_total_categories = 61
         self.auto_block_size = 10
 
@@ -123,6 +1626,22 @@ class CategoryAutoExtractor(tk.Tk):
         self.session_states[-1] = self._default_session_state
         self._session_local.state = self._default_session_state
         self.cookie_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cookie.txt")
+        # 站点地址（可指向本地桩服务器离线调试）
+        self.sycm_base_url = SYCM_BASE_URL
+        # 类目树缓存：按账号与统计日期保存完整类目树，有效期内不再从页面逐级读取
+        self.prefetch_category_tree = True
+        self.category_tree_ttl_hours = CATEGORY_TREE_TTL_HOURS
+        self.category_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_cache")
+        self._category_tree_locks = {}
+        # 后台写出线程的队列长度（页数），写出跟不上时采集线程在此阻塞等待
+        self.writer_queue_size = 16
+        # 分页流水线：浏览器只负责取页，筛选去重与写出在下游线程进行；队列长度为阶段间最多积压的页数
+        self.page_pipeline = True
+        self.pipeline_queue_size = 4
+        # 采集成本历史：记录每个类目路径的页数、三级类目数、数据条数与耗时，群控按预测耗时均衡分配
+        self.cost_model = CrawlCostModel(os.path.join(self.category_cache_dir, "crawl_costs.json"))
+        # 断点日志：记录已提取的页面、写出的数据与已完成的类目，"续采"时跳过已完成部分
+        self.crawl_journal = CrawlJournal(os.path.join(self.category_cache_dir, "crawl_journal.sqlite3"))
 
         # 初始化完成后显示提示
         self.log_ui('程序初始化完成，请先配置Chrome驱动路径')
@@ -224,34 +1743,26 @@ class CategoryAutoExtractor(tk.Tk):
             current = chunk_end + 1
         return ranges
 
-    def _split_indices_evenly(self, indices, parts):
-        """将索引列表平均切分为parts份，保持原有顺序"""
-        result = []
-        total = len(indices)
-        if parts <= 0:
-            return result
-        base = total // parts
-        extra = total % parts
-        start = 0
-        for i in range(parts):
-            length = base + (1 if i < extra else 0)
-            if length <= 0:
-                result.append([])
-                continue
-            result.append(indices[start:start + length])
-            start += length
-        return result
-
     def _start_processing_task(self, state: BrowserSessionState, target, *args):
         state.stop_event.clear()
         state.pause_event.set()
         state.processing = True
         state.paused = False
+        # 运行期间阈值固定为开始时的设置，结束后恢复为配置的阈值
+        state.run_thresholds = list(state.popularity_thresholds)
 
         def runner():
+            self._reset_page_cache_stats()
+            self._log_popularity_thresholds()
             try:
                 target(*args)
             finally:
+                self._close_page_pipeline()
+                self._close_result_writer()
+                self._log_page_cache_summary()
+                self._log_wait_stats()
+                self._save_cost_model()
+                state.run_thresholds = []
                 state.processing = False
                 state.paused = False
                 state.stop_event.clear()
@@ -282,22 +1793,102 @@ class CategoryAutoExtractor(tk.Tk):
         self.log_ui(prefix + message)
 
     def _reset_collected_data(self):
-        self.collected_data = []
+        # 存档模式收集的是原始页面记录，其余模式用紧凑行存储
+        self.collected_data = [] if self._get_active_state().output_format == "capture" else RowStore()
 
-    def _append_collected_data(self, page_data):
+    def _append_collected_data(self, page_data, page=None):
+        """收集数据并交给写出线程，断点日志的输出记录随写出一起在写出线程中提交
+
+        page为数据所在页：数据恰为该页达到阈值的全部行时只记录页码引用，行数据只保存在pages表中。
+        """
         if page_data:
+            state = self._get_active_state()
+            state.rows_collected += len(page_data)
             self.collected_data.extend(page_data)
-            self.save_page_data_to_excel(page_data, commit=False)
+            threshold = self.min_popularity_threshold
+            rows = page_data
+            cached = state.page_cache.get(state.category_path + (page,)) if page is not None else None
+            if cached and len(page_data) == sum(1 for row in cached[0] if row['search_popularity'] >= threshold):
+                rows = None
+            journal = functools.partial(self.crawl_journal.record_output, self.get_yesterday_date(),
+                                        self._journal_key(), rows, page, threshold)
+            self._write_async(page_data, journal=journal)
+
+    def _record_journal(self, write, *args):
+        """断点日志写入交给写出线程，与数据写出保持同一顺序，采集线程不等待SQLite提交"""
+        self._write_async([], journal=functools.partial(write, *args))
 
     def _flush_collected_data(self):
+        """提交当前根类目文件：先等写出线程写完已提交的数据，再保存并等待保存完成
+
+        返回是否有数据且全部写出并保存成功。
+        """
         state = self._get_active_state()
         had_data = bool(self.collected_data) or getattr(state, "excel_dirty", False)
-        self.collected_data = []
+        self._reset_collected_data()
+        written = self._drain_result_writer()
         if getattr(state, "excel_dirty", False):
-            self.save_page_data_to_excel([], commit=True)
-        return had_data
+            self._write_async([], commit=True)
+            written = self._drain_result_writer() and written
+        return had_data and written
+
+    def _write_async(self, page_data, commit=False, journal=None):
+        """把写出交给会话的后台写出线程（首次使用时启动），journal为写出后执行的断点日志写入"""
+        self._get_result_writer().submit(page_data, commit, journal)
+
+    def _get_result_writer(self):
+        """会话的后台写出线程（首次使用时启动）；流水线的写出阶段与采集线程都会调用，创建时加锁避免重复启动"""
+        state = self._get_active_state()
+        with state.writer_lock:
+            if state.result_writer is None:
+                state.result_writer = AsyncResultWriter(self._write_result_batch, maxsize=self.writer_queue_size,
+                                                        log=self.log_session)
+                self._run_in_session_thread(state, self._run_result_writer, state.result_writer)
+            return state.result_writer
+
+    def _write_result_batch(self, page_data, commit=False):
+        """写出线程执行的写出：根类目文件，以及多阈值采集时各阈值的筛选文件"""
+        result = self.save_page_data_to_excel(page_data, commit)
+        self._write_threshold_views(page_data, commit)
+        return result
+
+    def _run_result_writer(self, writer):
+        try:
+            writer.run()
+        finally:
+            # COM对象只能在创建它的线程中使用，写出线程结束后不再复用
+            self.excel_app = None
+
+    def _drain_result_writer(self):
+        """等待写出线程写完此前提交的数据（切换根类目文件、提交保存前调用），返回是否全部写出成功"""
+        writer = self._get_active_state().result_writer
+        if writer is None or writer.flush():
+            return True
+        self.log_session(f"{self.current_excel_root or '结果文件'} 有数据未能写出或保存，"
+                         f"出错后的类目未记入断点日志，可续采重新采集")
+        return False
+
+    def _close_result_writer(self):
+        """任务结束：写完剩余数据后停止写出线程"""
+        state = self._get_active_state()
+        writer = state.result_writer
+        if writer is not None:
+            if not writer.close():
+                self.log_session("任务结束时仍有数据未能写出或保存，出错后的类目未记入断点日志，可续采重新采集")
+            state.result_writer = None
+        if state.threshold_views is not None:
+            state.threshold_views.close()
+            state.threshold_views = None
+        if writer is not None and writer.batches:
+            self.log_session(f"写出线程：共写出 {writer.batches} 批，采集线程因队列已满等待 {writer.blocked_seconds:.1f} 秒")
 
     # ===== 会话属性访问器 =====
+    @property
+    def min_popularity_threshold(self):
+        """本次运行实际采用的阈值：会话设置了阈值时为其中最低的一个，否则为配置的阈值"""
+        thresholds = self._get_active_state().run_thresholds
+        return thresholds[0] if thresholds else self.popularity_threshold
+
     @property
     def browser(self):
         return self._get_active_state().browser
@@ -368,6 +1959,8 @@ class CategoryAutoExtractor(tk.Tk):
 
     @current_excel_root.setter
     def current_excel_root(self, value):
+        # 写出线程按当前根类目文件写入，切换前先让已提交的数据写完
+        self._drain_result_writer()
         self._get_active_state().current_excel_root = value
 
     @property
@@ -634,6 +2227,10 @@ class CategoryAutoExtractor(tk.Tk):
                 continue
             for level in (1, 2, 3):
                 state.categories[level] = [dict(item) for item in reference_state.categories[level]]
+            # 类目树只读，各会话共享同一份内存数据
+            state.category_tree = reference_state.category_tree
+            if state.category_tree is not None:
+                state.categories[1] = state.category_tree
 
     def group_process_input(self, event=None):
         if not hasattr(self, "group_entry"):
@@ -643,6 +2240,14 @@ class CategoryAutoExtractor(tk.Tk):
         if not input_text:
             self.log_ui("请输入群控指令")
             return
+        # "预估 0"/"预估 5-8"：只输出按历史耗时预测的各窗口用时，不启动采集
+        dry_run = input_text.startswith("预估")
+        if dry_run:
+            input_text = input_text[len("预估"):].strip()
+        # "续采 0"/"续采 5-8"：按断点日志跳过已完成的类目与任务单元
+        resume = input_text.startswith("续采")
+        if resume:
+            input_text = input_text[len("续采"):].strip()
 
         sessions = self._collect_group_sessions(require_browser=True, require_interface=True)
         if not sessions:
@@ -679,13 +2284,66 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_ui("没有符合条件的一级类目可分配")
             return
 
-        chunks = self._split_indices_evenly(indices, len(sessions))
-        for state, chunk in zip(sessions, chunks):
-            if not chunk:
-                self.log_ui(f"窗口{state.session_id + 1} 未分配到类目")
+        level1_map = {cat['index']: cat for cat in reference_state.categories[1]}
+        # 有类目树时按二级类目拆分任务，单个大一级类目也能分给所有窗口并行处理
+        split = reference_state.category_tree is not None and len(sessions) > 1
+        tasks = plan_group_tasks([level1_map[idx] for idx in indices], split=split)
+        done = []
+        if resume:
+            tasks, done = self._split_done_tasks(tasks)
+            self.log_ui(f"续采：{len(done)}个任务单元已完成，剩余{len(tasks)}个任务")
+            if not tasks and not done:
+                self.log_ui("断点日志显示所选类目均已完成")
+                return
+        # 按历史耗时从大到小排队（LPT）：各窗口空闲时领取剩余任务中最耗时的一个
+        costs = plan_task_costs(tasks, self.cost_model)
+        order, loads, assigned = lpt_schedule(costs, len(sessions))
+        for line in format_schedule_forecast(tasks, costs, loads, assigned):
+            self.log_ui(line)
+        if dry_run:
+            return
+        if not resume:
+            date = self.get_yesterday_date()
+            for idx in indices:
+                self.crawl_journal.reset(date, level1_map[idx]['name'])
+        tasks = [tasks[i] for i in order]
+        task_queue = GroupTaskQueue(tasks, done=done)
+        self.log_ui(f"共{len(indices)}个一级类目（{len(tasks)}个任务单元）进入共享队列，"
+                    f"{len(sessions)}个窗口按完成情况自行领取: {indices}")
+        # 各窗口的单元结果会合并写入同一根类目文件，阈值统一采用第一个窗口的设置
+        thresholds = list(sessions[0].popularity_thresholds)
+        for state in sessions:
+            state.resume = resume
+            state.popularity_thresholds = list(thresholds)
+            panel = getattr(self, "session_panels", {}).get(state.session_id)
+            if panel:
+                panel["threshold_entry"].delete(0, tk.END)
+                panel["threshold_entry"].insert(0, ",".join(f"{value:g}" for value in thresholds))
+            self._start_processing_task(state, self.process_assigned_categories, task_queue)
+
+    def _split_done_tasks(self, tasks):
+        """续采：分出断点日志中已完成的任务单元，返回(待处理任务, [(已完成单元, 其数据)])；已完成的一级类目整体跳过"""
+        date = self.get_yesterday_date()
+        pending, done = [], []
+        restored = set()
+        for task in tasks:
+            level1_cat = task['level1']
+            if self.crawl_journal.is_done(date, self._journal_key([level1_cat])):
                 continue
-            self.log_ui(f"窗口{state.session_id + 1} 负责类目: {chunk}")
-            self._start_processing_task(state, self.process_assigned_categories, chunk)
+            if task['level2'] is None:
+                # 整个一级类目的任务在process_level1_category中恢复
+                pending.append(task)
+                continue
+            if level1_cat['index'] not in restored:
+                # 清掉中断时未完成单元的部分数据，这些单元会重新采集
+                self.crawl_journal.restore_level1(date, level1_cat['name'])
+                restored.add(level1_cat['index'])
+            key = self._journal_key([level1_cat, task['level2'], task['level3']])
+            if self.crawl_journal.is_done(date, key):
+                done.append((task, self.crawl_journal.output_rows(date, key)))
+            else:
+                pending.append(task)
+        return pending, done
 
     def group_cookie_input_submit(self, event=None):
         if not hasattr(self, "group_cookie_entry"):
@@ -793,6 +2451,17 @@ class CategoryAutoExtractor(tk.Tk):
             entry.bind("<Return>", lambda event, sid=session_id: self.process_input(sid, event))
             ttk.Button(input_frame, text="确认",
                        command=lambda sid=session_id: self.process_input(sid)).pack(side=tk.LEFT)
+            ttk.Label(input_frame, text="引擎:").pack(side=tk.LEFT, padx=(10, 5))
+            engine_combo = ttk.Combobox(input_frame, values=list(EXTRACT_ENGINES.values()),
+                                        state="readonly", width=10)
+            engine_combo.pack(side=tk.LEFT)
+            ttk.Label(input_frame, text="输出:").pack(side=tk.LEFT, padx=(10, 5))
+            output_combo = ttk.Combobox(input_frame, values=list(OUTPUT_FORMATS.values()),
+                                        state="readonly", width=10)
+            output_combo.pack(side=tk.LEFT)
+            ttk.Label(input_frame, text="阈值:").pack(side=tk.LEFT, padx=(10, 5))
+            threshold_entry = ttk.Entry(input_frame, width=14)
+            threshold_entry.pack(side=tk.LEFT)
         else:
             grid_frame = ttk.Frame(frame)
             grid_frame.pack(fill=tk.X, pady=(5, 5))
@@ -821,6 +2490,28 @@ class CategoryAutoExtractor(tk.Tk):
                                   state=tk.DISABLED, width=10)
             stop_btn.grid(row=1, column=3, sticky="ew", padx=(0, 5), pady=(2, 0))
 
+            ttk.Label(grid_frame, text="引擎:").grid(row=2, column=0, sticky="w", pady=(2, 0))
+            engine_combo = ttk.Combobox(grid_frame, values=list(EXTRACT_ENGINES.values()), state="readonly")
+            engine_combo.grid(row=2, column=1, columnspan=2, sticky="ew", padx=(0, 5), pady=(2, 0))
+            ttk.Label(grid_frame, text="输出:").grid(row=3, column=0, sticky="w", pady=(2, 0))
+            output_combo = ttk.Combobox(grid_frame, values=list(OUTPUT_FORMATS.values()), state="readonly")
+            output_combo.grid(row=3, column=1, columnspan=2, sticky="ew", padx=(0, 5), pady=(2, 0))
+            ttk.Label(grid_frame, text="阈值:").grid(row=4, column=0, sticky="w", pady=(2, 0))
+            threshold_entry = ttk.Entry(grid_frame)
+            threshold_entry.grid(row=4, column=1, columnspan=2, sticky="ew", padx=(0, 5), pady=(2, 0))
+
+        state = self._ensure_session_state(session_id)
+        engine_combo.set(EXTRACT_ENGINES.get(state.extract_engine, EXTRACT_ENGINES["dom"]))
+        engine_combo.bind("<<ComboboxSelected>>",
+                          lambda event, sid=session_id: self.set_session_engine(sid, event.widget.get()))
+        output_combo.set(OUTPUT_FORMATS.get(state.output_format, OUTPUT_FORMATS["excel"]))
+        output_combo.bind("<<ComboboxSelected>>",
+                          lambda event, sid=session_id: self.set_session_output(sid, event.widget.get()))
+        threshold_entry.insert(0, ",".join(f"{value:g}" for value in state.popularity_thresholds))
+        for sequence in ("<Return>", "<FocusOut>"):
+            threshold_entry.bind(sequence,
+                                 lambda event, sid=session_id: self.set_session_thresholds(sid, event.widget.get()))
+
         progress_frame = ttk.Frame(frame)
         progress_frame.pack(fill=tk.X)
         level1_frame = ttk.Frame(progress_frame)
@@ -839,20 +2530,68 @@ class CategoryAutoExtractor(tk.Tk):
         level2_label = ttk.Label(level2_frame, text="0/0", width=8)
         level2_label.pack(side=tk.LEFT)
 
+        queue_label = ttk.Label(progress_frame, text="队列: 领取0 完成0")
+        queue_label.pack(anchor=tk.W)
+
         return {
             "frame": frame,
             "status_var": status_var,
             "pause_btn": pause_btn,
             "stop_btn": stop_btn,
             "entry": entry,
+            "engine_combo": engine_combo,
+            "output_combo": output_combo,
+            "threshold_entry": threshold_entry,
             "level1_progress": level1_progress,
             "level1_label": level1_label,
             "level2_progress": level2_progress,
             "level2_label": level2_label,
+            "queue_label": queue_label,
             "layout_mode": layout_mode,
         }
 
 
+    def set_session_engine(self, session_id, label):
+        """切换指定会话的数据提取引擎"""
+        state = self._ensure_session_state(session_id)
+        engine = next((key for key, text in EXTRACT_ENGINES.items() if text == label), label)
+        if engine not in EXTRACT_ENGINES:
+            self.log_ui(f"未知的提取引擎: {label}")
+            return
+        state.extract_engine = engine
+        self.log_ui(f"窗口{session_id + 1} 提取引擎切换为: {EXTRACT_ENGINES[engine]}")
+        if engine == "cdp" and state.browser and not state.network_capture:
+            self.log_ui(f"窗口{session_id + 1} 当前浏览器未开启网络日志，需重新打开浏览器后网络捕获才生效（此前回退为页面解析）")
+
+    def set_session_output(self, session_id, label):
+        """切换指定会话的结果输出格式（下一个根类目文件起生效）"""
+        state = self._ensure_session_state(session_id)
+        output_format = next((key for key, text in OUTPUT_FORMATS.items() if text == label), label)
+        if output_format not in OUTPUT_FORMATS:
+            self.log_ui(f"未知的输出格式: {label}")
+            return
+        state.output_format = output_format
+        self.log_ui(f"窗口{session_id + 1} 输出格式切换为: {OUTPUT_FORMATS[output_format]}")
+
+    def set_session_thresholds(self, session_id, text):
+        """设置指定会话的搜索人气阈值（下次开始采集时生效）：留空为默认阈值，多个阈值逗号分隔即为多阈值采集"""
+        state = self._ensure_session_state(session_id)
+        try:
+            thresholds = parse_thresholds(text)
+        except ValueError:
+            self.log_ui(f"无法识别的阈值: {text}")
+            return
+        if thresholds == state.popularity_thresholds:
+            return
+        state.popularity_thresholds = thresholds
+        if not thresholds:
+            self.log_ui(f"窗口{session_id + 1} 阈值恢复为默认的 {self.popularity_threshold:g}")
+        elif len(thresholds) == 1:
+            self.log_ui(f"窗口{session_id + 1} 阈值设为 {thresholds[0]:g}")
+        else:
+            self.log_ui(f"窗口{session_id + 1} 多阈值采集: 按 {thresholds[0]:g} 采集，另存阈值 "
+                        f"{'、'.join(f'{value:g}' for value in thresholds[1:])} 的筛选文件")
+
     def update_progress(self, level, current, total):
         """更新当前会话的进度条"""
         state = self._get_active_state()
@@ -1077,11 +2816,15 @@ class CategoryAutoExtractor(tk.Tk):
             chrome_options.add_argument("--disable-dev-shm-usage")
             chrome_options.add_argument(f"--remote-debugging-port={state.port}")
             chrome_options.add_argument(f"--user-data-dir={state.profile_path}")
+            if state.extract_engine == "cdp":
+                # 网络捕获模式：开启性能日志以接收Network事件
+                chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+                chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
 
             # 智能获取或更新 ChromeDriver（仅在版本不匹配时下载）
             driver_path = self.get_or_update_chromedriver()
             service = Service(driver_path)
-            self.browser = webdriver.Chrome(service=service, options=chrome_options)
+            self.browser = CountingChrome(service=service, options=chrome_options)
             self.browser.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
                 "source": """
                     Object.defineProperty(navigator, 'webdriver', {
@@ -1089,8 +2832,15 @@ class CategoryAutoExtractor(tk.Tk):
                     })
                 """
             })
-
-            self.browser.get("https://sycm.taobao.com/")
+            # 验证码哨兵：每个新文档自动安装，检测时只读标志位
+            self.browser.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": CAPTCHA_SENTINEL_JS})
+            # 页面辅助函数库：每个新文档自动安装，之后按名称调用
+            self.browser.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": SYCM_HELPERS_JS})
+            if state.extract_engine == "cdp":
+                self.browser.execute_cdp_cmd("Network.enable", {})
+                state.network_capture = True
+
+            self.browser.get(f"{self.sycm_base_url}/")
             self.log_session(f"浏览器启动成功（端口 {state.port}）")
             self.log_session("请在新窗口中完成登录")
             self.after(0, lambda sid=state.session_id: self.set_session_status(sid, "浏览器已启动，等待登录"))
@@ -1146,8 +2896,7 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_session(f"使用日期: {monday_date}（最近的星期一）")
 
             # 构建带昨天日期的URL
-            yesterday = self.get_yesterday_date()
-            target_url = f"https://sycm.taobao.com/mc/free/search_rank?dateRange={yesterday}%7C{yesterday}&dateType=day&cateId=11&cateFlag=1&parentCateId=50007216"
+            target_url = self.category_url("11", "50007216")
             self.browser.get(target_url)
             if not self.wait_for_work_page_ready():
                 self.after(0, lambda sid=state.session_id: self.set_session_status(sid, "初始化失败"))
@@ -1158,10 +2907,13 @@ class CategoryAutoExtractor(tk.Tk):
 
             # 自动选择50条/页的选项
             self.select_50_via_working_method()
+            self._invalidate_page_cache()
 
             # 打开类目选择器并获取一级类目
             if self.open_category_picker():
                 self.get_categories_by_level(1)
+                if self.prefetch_category_tree:
+                    self.load_category_tree()
                 self.log_session("工作界面准备完成，请输入类目操作指令")
                 self.after(0, lambda sid=state.session_id: self.set_session_status(sid, "初始化完成"))
             else:
@@ -1179,18 +2931,12 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_ui("浏览器未初始化，无法检测页面状态")
             return False
         try:
-            WebDriverWait(self.browser, timeout).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            WebDriverWait(self.browser, timeout).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div.oui-pro-common-picker.isready, div.category-picker"))
-            )
+            if not self.wait_in_page("工作页面就绪", "div.oui-pro-common-picker.isready, div.category-picker",
+                                     timeout=timeout, ready_state=True):
+                self.log_session("等待页面加载超时，请检查网络或重新尝试")
+                return False
             self.log_session("页面加载完成")
             return True
-        except TimeoutException:
-            self.log_session("等待页面加载超时，请检查网络或重新尝试")
-            return False
         except Exception as exc:  # pylint: disable=broad-except
             self.log_session(f"等待页面加载时出错: {exc}")
             self.log_console(traceback.format_exc())
@@ -1214,19 +2960,23 @@ class CategoryAutoExtractor(tk.Tk):
                     css_selector = "." + selector.replace(".", ".")
                     self.log_console(f"使用选择器: {css_selector}")
 
-                    # 等待元素出现并点击
-                    container = WebDriverWait(self.browser, 10).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, css_selector))
-                    )
+                    # 等待元素可点击并点击
+                    container = self.wait_in_page("每页条数下拉框", css_selector, timeout=10,
+                                                  visible=True, return_element=True)
+                    if container is None:
+                        self.log_console(f"选择器 {selector} 等待超时")
+                        continue
                     container.click()
-                    time.sleep(1)  # 等待下拉框展开
 
-                    # 查找并点击50选项
-                    option = WebDriverWait(self.browser, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, "//li[text()='50']"))
-                    )
+                    # 下拉框展开后立即点击50选项
+                    option = self.wait_in_page("每页条数选项", xpath="//li[text()='50']", timeout=10,
+                                               visible=True, return_element=True)
+                    if option is None:
+                        self.log_console("未等到50条/页选项")
+                        continue
                     option.click()
-                    time.sleep(1)
+                    # 等待下拉框收起
+                    self.wait_in_page("每页条数下拉框收起", xpath="//li[text()='50']", timeout=3, gone=True)
 
                     self.log_ui("成功将显示数量设置为50")
                     success = True
@@ -1253,29 +3003,17 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_ui("尝试打开类目选择器...")
 
             # 等待选择器容器出现
-            WebDriverWait(self.browser, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.oui-pro-common-picker, div.category-picker"))
-            )
+            if not self.wait_in_page("类目选择器容器", "div.oui-pro-common-picker, div.category-picker", timeout=15):
+                self.log_ui("等待类目选择器容器超时")
+                return False
 
             # 使用JavaScript打开选择器
-            result = self.browser.execute_script("""
-                var picker = document.querySelector('div.oui-pro-common-picker.isready');
-                if (!picker) {
-                    picker = document.querySelector('div.category-picker');
-                }
-
-                if (!picker) {
-                    return '未找到类目选择器容器';
-                }
-
-                picker.classList.add('open');
-                var event = new Event('change', {bubbles: true});
-                picker.dispatchEvent(event);
-                return 'success';
-            """)
+            result = self.call_helper("openPicker")
 
             if result == 'success':
-                time.sleep(2)
+                # 一级类目列表渲染后即可继续，不再固定等待
+                self.wait_in_page("一级类目列表", "ul.tree-menu.common-menu.tree-scroll-menu-level-1 li.tree-item",
+                                  timeout=5)
                 self.log_ui("类目选择器已打开")
                 return True
             else:
@@ -1322,45 +3060,41 @@ class CategoryAutoExtractor(tk.Tk):
             self.after(0, self._do_update_progress, session_id, 2, 0, 0)
 
     def detect_target_iframe(self, scene="数据提取前"):
-        """检测目标iframe元素，新增自动暂停逻辑"""
+        """读取验证码哨兵标志，检测到验证码iframe时自动暂停（无需等待超时）"""
         if not self.browser:
             self.log_ui(f"[{scene}] 浏览器未初始化，无法检测iframe")
             return False
 
         try:
-            self.log_ui(f"[{scene}] 开始检测目标iframe元素...")
-            iframe_element = WebDriverWait(self.browser, 1).until(
-                EC.presence_of_element_located((
-                    By.XPATH,
-                    '//iframe[@id="baxia-dialog-content" '
-                    'and @frameborder="none" '
-                    'and contains(@src, "https://sycm.taobao.com:443//mc/mq/mkt/keyword/rank.json") '
-                    'and contains(@src, "action=captcha") '
-                    'and contains(@src, "pureCaptcha=")]'
-                ))
-            )
-
-            src = iframe_element.get_attribute("src")
-            self.log_ui(f"[{scene}] ✅ 检测到目标iframe元素!")
-            self.log_ui(f"[{scene}]   id: {iframe_element.get_attribute('id')}")
-            self.log_ui(f"[{scene}]   src(部分): {src[:100]}...")
-
-            # 【新增】检测到iframe后自动暂停提取流程
-            self.log_ui(f"[{scene}] ⏸️ 检测到目标iframe，自动暂停数据提取")
-            self.toggle_pause()  # 调用暂停方法
-
-            return True
-
-        except TimeoutException:
-            self.log_ui(f"[{scene}] ❌ 未找到目标iframe元素（超时）")
-            return False
-        except NoSuchElementException:
-            self.log_ui(f"[{scene}] ❌ 未找到目标iframe元素（元素不存在）")
-            return False
-        except Exception as e:
+            flag = self.browser.execute_script(CAPTCHA_FLAG_JS) or {}
+            if not flag.get("installed"):
+                # 浏览器启动前已打开的文档没有哨兵，补装一次后再读取
+                self.browser.execute_script(CAPTCHA_SENTINEL_JS)
+                flag = self._scan_captcha_iframe()
+        except Exception as e:  # pylint: disable=broad-except
             self.log_ui(f"[{scene}] 检测iframe时发生错误: {str(e)}")
             return False
 
+        if not flag.get("present"):
+            return False
+        self._report_captcha(scene, flag.get("src") or "")
+        return True
+
+    def _scan_captcha_iframe(self):
+        """哨兵刚安装时直接扫描一次页面中已存在的验证码iframe"""
+        src = self.browser.execute_script("""
+            var frame = document.querySelector('iframe#baxia-dialog-content');
+            var src = frame ? (frame.getAttribute('src') || '') : '';
+            return src.indexOf('action=captcha') !== -1 ? src : '';
+        """)
+        return {"installed": True, "present": bool(src), "src": src}
+
+    def _report_captcha(self, scene, src):
+        """记录验证码iframe信息并自动暂停当前会话"""
+        self.log_ui(f"[{scene}] ✅ 检测到目标iframe元素!")
+        self.log_ui(f"[{scene}]   src(部分): {src[:100]}...")
+        self._auto_pause_session(f"[{scene}] 检测到验证码iframe")
+
     def get_categories_by_level(self, level):
         """获取指定层级的类目（优化三级类目加载逻辑）"""
         if not self.browser:
@@ -1370,101 +3104,172 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_ui(f"正在获取第{level}级类目...")
 
             # 等待类目容器加载完成（最长等待15秒）
-            WebDriverWait(self.browser, 15).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, f"ul.tree-menu.common-menu.tree-scroll-menu-level-{level}"))
-            )
+            if not self.wait_in_page(f"第{level}级类目容器",
+                                     f"ul.tree-menu.common-menu.tree-scroll-menu-level-{level}", timeout=15):
+                self.log_ui(f"获取第{level}级类目超时（容器未加载）")
+                return []
 
-            # 针对三级类目增加滚动加载逻辑（解决数量过多时元素未渲染问题）
-            if level == 3:
-                self.log_ui("检测到三级类目，执行滚动加载确保所有元素可见...")
-                # 1. 先滚动到容器底部，触发懒加载
-                self.browser.execute_script("""
-                    var level = arguments[0];
-                    var levelClass = 'tree-scroll-menu-level-' + level;
-                    var containerSelector = 'ul.tree-menu.common-menu.' + levelClass;
-                    var container = document.querySelector(containerSelector);
-
-                    if (container) {
-                        // 记录原始滚动位置
-                        var originalScrollTop = container.scrollTop;
-                        // 滚动到底部
-                        container.scrollTop = container.scrollHeight;
-                        // 等待2秒确保元素加载
-                        setTimeout(() => {}, 2000);
-                        // 滚回原始位置
-                        container.scrollTop = originalScrollTop;
-                    }
-                """, level)
-                # 等待滚动加载完成
-                time.sleep(2)
+            items = self._read_category_items(level)
+            if items is None:
+                return []
 
-            # 使用JavaScript获取类目数据
-            categories = self.browser.execute_script("""
-                var level = arguments[0];
-                var levelClass = 'tree-scroll-menu-level-' + level;
-                var containerSelector = 'ul.tree-menu.common-menu.' + levelClass;
+            # 存储并显示类目数据
+            self.categories[level] = items
+            self.output_categories(level)  # 打印类目列表到日志
 
-                var container = document.querySelector(containerSelector);
-                if (!container) {
-                    return {status: 'error', message: '未找到第' + level + '级类目容器'};
-                }
+            return items
 
-                // 再次滚动确保所有元素已加载（针对三级类目）
-                if (level === 3) {
-                    container.scrollTop = 0;
-                    setTimeout(() => {}, 500);
-                }
+        except Exception as e:
+            self.log_ui(f"获取第{level}级类目时出错: {str(e)}")
+            self.log_console(f"获取类目详细错误: {traceback.format_exc()}")  # 控制台打印详细堆栈
+            return []
 
-                var items = container.querySelectorAll('li.tree-item.common-item');
-                var results = [];
+    def _read_category_items(self, level):
+        """读取页面中第level级类目列表（容器已加载），失败返回None"""
+        # 分步滚动列表直到条目不再增长（虚拟列表/懒加载的三级类目也能一次取全）
+        self._ensure_script_timeout(25)
+        categories = self.call_helper_async("enumerateLevel", level, {"timeoutMs": 20000})
+        if categories.get('status') == 'success':
+            if categories['steps']:
+                self.log_console(f"第{level}级类目滚动枚举：{len(categories['data'])}项，"
+                                 f"滚动{categories['steps']}次，耗时{categories['elapsed']}ms")
+            if not categories['complete']:
+                self.log_ui(f"第{level}级类目枚举超时，可能未取全（已取得{len(categories['data'])}项）")
+
+        # 处理返回结果
+        if categories['status'] != 'success':
+            self.log_ui(f"获取类目失败: {categories['message']}")
+            return None
 
-                for (var i = 0; i < items.length; i++) {
-                    // 获取类目名称（优先使用title属性，无则用文本内容）
-                    var name = items[i].getAttribute('title') || items[i].textContent.trim();
-                    if (name) {
-                        var hasChildren = false;
-
-                        // 针对二级类目，检查是否有三级类目图标
-                        if (level === 2) {
-                            var icon = items[i].querySelector(
-                                'i.anticon.anticon-angle-right.oui-canary-icon.oui-canary-icon-angle-right.sub-tree-icon.sub-common-icon'
-                            );
-                            hasChildren = !!icon; // 存在图标则表示有子类目
-                        }
+        return categories['data']
 
-                        results.push({
-                            name: name,
-                            index: i + 1,  // 索引从1开始
-                            has_children: hasChildren
-                        });
-                    }
-                }
+    def list_categories(self, level):
+        """获取类目列表：已加载类目树时直接从内存读取，否则从页面读取"""
+        state = self._get_active_state()
+        if state.category_tree is not None:
+            if level == 1:
+                items = state.category_tree
+            else:
+                parent = self.selected_categories.get(level - 1)
+                items = parent.get('children') if parent else None
+            if items is not None:
+                self.categories[level] = items
+                self.output_categories(level)
+                return items
+
+        if level == 3 and self.selected_categories.get(2):
+            level2_cat = self.selected_categories[2]
+            self.show_level3_list(level2_cat, level2_cat['index'])
+        return self.get_categories_by_level(level)
+
+    def load_category_tree(self, refresh=False):
+        """加载完整类目树：优先读取本地缓存（按账号与统计日期区分，过期后重新抓取）"""
+        state = self._get_active_state()
+        account = self._account_key()
+        date = self.get_yesterday_date()
+        path = category_tree_cache_path(self.category_cache_dir, account, date)
+        with self.lock:
+            tree_lock = self._category_tree_locks.setdefault(path, threading.Lock())
 
-                return {
-                    status: 'success',
-                    data: results
-                };
-            """, level)
+        # 同一账号的多个窗口同时初始化时只抓取一次，其余窗口等待后直接读取缓存
+        with tree_lock:
+            tree = None if refresh else load_category_tree_cache(path, self.category_tree_ttl_hours)
+            if tree:
+                self.log_session(f"已从缓存加载类目树（{len(tree)}个一级类目）: {os.path.basename(path)}")
+            else:
+                tree = self.crawl_category_tree()
+                if not tree:
+                    self.log_session("类目树抓取失败，继续按页面逐级读取类目")
+                    return None
+                save_category_tree_cache(path, account, date, tree)
+                self.log_session(f"类目树已缓存: {path}")
+
+        state.category_tree = tree
+        self.categories[1] = tree
+        self.output_categories(1)
+        return tree
+
+    def crawl_category_tree(self):
+        """一次性抓取完整类目树（一至三级的名称、序号、是否有子类目与cateId）"""
+        started = time.time()
+        self.log_session("开始抓取完整类目树，首次运行需要几分钟...")
+        if not self.open_category_picker():
+            return None
+        tree = self._read_category_items(1)
+        if not tree:
+            return None
 
-            # 处理返回结果
-            if categories['status'] != 'success':
-                self.log_ui(f"获取类目失败: {categories['message']}")
-                return []
+        node_count = len(tree)
+        for level1_cat in tree:
+            level1_cat['children'] = self._expand_category(1, level1_cat)
+            for level2_cat in level1_cat['children']:
+                level2_cat['children'] = self._expand_category(2, level2_cat) if level2_cat['has_children'] else []
+                for level3_cat in level2_cat['children']:
+                    level3_cat['children'] = []
+                node_count += 1 + len(level2_cat['children'])
+            self.log_console(f"类目树：{level1_cat['name']} 共{len(level1_cat['children'])}个二级类目")
+
+        # 展开类目时点击过类目，表格已不是原先的类目
+        self._invalidate_page_cache()
+        self.log_session(f"类目树抓取完成：共{node_count}个节点，耗时{time.time() - started:.1f}秒")
+        return tree
+
+    def _expand_category(self, level, cat):
+        """在类目选择器中点击类目并读取其下一级列表（只等子列表渲染，不等表格数据）"""
+        child_level = level + 1
+        result = self.call_helper("expandCategory", f"ul.tree-scroll-menu-level-{level} li.tree-item.common-item",
+                                  cat['index'], cat['name'], child_level)
+        if result != 'success':
+            self.log_console(f"展开类目失败（{cat['name']}）: {result}")
+            return []
+        if not self.wait_in_page(f"第{child_level}级类目展开",
+                                 f"ul.tree-scroll-menu-level-{child_level} li.tree-item.common-item"
+                                 f":not([data-sycm-stale])", timeout=5):
+            return []
+        return self._read_category_items(child_level) or []
 
-            # 存储并显示类目数据
-            self.categories[level] = categories['data']
-            self.output_categories(level)  # 打印类目列表到日志
+    def _account_key(self):
+        """当前登录账号标识（用于区分类目树缓存），取不到时返回default"""
+        try:
+            cookies = {cookie['name']: cookie['value'] for cookie in self.browser.get_cookies()}
+        except Exception:  # pylint: disable=broad-except
+            return "default"
+        for name in ("unb", "lgc", "tracknick", "_nk_"):
+            if cookies.get(name):
+                return hashlib.sha1(cookies[name].encode("utf-8")).hexdigest()[:12]
+        return "default"
+
+    def enter_level1(self, level1_cat):
+        """切换到一级类目并准备其二级类目列表：类目树中已有完整cateId时无需操作页面"""
+        level1_idx = level1_cat['index']
+        children = level1_cat.get('children')
+        if self._get_active_state().category_tree is not None and children and all(
+                cat.get('cate_id') for cat in children):
+            # 二级类目均可按地址直接打开，不必在选择器中点击一级类目
+            self.selected_categories[1] = level1_cat
+            self.current_level1_index = level1_idx
+            self.current_level = 2
+            self._invalidate_page_cache(1, level1_idx, level1_cat['name'])
+            return True
 
-            return categories['data']
+        if not self.open_category_picker():
+            self.log_ui("尝试重新打开类目选择器")
+            if not self.open_category_picker():
+                self.log_ui(f"跳过类目（原始序号{level1_idx}）: 无法打开选择器")
+                return False
 
-        except TimeoutException:
-            self.log_ui(f"获取第{level}级类目超时（容器未加载）")
-            return []
-        except Exception as e:
-            self.log_ui(f"获取第{level}级类目时出错: {str(e)}")
-            self.log_console(f"获取类目详细错误: {traceback.format_exc()}")  # 控制台打印详细堆栈
-            return []
+        # 切换到当前一级类目（如果不是当前选中的）
+        if level1_idx != self.current_level1_index:
+            self.log_ui(f"切换到一级类目（原始序号{level1_idx}）: {level1_cat['name']}")
+            if not self.click_category(1, level1_idx, level1_cat['name']):
+                self.log_ui(f"跳过类目（原始序号{level1_idx}）: 点击失败")
+                return False
+            self.current_level1_index = level1_idx
+            time.sleep(2)
+            self.current_level = 2
+            if children is None:
+                self.get_categories_by_level(2)
+        return True
 
     def output_categories(self, level):
         """在UI中显示类目列表"""
@@ -1503,6 +3308,17 @@ class CategoryAutoExtractor(tk.Tk):
 
         self._set_active_session(session_id)
 
+        # "续采 指令"：按断点日志跳过已完成的类目与页面
+        state.resume = input_text.startswith("续采")
+        if state.resume:
+            input_text = input_text[len("续采"):].strip()
+            self.log_session("续采模式：跳过断点日志中已完成的部分")
+
+        if input_text == "刷新类目":
+            self.log_session("重新抓取完整类目树")
+            self._start_processing_task(state, self.load_category_tree, True)
+            return
+
         if "-" in input_text:
             try:
                 start_idx, end_idx = map(int, input_text.split("-"))
@@ -1575,44 +3391,17 @@ class CategoryAutoExtractor(tk.Tk):
             return False
         try:
             selector = f"ul.tree-scroll-menu-level-{level} li.tree-item.common-item"
-            result = self.browser.execute_script("""
-                var sel = arguments[0];
-                var targetIndex = arguments[1];
-                var targetName = arguments[2];
-
-                var items = document.querySelectorAll(sel);
-                if (!items || items.length === 0) {
-                    return '未找到类目列表元素';
-                }
-                if (targetIndex < 1 || targetIndex > items.length) {
-                    return `索引超出范围(共${items.length}项)`;
-                }
-
-                var target = items[targetIndex - 1];
-                if (!target) {
-                    return '无法定位到目标元素';
-                }
-                var title = target.getAttribute('title') || '';
-                var text = target.textContent ? target.textContent.trim() : '';
-                var actual = title || text;
-                if (actual && targetName && actual.trim() !== targetName.trim()) {
-                    return `名称不匹配: ${actual}`;
-                }
-                try {
-                    target.click();
-                } catch (e) {
-                    var evt = new MouseEvent('click', {bubbles: true, cancelable: true, view: window});
-                    target.dispatchEvent(evt);
-                }
-                return 'success';
-            """, selector, index, name)
+            capturing = self._begin_network_capture()
+            result = self.call_helper("clickCategory", selector, index, name)
 
             if result == 'success':
                 self.log_session(f"成功点击第{level}级类目（序号{index}）: {name}")
-                time.sleep(1)
+                self._invalidate_page_cache(level, index, name)
+                self._settle_after_navigation(capturing, 1)
                 return True
 
             self.log_session(f"点击类目失败: {result}")
+            self._invalidate_page_cache()
             self.get_categories_by_level(level)
             return False
 
@@ -1620,6 +3409,87 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_session(f"点击类目出错: {exc}")
             self.log_console(traceback.format_exc())
             return False
+
+    def category_url(self, cate_id, parent_cate_id=None):
+        """构建指定类目的搜索排行页地址（统计日期为昨天）"""
+        yesterday = self.get_yesterday_date()
+        return (f"{self.sycm_base_url}/mc/free/search_rank?dateRange={yesterday}%7C{yesterday}"
+                f"&dateType=day&cateId={cate_id}&cateFlag=1&parentCateId={parent_cate_id or 0}")
+
+    def navigate_to_category(self, level, cat):
+        """按cateId地址直接打开任意层级的类目，无需经过类目选择器逐级点击"""
+        if not self.browser or not cat.get('cate_id'):
+            return False
+
+        capturing = self._begin_network_capture()
+        try:
+            self.browser.get(self.category_url(cat['cate_id'], cat.get('parent_cate_id')))
+        except Exception as exc:  # pylint: disable=broad-except
+            self.log_session(f"跳转类目地址失败: {exc}")
+            return False
+
+        # 表格出现数据行或空数据占位即视为类目页已加载
+        if not self.wait_in_page("类目地址跳转", "tr.ant-table-row, .ant-table-placeholder",
+                                 timeout=15, ready_state=True):
+            self.log_session(f"打开第{level}级类目页面超时: {cat['name']}")
+            return False
+        if not self._page_size_is_50():
+            # 新打开的页面可能恢复为默认每页条数，重新设置后等待第11行出现（不足10条时短暂超时即可）
+            capturing = self._begin_network_capture()
+            self.select_50_via_working_method()
+            if not capturing:
+                self.wait_in_page("每页条数生效", "tr.ant-table-row.oui-table-row-tree-node-11", timeout=3)
+        if capturing:
+            self._await_rank_response()
+
+        self.selected_categories[level] = cat
+        self.log_session(f"已跳转到第{level}级类目（序号{cat['index']}）: {cat['name']}")
+        self._invalidate_page_cache(level, cat['index'], cat['name'])
+        return True
+
+    def open_category(self, level, cat):
+        """进入类目：已知cateId时按地址直接跳转，否则回退为在类目树中点击"""
+        if cat.get('cate_id') and self.navigate_to_category(level, cat):
+            return True
+        if cat.get('cate_id'):
+            self.log_session("按地址跳转失败，改为在类目选择器中点击")
+            self._reveal_category_path(level - 1)
+        if self.click_category(level, cat['index'], cat['name']):
+            self.selected_categories[level] = cat
+            return True
+        return False
+
+    def _reveal_category_path(self, level):
+        """页面经地址跳转后类目选择器已重置：重新打开并逐级点击到指定层级，使其子类目列表可见"""
+        if not self.open_category_picker():
+            return False
+        for depth in range(1, level + 1):
+            cat = self.selected_categories.get(depth)
+            if not cat or not self.click_category(depth, cat['index'], cat['name']):
+                return False
+        return True
+
+    def show_level3_list(self, level2_cat, level2_idx):
+        """让类目选择器显示二级类目下的三级类目列表"""
+        if level2_cat.get('cate_id'):
+            # 二级类目是按地址打开的，选择器已随页面重置，需要重新逐级展开
+            self.selected_categories[2] = level2_cat
+            self._reveal_category_path(2)
+        else:
+            self.click_category(2, level2_idx, level2_cat['name'])
+            time.sleep(2)
+
+    def _page_size_is_50(self):
+        """当前表格是否已是50条/页"""
+        try:
+            return bool(self.browser.execute_script("""
+                var select = document.querySelector('.oui-page-size-select .ant-select-selection-selected-value')
+                    || document.querySelector('.oui-page-size-select');
+                return !!select && /(^|\\D)50(\\D|$)/.test(select.getAttribute('title') || select.textContent);
+            """))
+        except Exception:  # pylint: disable=broad-except
+            return False
+
     def process_level1_range(self, start, end):
         """处理一级类目的范围提取（从start到end）"""
         try:
@@ -1641,18 +3511,11 @@ class CategoryAutoExtractor(tk.Tk):
                     first_valid_cat = cat
                     break
             if first_valid_cat and self.browser:
-                if not self.open_category_picker():
-                    self.log_ui("无法打开类目选择器，程序退出")
-                    return
                 self.log_ui(
                     f"首次点击范围类目中的有效项（原始序号{first_valid_cat['index']}）: {first_valid_cat['name']}")
-                if not self.click_category(1, first_valid_cat['index'], first_valid_cat['name']):
+                if not self.enter_level1(first_valid_cat):
                     self.log_ui("首次点击失败，无法继续")
                     return
-                self.current_level1_index = first_valid_cat['index']
-                time.sleep(2)
-                self.current_level = 2
-                self.get_categories_by_level(2)
 
             # 遍历范围内的一级类目
             processed_count = 0  # 实际处理数（用于进度条）
@@ -1675,23 +3538,9 @@ class CategoryAutoExtractor(tk.Tk):
                 self.update_progress(1, processed_count, total_process)
                 self.log_ui(f"\n===== 开始处理范围类目中的有效项（原始序号{level1_idx}）: {level1_name} =====")
 
-                # 4. 后续原有处理逻辑不变
-                if not self.open_category_picker():
-                    self.log_ui("尝试重新打开类目选择器")
-                    if not self.open_category_picker():
-                        self.log_ui(f"跳过类目（原始序号{level1_idx}）: 无法打开选择器")
-                        continue
-
-                # 切换到当前一级类目
-                if level1_idx != self.current_level1_index:
-                    self.log_ui(f"切换到一级类目（原始序号{level1_idx}）: {level1_name}")
-                    if not self.click_category(1, level1_idx, level1_name):
-                        self.log_ui(f"跳过类目（原始序号{level1_idx}）: 点击失败")
-                        continue
-                    self.current_level1_index = level1_idx
-                    time.sleep(2)
-                    self.current_level = 2
-                    self.get_categories_by_level(2)
+                # 4. 切换到当前一级类目（有类目树时无需操作页面）
+                if not self.enter_level1(level1_cat):
+                    continue
 
                 # 创建Excel文件（用原始序号命名）
                 self.selected_categories[1] = level1_cat
@@ -1731,7 +3580,7 @@ class CategoryAutoExtractor(tk.Tk):
                 try:
                     if self.open_category_picker():
                         self.current_level = 1
-                        self.get_categories_by_level(1)
+                        self.list_categories(1)
                         self.log_ui("已重置到一级类目，请输入新的操作指令")
                     else:
                         self.log_ui("重置失败，请点击'打开界面'重新加载一级类目")
@@ -1756,18 +3605,11 @@ class CategoryAutoExtractor(tk.Tk):
                     first_valid_cat = cat
                     break
             if first_valid_cat and self.browser:
-                if not self.open_category_picker():
-                    self.log_ui("无法打开类目选择器，程序退出")
-                    return
                 # 点击第一个有效类目初始化
                 self.log_ui(f"首次点击一级类目（原始序号{first_valid_cat['index']}）: {first_valid_cat['name']}")
-                if not self.click_category(1, first_valid_cat['index'], first_valid_cat['name']):
+                if not self.enter_level1(first_valid_cat):
                     self.log_ui("首次点击失败，无法继续")
                     return
-                self.current_level1_index = first_valid_cat['index']
-                time.sleep(2)
-                self.current_level = 2
-                self.get_categories_by_level(2)
 
             # 遍历所有一级类目
             processed_count = 0  # 记录实际处理的数量（用于进度条）
@@ -1790,23 +3632,9 @@ class CategoryAutoExtractor(tk.Tk):
                 self.update_progress(1, processed_count, total_process)
                 self.log_ui(f"\n===== 开始处理一级类目（原始序号{level1_idx}）: {level1_name} =====")
 
-                # 4. 后续原有处理逻辑（点击类目、处理二级类目等）不变
-                if not self.open_category_picker():
-                    self.log_ui("尝试重新打开类目选择器")
-                    if not self.open_category_picker():
-                        self.log_ui(f"跳过类目（原始序号{level1_idx}）: 无法打开选择器")
-                        continue
-
-                # 切换到当前一级类目（如果不是当前选中的）
-                if level1_idx != self.current_level1_index:
-                    self.log_ui(f"切换到一级类目（原始序号{level1_idx}）: {level1_name}")
-                    if not self.click_category(1, level1_idx, level1_name):
-                        self.log_ui(f"跳过类目（原始序号{level1_idx}）: 点击失败")
-                        continue
-                    self.current_level1_index = level1_idx
-                    time.sleep(2)
-                    self.current_level = 2
-                    self.get_categories_by_level(2)
+                # 4. 切换到当前一级类目（有类目树时无需操作页面）
+                if not self.enter_level1(level1_cat):
+                    continue
 
                 # 创建Excel文件（用原始序号命名）
                 self.selected_categories[1] = level1_cat
@@ -1847,92 +3675,84 @@ class CategoryAutoExtractor(tk.Tk):
                 try:
                     if self.open_category_picker():
                         self.current_level = 1
-                        self.get_categories_by_level(1)
+                        self.list_categories(1)
                         self.log_ui("已重置到一级类目，请输入新的操作指令")
                     else:
                         self.log_ui("重置失败，请点击'打开界面'重新加载一级类目")
                 except Exception as e:
                     self.log_ui(f"重置到一级类目时出错: {str(e)}")
 
-    def process_assigned_categories(self, assigned_indices):
-        """处理指定编号的一级类目集合"""
+    def process_assigned_categories(self, task_queue):
+        """从群控共享队列中循环领取任务（整个一级类目或其下的二、三级任务单元）并处理，直到队列为空"""
+        state = self._get_active_state()
+        session_id = state.session_id if state else 0
+        failures = 0
         try:
-            if not assigned_indices:
-                self.log_ui("未提供需要处理的类目编号")
-                return
-
-            order_map = {idx: pos for pos, idx in enumerate(assigned_indices)}
-            level1_cats = [
-                cat for cat in self.categories[1]
-                if cat['index'] in order_map and cat['index'] not in self.exclude_level1_serials
-            ]
-            if not level1_cats:
-                self.log_ui("当前列表中未找到指定的一级类目")
-                return
-
-            level1_cats.sort(key=lambda cat: order_map[cat['index']])
-            total_process = len(level1_cats)
-            self.log_ui(f"开始处理指定的{total_process}个一级类目: {assigned_indices}")
-            self.update_progress(1, 0, total_process)
-
-            first_valid_cat = level1_cats[0]
-            if self.browser:
-                if not self.open_category_picker():
-                    self.log_ui("无法打开类目选择器，终止处理")
-                    return
-                if not self.click_category(1, first_valid_cat['index'], first_valid_cat['name']):
-                    self.log_ui("首次点击类目失败，终止处理")
-                    return
-                self.current_level1_index = first_valid_cat['index']
-                time.sleep(2)
-                self.current_level = 2
-                self.get_categories_by_level(2)
-
-            processed_count = 0
-            for level1_cat in level1_cats:
-                if self.stop_event.is_set():
-                    self.log_ui("检测到停止指令，结束当前窗口任务")
-                    break
-
-                level1_idx = level1_cat['index']
-                level1_name = level1_cat['name']
-
-                processed_count += 1
-                self.update_progress(1, processed_count, total_process)
-                self.log_ui(f"\n===== 开始处理指定类目（原始序号{level1_idx}）: {level1_name} =====")
-
-                if not self.open_category_picker():
-                    self.log_ui("类目选择器加载失败，尝试重新打开")
-                    if not self.open_category_picker():
-                        self.log_ui("仍无法打开类目选择器，跳过该类目")
-                        continue
-
-                if level1_idx != self.current_level1_index:
-                    self.log_ui(f"切换到一级类目（原始序号{level1_idx}）: {level1_name}")
-                    if not self.click_category(1, level1_idx, level1_name):
-                        self.log_ui("切换类目失败，跳过该类目")
-                        continue
-                    self.current_level1_index = level1_idx
-                    time.sleep(2)
-                    self.current_level = 2
-                    self.get_categories_by_level(2)
+            self.log_ui(f"开始从共享队列领取任务（共{task_queue.total}个）")
+            self._update_queue_progress(task_queue)
+            # 续采时可能有一级类目的单元此前已全部完成，只差合并写入
+            self._write_ready_results(task_queue)
+            while not self.stop_event.is_set():
+                task = task_queue.claim(session_id)
+                if task is None:
+                    if task_queue.drained():
+                        self.log_ui("共享队列已空，当前窗口任务结束")
+                        break
+                    # 其他窗口仍在处理，可能拆分出新单元或退回失败任务
+                    time.sleep(1)
+                    continue
+                self._update_queue_progress(task_queue)
 
-                self.selected_categories[1] = level1_cat
-                self.current_excel_root = self.create_root_excel_file(level1_idx, level1_name)
-                self.open_excel_file()
-                self._reset_collected_data()
+                rows = None
+                try:
+                    if task['level2'] is None:
+                        entered = self._process_level1_task(task['level1'], task_queue.total)
+                    else:
+                        entered = self._process_task_unit(task_queue, task)
+                        rows = self.collected_data
+                        self._reset_collected_data()
+                except PageNavigationError as e:
+                    # 已收集的部分不写出，整个任务退回队列重新采集
+                    self.log_ui(f"{e}，任务未完成")
+                    self._reset_collected_data()
+                    entered = False
 
-                self.process_level1_category(level1_idx, total_level1=total_process)
+                if not entered:
+                    failures += 1
+                    if task_queue.release(session_id, task):
+                        self.log_ui("切换类目或翻页失败，已退回队列由其他窗口处理")
+                    else:
+                        self.log_ui(f"任务（一级类目{task['level1']['index']}）多次切换类目或翻页失败，放弃该任务")
+                    self._write_ready_results(task_queue)
+                    if failures >= 3:
+                        self.log_ui("当前窗口连续切换类目或翻页失败，停止领取任务")
+                        break
+                    continue
+                failures = 0
 
                 if self.stop_event.is_set():
                     self._reset_collected_data()
-                else:
+                    break
+                if task['level2'] is None:
                     self._flush_collected_data()
+                task_queue.finish(session_id, task, rows)
+                self._write_ready_results(task_queue)
+                self._update_queue_progress(task_queue)
 
         except Exception as e:
             self.log_ui(f"处理指定一级类目时发生错误: {str(e)}")
             self.log_console(traceback.format_exc())
         finally:
+            returned, dropped = task_queue.release_all(session_id)
+            if returned:
+                self.log_ui(f"已将未完成的{returned}个任务退回共享队列")
+            if dropped:
+                self.log_ui(f"{dropped}个未完成的任务已多次失败，放弃这些任务")
+                try:
+                    self._write_ready_results(task_queue)
+                except Exception as e:  # pylint: disable=broad-except
+                    self.log_ui(f"合并写入已结束的一级类目时出错: {str(e)}")
+            self._update_queue_progress(task_queue)
             with self.lock:
                 self.processing = False
                 self.paused = False
@@ -1944,11 +3764,172 @@ class CategoryAutoExtractor(tk.Tk):
                 try:
                     if self.open_category_picker():
                         self.current_level = 1
-                        self.get_categories_by_level(1)
+                        self.list_categories(1)
                         self.log_ui("指定类目处理完成，已回到一级类目列表")
                 except Exception as e:
                     self.log_ui(f"重置一级类目时发生错误: {str(e)}")
 
+    def _process_level1_task(self, level1_cat, total_level1):
+        """整个一级类目作为一个任务：边采集边写入其根类目表格，切换类目失败返回False"""
+        level1_idx = level1_cat['index']
+        level1_name = level1_cat['name']
+        self.log_ui(f"\n===== 领取并开始处理类目（原始序号{level1_idx}）: {level1_name} =====")
+
+        if not self.enter_level1(level1_cat):
+            return False
+
+        self.selected_categories[1] = level1_cat
+        self.current_excel_root = self.create_root_excel_file(level1_idx, level1_name)
+        self.open_excel_file()
+        self._reset_collected_data()
+
+        self.process_level1_category(level1_idx, total_level1=total_level1)
+        return True
+
+    def _process_task_unit(self, task_queue, task):
+        """处理二级或三级任务单元：数据只收集在内存中，由队列在该一级类目全部完成后统一合并写入"""
+        level1_cat, level2_cat, level3_cat = task['level1'], task['level2'], task['level3']
+        path = " > ".join(cat['name'] for cat in (level1_cat, level2_cat, level3_cat) if cat)
+        self.log_ui(f"\n----- 领取任务单元: {path} -----")
+
+        # 多个窗口共用同一个根类目表格，单元数据不直接写表
+        self.current_excel_root = ""
+        self._reset_collected_data()
+        if self.selected_categories.get(1) is not level1_cat:
+            if not self.enter_level1(level1_cat):
+                return False
+            self.selected_categories[1] = level1_cat
+
+        cost_start = self._cost_begin()
+        if level3_cat is None:
+            if not self.open_category(2, level2_cat):
+                return False
+            deferred = []
+            if level2_cat['has_children']:
+                def defer(level3_cats):
+                    deferred.append(self._defer_level3_units(task_queue, task, level3_cats))
+                    return deferred[-1]
+                self.process_secondary_with_tertiary(level2_cat, level2_cat['index'], defer_tertiary=defer)
+            else:
+                self.process_secondary_without_tertiary()
+            self._cost_end([level1_cat, level2_cat], cost_start, partial=any(deferred))
+            return True
+
+        self.selected_categories[2] = level2_cat
+        self.detect_target_iframe()
+        if not self.open_category(3, level3_cat):
+            return False
+        self._get_active_state().level3_visited += 1
+        self.collect_data_across_pages()
+        self._cost_end([level1_cat, level2_cat, level3_cat], cost_start)
+        return True
+
+    def _defer_level3_units(self, task_queue, task, level3_cats):
+        """二级类目需逐个处理三级类目时，把三级类目拆成新单元放回队首；三级类目缺少cateId时返回False就地处理"""
+        if not all(cat.get('cate_id') for cat in level3_cats):
+            return False
+        date = self.get_yesterday_date()
+        pending, done = [], []
+        for level3_cat in level3_cats:
+            unit = {"level1": task['level1'], "level2": task['level2'], "level3": level3_cat}
+            key = self._journal_key([task['level1'], task['level2'], level3_cat])
+            if self._get_active_state().resume and self.crawl_journal.is_done(date, key):
+                done.append((unit, self.crawl_journal.output_rows(date, key)))
+            else:
+                pending.append(unit)
+        task_queue.add_front(pending, done=done)
+        self.log_ui(f"已将{len(pending)}个三级类目拆分为任务单元放回队列"
+                    + (f"（{len(done)}个已完成）" if done else ""))
+        self._update_queue_progress(task_queue)
+        return True
+
+    def _write_ready_results(self, task_queue):
+        """把所有单元都已结束的一级类目按类目树顺序合并写入其根类目表格"""
+        for group in task_queue.pop_ready():
+            level1_cat = group["level1"]
+            rows = merge_row_parts(part for _, part in group["parts"])
+            if group["dropped"]:
+                self.log_ui(f"一级类目 {level1_cat['name']} 有{group['dropped']}个任务单元多次失败，合并结果不完整")
+            excel_path = self.create_root_excel_file(level1_cat['index'], level1_cat['name'])
+            if not excel_path:
+                continue
+            self.current_excel_root = excel_path
+            self.save_page_data_to_excel_fallback(rows, commit=True)
+            self._write_threshold_views(rows, commit=True)
+            self.current_excel_root = ""
+            self.crawl_journal.mark_done(self.get_yesterday_date(), self._journal_key([level1_cat]))
+            self.log_ui(f"一级类目（原始序号{level1_cat['index']}）{level1_cat['name']} 的"
+                        f"{len(group['parts'])}个任务单元已全部完成，合并写入{len(rows)}条数据")
+
+    def _cost_begin(self):
+        """记录采集开始时的计数，配合_cost_end计算该类目的成本"""
+        state = self._get_active_state()
+        return time.time(), state.page_extractions, state.level3_visited, state.rows_collected
+
+    def _cost_end(self, cats, started, partial=False):
+        """类目采集结束：写入成本历史，并在断点日志中标记该类目已完成（被停止的采集不记录）
+
+        partial=True表示其三级类目已拆分给其他任务单元，记录只包含二级类目自身的部分，不标记完成。
+        """
+        if self.stop_event.is_set():
+            return
+        state = self._get_active_state()
+        began, pages, level3, rows = started
+        date = self.get_yesterday_date()
+        self.cost_model.record(category_path_key(cats), date,
+                               pages=state.page_extractions - pages, level3=state.level3_visited - level3,
+                               rows=state.rows_collected - rows, seconds=time.time() - began, partial=partial)
+        if not partial:
+            # 与该类目的输出记录经同一写出队列提交，完成标记不会先于数据落盘
+            self._record_journal(self.crawl_journal.mark_done, date, self._journal_key(cats))
+
+    def _journal_key(self, cats=None):
+        """断点日志中的类目路径键；cats为None时取当前页面所在的类目路径"""
+        if cats is None:
+            names = [item[1] for item in self._get_active_state().category_path if item]
+        else:
+            names = [cat['name'] for cat in cats if cat]
+        return journal_key(names)
+
+    def _journal_done(self, cats):
+        """续采模式下该类目（或其上级类目）已在断点日志中标记完成"""
+        return self._get_active_state().resume and self.crawl_journal.is_done(
+            self.get_yesterday_date(), self._journal_key(cats))
+
+    def _prepare_level1_journal(self, level1_cat):
+        """开始一级类目：续采时把已完成部分的数据写回根类目表格并返回整个一级类目是否已完成，否则清空其旧记录"""
+        date = self.get_yesterday_date()
+        if not self._get_active_state().resume:
+            self.crawl_journal.reset(date, level1_cat['name'])
+            return False
+        rows = self.crawl_journal.restore_level1(date, level1_cat['name'])
+        if rows:
+            self._write_async(rows)
+            self.log_ui(f"续采：已从断点日志恢复{len(rows)}条已完成类目的数据")
+        if self.crawl_journal.is_done(date, self._journal_key([level1_cat])):
+            self.log_ui(f"续采：一级类目 {level1_cat['name']} 已全部完成，跳过")
+            return True
+        return False
+
+    def _save_cost_model(self):
+        try:
+            self.cost_model.save()
+        except OSError as exc:
+            self.log_console(f"保存采集成本历史失败: {exc}")
+
+    def _update_queue_progress(self, task_queue):
+        """刷新当前窗口的队列领取/完成数及整体一级进度"""
+        state = self._get_active_state()
+        session_id = state.session_id if state else None
+        claimed, finished, finished_total = task_queue.counts(session_id)
+        self.update_progress(1, finished_total, task_queue.total)
+        self.after(0, self._do_update_queue_label, session_id, claimed, finished)
+
+    def _do_update_queue_label(self, session_id, claimed, finished):
+        panel = getattr(self, "session_panels", {}).get(session_id)
+        if panel and panel.get("queue_label"):
+            panel["queue_label"]["text"] = f"队列: 领取{claimed} 完成{finished}"
+
     def process_category_data(self):
         """处理类目数据提取"""
         try:
@@ -1995,21 +3976,8 @@ class CategoryAutoExtractor(tk.Tk):
         self.log_ui("检查第一页是否有小于150的搜索人气...")
 
         try:
-            # 记录当前页码
-            current_page = self.get_current_page_number()
-
-            # 如果不在第一页，跳转到第一页
-            if current_page != 1:
-                self.log_ui("跳转到第一页")
-                if not self.click_page_number(1):
-                    self.log_ui("跳转至第一页失败，使用当前页进行检查")
-                    return False
-
-                time.sleep(1)
-
-            # 提取第一页数据
-            page_data, found_low_value = self.extract_data_from_page()
-
+            # 提取第一页数据（同一类目下已提取过则直接复用缓存）
+            _, found_low_value = self.get_page_data(1)
             return found_low_value
 
         except Exception as e:
@@ -2021,34 +3989,16 @@ class CategoryAutoExtractor(tk.Tk):
         self.log_ui("检查最后一页是否有小于150的搜索人气...")
 
         try:
-            # 记录当前页码
-            current_page = self.get_current_page_number()
-
             # 获取最大页数
             max_page = self.get_max_page_number()
 
-            if max_page and max_page > current_page:
-                self.log_ui(f"检测到最大页数为: {max_page}，跳转到最后一页")
-
-                # 跳转到最大页码
-                if not self.click_page_number(max_page):
-                    self.log_ui("跳转至最大页码失败，使用备选方案")
-                    return False
-
-                time.sleep(1)
-
-                # 提取最后一页数据
-                page_data, found_low_value = self.extract_data_from_page()
-
-                # 回到第一页
-                self.click_page_number(1)
-                time.sleep(1)
-
+            if max_page and max_page > 1:
+                self.log_ui(f"检测到最大页数为: {max_page}，检查最后一页")
+                _, found_low_value = self.get_page_data(max_page)
                 return found_low_value
             else:
-                self.log_ui("当前已是最后一页或无法获取最大页数，直接检查当前页")
-                # 直接检查当前页
-                _, found_low_value = self.extract_data_from_page()
+                self.log_ui("当前已是最后一页或无法获取最大页数，直接检查第一页")
+                _, found_low_value = self.get_page_data(1)
                 return found_low_value
 
         except Exception as e:
@@ -2059,9 +4009,12 @@ class CategoryAutoExtractor(tk.Tk):
         """处理一级类目下的二级类目（强化停止检查）"""
         try:
             level1_cat = self.selected_categories[1]
+            cost_start = self._cost_begin()
+            if self._prepare_level1_journal(level1_cat):
+                return
 
             self.current_level = 2
-            level2_cats = self.get_categories_by_level(2)
+            level2_cats = self.list_categories(2)
             total_level2 = len(level2_cats)
 
             # 初始化二级进度条
@@ -2069,10 +4022,16 @@ class CategoryAutoExtractor(tk.Tk):
 
             if not level2_cats:
                 self.log_ui("该一级类目下没有二级类目，直接提取数据")
-                if not self.collect_data_across_pages():
-                    self.log_ui("当前类目数据为空")
+                try:
+                    if not self.collect_data_across_pages():
+                        self.log_ui("当前类目数据为空")
+                except PageNavigationError as e:
+                    self.log_ui(f"{e}，该一级类目未完成，不记入断点日志，续采时重新采集")
+                    return
+                self._cost_end([level1_cat], cost_start)
                 return
 
+            incomplete = 0
             for level2_idx, level2_cat in enumerate(level2_cats, 1):
                 # 每次循环最开始检查停止指令（优先响应）
                 if self.stop_event.is_set():
@@ -2083,7 +4042,12 @@ class CategoryAutoExtractor(tk.Tk):
                 self.update_progress(2, level2_idx, total_level2)
                 self.log_ui(f"\n===== 开始处理第{level2_idx}个二级类目: {level2_cat['name']} =====")
 
-                if not self.click_category(2, level2_idx, level2_cat['name']):
+                if self._journal_done([level1_cat, level2_cat]):
+                    self.log_ui("续采：该二级类目已完成，跳过")
+                    continue
+
+                level2_start = self._cost_begin()
+                if not self.open_category(2, level2_cat):
                     continue
 
                 # 处理二级类目之前再次检查
@@ -2091,115 +4055,264 @@ class CategoryAutoExtractor(tk.Tk):
                     self.log_ui("检测到结束指令，不处理当前二级类目")
                     return
 
-                if level2_cat['has_children']:
-                    self.process_secondary_with_tertiary(level2_cat, level2_idx)
-                else:
-                    self.process_secondary_without_tertiary()
+                try:
+                    if level2_cat['has_children']:
+                        self.process_secondary_with_tertiary(level2_cat, level2_idx)
+                    else:
+                        self.process_secondary_without_tertiary()
+                except PageNavigationError as e:
+                    # 翻页失败不能当作数据到头：放弃该二级类目且不标记完成，续采时重新采集
+                    incomplete += 1
+                    self.log_ui(f"{e}，第{level2_idx}个二级类目未完成，不记入断点日志，继续下一个二级类目")
+                    continue
+                self._cost_end([level1_cat, level2_cat], level2_start)
 
+            if incomplete:
+                self.log_ui(f"该一级类目有{incomplete}个二级类目因翻页失败未完成，续采时重新采集")
+            self._cost_end([level1_cat], cost_start, partial=bool(incomplete))
 
         finally:
-            # 只有正常结束（非强制停止）才执行重置
+            # 只有正常结束（非强制停止）才执行重置；一级类目列表不会变化，直接沿用内存中的列表
             if not self.stop_event.is_set():
                 self.current_level = 1
-                if self.browser and self.open_category_picker():
-                    self.get_categories_by_level(1)
 
             # 处理完一个一级类目后重置二级进度条
             if not self.stop_event.is_set():
                 self.update_progress(2, 0, 0)
 
-    def process_secondary_with_tertiary(self, level2_cat, level2_idx):
-        """处理有三级类目的二级类目（增加密集检查点）"""
+    def process_secondary_with_tertiary(self, level2_cat, level2_idx, defer_tertiary=None):
+        """处理有三级类目的二级类目（增加密集检查点）
+
+        需要逐个处理三级类目时，若defer_tertiary(三级类目列表)返回True则交由其处理（群控拆分为任务单元）。
+        """
         # 检查1：开始处理前
         if not self.check_pause_state():
             return
 
-        self.log_ui("检查当前二级类目是否有数据...")
-        page_data, _ = self.extract_data_from_page()
-        if not page_data:  # 如果数据为空
-            self.log_ui("当前二级类目数据为空，跳过其下三级类目，直接处理下一个二级类目")
-            return  # 直接返回，不处理三级类目
-
         self.log_ui("三级类目数据提取前，检测目标iframe...")
         self.detect_target_iframe()
 
-        # 先检查第一页是否有<150的数据
-        has_low_value_first = self.check_first_page_for_low_value()
+        # 利用人气降序判断处理方式：第一页、最后一页与截止页经页面缓存都只加载一次
+        decision, pages = self.locate_secondary_cutoff()
+
+        if decision == "empty":
+            self.log_ui("当前二级类目数据为空，跳过其下三级类目，直接处理下一个二级类目")
+            return
 
-        if has_low_value_first:
+        if decision == "collect":
             # 检查2：提取数据前
             if not self.check_pause_state():
                 return
-
-            # 第一页有低价值数据：只提取当前页
-            self.log_ui("第一页发现小于150的搜索人气，仅提取当前页数据")
-            page_data, _ = self.extract_data_from_page()
-            filtered_data = [item for item in page_data if item['search_popularity'] >= self.min_popularity_threshold]
-            if filtered_data:
-                self._append_collected_data(filtered_data)
+            self.collect_located_pages(pages)
             return
 
-        # 检查3：切换到检查最后一页前
+        # 检查5：处理三级类目前置检查
         if not self.check_pause_state():
             return
 
-        # 第一页没有低价值数据：检查最后一页
-        has_low_value_last = self.check_last_page_for_low_value()
+        # 最后一页也没有低价值数据：处理所有三级类目
+        self.log_ui("未检测到小于150的搜索人气，开始处理所有三级类目")
 
-        if has_low_value_last:
-            # 检查4：开始提取数据前
-            if not self.check_pause_state():
-                return
+        # 获取三级类目（有类目树时直接读取，否则再次点击二级类目显示其下的三级类目）
+        self.current_level = 3
+        self.selected_categories[2] = level2_cat
+        level3_cats = self.list_categories(3)
 
-            # 最后一页有低价值数据：从第一页开始提取，直到遇到<150
-            self.log_ui("最后一页发现小于150的搜索人气")
-            self.collect_data_until_low_value()
+        if level3_cats and defer_tertiary and defer_tertiary(level3_cats):
+            self.current_level = 2
             return
-        else:
-            # 检查5：处理三级类目前置检查
-            if not self.check_pause_state():
-                return
 
-            # 最后一页也没有低价值数据：处理所有三级类目
-            self.log_ui("未检测到小于150的搜索人气，开始处理所有三级类目")
+        if level3_cats:
+            for level3_idx, level3_cat in enumerate(level3_cats, 1):
+                # 检查6：处理每个三级类目前置检查
+                if not self.check_pause_state():
+                    break
+                if self.stop_event.is_set():
+                    break
 
-            # 再次点击二级类目确保显示其下的三级类目
-            self.click_category(2, level2_idx, level2_cat['name'])
-            time.sleep(2)
+                self.log_ui(f"\n----- 开始处理第{level3_idx}个三级类目: {level3_cat['name']} -----")
+                if self._journal_done([self.selected_categories[1], level2_cat, level3_cat]):
+                    self.log_ui("续采：该三级类目已完成，跳过")
+                    continue
 
-            # 获取三级类目
-            self.current_level = 3
-            level3_cats = self.get_categories_by_level(3)
+                self.log_ui(f"第{level3_idx}个三级类目提取前，检测目标iframe...")
+                self.detect_target_iframe()
 
-            if level3_cats:
-                for level3_idx, level3_cat in enumerate(level3_cats, 1):
-                    # 检查6：处理每个三级类目前置检查
-                    if not self.check_pause_state():
-                        break
-                    if self.stop_event.is_set():
-                        break
+                # 进入三级类目（已知cateId时按地址直接跳转）
+                level3_start = self._cost_begin()
+                if not self.open_category(3, level3_cat):
+                    continue
 
-                    self.log_ui(f"\n----- 开始处理第{level3_idx}个三级类目: {level3_cat['name']} -----")
+                # 检查7：提取三级类目数据前
+                if not self.check_pause_state():
+                    break
 
-                    self.log_ui(f"第{level3_idx}个三级类目提取前，检测目标iframe...")
-                    self.detect_target_iframe()
+                # 提取三级类目数据（最多6页，遇<150则停）
+                self._get_active_state().level3_visited += 1
+                self.collect_data_across_pages()
+                self._cost_end([self.selected_categories[1], level2_cat, level3_cat], level3_start)
 
-                    # 点击三级类目
-                    if not self.click_category(3, level3_idx, level3_cat['name']):
-                        continue
+            # 恢复到二级类目层级
+            self.current_level = 2
+        else:
+            self.log_ui("该二级类目下没有三级类目，提取当前二级类目数据")
+            self.collect_data_across_pages()
+
+    def locate_secondary_cutoff(self):
+        """判断二级类目的处理方式：返回(决策, 需收集的页码)
+
+        决策为empty（无数据）、collect（收集pages中的页）或descend（最后一页仍无低价值数据，处理三级类目）。
+        """
+        rows, found_low_value = self.get_page_data(1)
+        if not rows:
+            return "empty", []
+        if found_low_value:
+            self.log_ui("第一页发现小于150的搜索人气，仅提取当前页数据")
+            return "collect", [1]
+
+        last_page = self.get_max_page_number() or 1
+        if last_page > 1:
+            self.log_ui(f"检测到最大页数为: {last_page}，检查最后一页")
+            rows, found_low_value = self.get_page_data(last_page)
+        if not found_low_value:
+            return "descend", []
+
+        # 最后一页有低价值数据：截止页之前的页都要收集，从第一页逐页收集到截止页即可，
+        # 额外探测中间页只会多加载截止页之后的页
+        upper = min(last_page, self.max_pages)
+        self.log_ui("最后一页发现小于150的搜索人气，从第一页逐页收集至截止页")
+        return "collect", list(range(1, upper + 1))
+
+    def collect_located_pages(self, pages):
+        """逐页收集pages中的页面数据，判断阶段已加载过的页由页面缓存直接复用"""
+        total_collected = 0
+        for page in pages:
+            self.check_pause_state()
+            if self.stop_event.is_set():
+                return False
 
-                    # 检查7：提取三级类目数据前
-                    if not self.check_pause_state():
-                        break
+            page_data, found_low_value = self.get_page_data(page)
+            if not page_data:
+                self.log_ui(f"第 {page} 页未提取到任何数据")
+                break
 
-                    # 提取三级类目数据（最多6页，遇<150则停）
-                    self.collect_data_across_pages()
+            filtered_data, _ = split_rows_by_threshold(page_data, self.min_popularity_threshold)
+            total_collected += len(filtered_data)
+            self.log_ui(f"第 {page} 页，筛选出 {len(filtered_data)} 条符合条件的数据")
+            if filtered_data:
+                self._append_collected_data(filtered_data, page)
 
-                # 恢复到二级类目层级
-                self.current_level = 2
-            else:
-                self.log_ui("该二级类目下没有三级类目，提取当前二级类目数据")
-                self.collect_data_across_pages()
+            if found_low_value:
+                self.log_ui(f"在第 {page} 页发现小于 {self.min_popularity_threshold} 的搜索人气，停止提取")
+                break
+
+        self.log_ui(f"共收集到 {total_collected} 条符合条件的数据")
+        return total_collected > 0
+
+    def get_page_data(self, page=None):
+        """带缓存的页面数据：同一类目路径下的同一页只提取一次，未缓存时按需跳转页码
+
+        跳转失败时抛出PageNavigationError，不返回空页，避免调用方把翻页失败误判为数据到头。
+        """
+        state = self._get_active_state()
+        page = page or state.current_page
+        key = state.category_path + (page,)
+        cached = state.page_cache.get(key)
+        if cached is not None:
+            state.page_cache_hits += 1
+            return list(cached[0]), cached[1]
+
+        if state.resume:
+            journaled = self.crawl_journal.page(self.get_yesterday_date(), self._journal_key(), page)
+            if journaled is not None:
+                # 中断前已提取过的页直接取断点日志，不再跳转页码
+                state.journal_hits += 1
+                state.page_cache[key] = journaled
+                return list(journaled[0]), journaled[1]
+
+        commands_before = self._command_count()
+        page_data = None
+        if state.extract_engine == "rankjson":
+            # 接口直取模式直接请求该页，无需跳转
+            page_data, found_low_value = self._extract_page_via_rank_api(page)
+        if page_data is None:
+            if state.current_page != page and not self._goto_page(page):
+                self.log_ui(f"跳转至第{page}页失败（当前在第{state.current_page}页）")
+                raise PageNavigationError(page)
+            page_data, found_low_value = self.extract_data_from_page()
+
+        state.page_extractions += 1
+        commands = self._command_count() - commands_before
+        state.page_commands += commands
+        self.log_console(f"第{page}页提取共发出 {commands} 条WebDriver命令")
+        if page_data:
+            # 空结果不缓存，避免页面未渲染完成时的误判被复用
+            state.page_cache[key] = (list(page_data), found_low_value)
+            self._record_journal(self.crawl_journal.record_page, self.get_yesterday_date(), self._journal_key(),
+                                 page, list(page_data), found_low_value)
+        return page_data, found_low_value
+
+    def _invalidate_page_cache(self, level=None, index=None, name=None):
+        """切换类目后清空页面缓存，并记录新的类目路径（表格回到第一页）"""
+        state = self._get_active_state()
+        if level is not None:
+            path = list(state.category_path)
+            path[level - 1] = (index, name)
+            for deeper in range(level, 3):
+                path[deeper] = None
+            state.category_path = tuple(path)
+        state.page_cache.clear()
+        state.current_page = 1
+        state.last_snapshot = None
+
+    def _reset_page_cache_stats(self):
+        state = self._get_active_state()
+        state.page_cache_hits = 0
+        state.journal_hits = 0
+        state.page_extractions = 0
+        state.page_commands = 0
+        state.pipeline_metrics = {}
+
+    def _log_page_cache_summary(self):
+        """运行结束时输出页面缓存的命中统计"""
+        state = self._get_active_state()
+        if state.page_cache_hits or state.page_extractions:
+            self.log_session(
+                f"页面缓存：实际提取 {state.page_extractions} 页，命中 {state.page_cache_hits} 次"
+                f"（避免 {state.page_cache_hits} 次重复提取）")
+        if state.journal_hits:
+            self.log_session(f"断点日志：续采复用已提取的 {state.journal_hits} 页")
+        if state.page_extractions:
+            self.log_session(
+                f"WebDriver命令：共 {state.page_commands} 条，"
+                f"平均每页 {state.page_commands / state.page_extractions:.1f} 条")
+        if state.pipeline_metrics:
+            self.log_session("分页流水线各阶段：")
+            for name in PagePipeline.STAGES:
+                if name in state.pipeline_metrics:
+                    self.log_session("  " + state.pipeline_metrics[name].describe(PagePipeline.STAGE_NAMES[name]))
+
+    def _command_count(self):
+        """当前浏览器累计发出的WebDriver命令数（非计数驱动时返回0）"""
+        return getattr(self.browser, "command_count", 0)
+
+    def _goto_page(self, page):
+        """跳转到指定页：优先点击页码，页码按钮未渲染时逐页翻动
+
+        分页器只渲染当前页附近的页码，向前跳转到未渲染的页时先点击始终渲染的第一页，再逐页向后翻动。
+        """
+        if self.click_page_number(page):
+            return True
+
+        state = self._get_active_state()
+        if page < state.current_page:
+            self.log_console(f"第{page}页页码未渲染，回到第一页后逐页翻动")
+            if not self.click_page_number(1):
+                return False
+        while state.current_page < page:
+            if not self.click_next_page():
+                return False
+        return state.current_page == page
 
     def process_secondary_without_tertiary(self):
         """处理无三级类目的二级类目（从第一页开始，最多6页，遇<150则停）"""
@@ -2223,22 +4336,21 @@ class CategoryAutoExtractor(tk.Tk):
                 self.log_ui(f"\n===== 开始处理第 {current_page} 页数据 =====")
 
                 # 收集当前页数据
-                page_data, found_low_value = self.extract_data_from_page()
+                page_data, found_low_value = self.get_page_data(current_page)
 
                 if not page_data:
                     self.log_ui("当前页未提取到任何数据")
                     break
 
                 # 筛选符合条件的数据
-                filtered_data = [item for item in page_data if
-                                 item['search_popularity'] >= self.min_popularity_threshold]
+                filtered_data, _ = split_rows_by_threshold(page_data, self.min_popularity_threshold)
                 total_collected += len(filtered_data)
 
                 self.log_ui(
                     f"第 {current_page} 页，筛选出 {len(filtered_data)} 条符合条件的数据")
 
                 if filtered_data:
-                    self._append_collected_data(filtered_data)
+                    self._append_collected_data(filtered_data, current_page)
 
                 # 遇到低价值数据则停止
                 if found_low_value:
@@ -2255,11 +4367,12 @@ class CategoryAutoExtractor(tk.Tk):
                     break
 
                 current_page += 1
-                time.sleep(2)
 
             self.log_ui(f"共收集到 {total_collected} 条符合条件的数据")
             return total_collected > 0
 
+        except PageNavigationError:
+            raise
         except Exception as e:
             self.log_ui(f"处理数据时出错: {str(e)}")
             return False
@@ -2268,74 +4381,56 @@ class CategoryAutoExtractor(tk.Tk):
         """处理二级类目下的所有三级类目"""
         # 记录当前二级类目
         level2_cat = self.selected_categories[2]
-        level2_index = level2_cat['index']
 
         # 检查是否有三级类目
         if level2_cat['has_children']:
-            # 有三级类目：先看第一页是否有小于150的
-            has_low_value_first = self.check_first_page_for_low_value()
-
-            if has_low_value_first:
-                # 第一页有低价值数据，从第一页开始提取当前二级类目数据
-                self.log_ui("第一页发现小于150的搜索人气，从第一页开始提取当前二级类目数据")
-                data_collected = self.collect_data_across_pages()
-                if not data_collected:
+            decision, pages = self.locate_secondary_cutoff()
+            if decision == "empty":
+                self.log_ui("当前二级类目数据为空，处理完成")
+                return
+            if decision == "collect":
+                if not self.collect_located_pages(pages):
                     self.log_ui("当前二级类目数据为空，处理完成")
-                    return
-            else:
-                # 第一页没有低价值数据，再看最后一页
-                has_low_value_last = self.check_last_page_for_low_value()
-
-                if has_low_value_last:
-                    # 最后一页有低价值数据，从第一页开始提取当前二级类目数据
-                    self.log_ui("最后一页发现小于150的搜索人气，从第一页开始提取当前二级类目数据")
-                    data_collected = self.collect_data_across_pages()
-                    if not data_collected:
-                        self.log_ui("当前二级类目数据为空，处理完成")
-                        return
-                else:
-                    # 没有低价值数据，处理所有三级类目
-                    self.log_ui("未检测到小于150的搜索人气，处理所有三级类目")
+                return
 
-                    # 再次点击二级类目确保显示其下的三级类目
-                    self.click_category(2, level2_index, level2_cat['name'])
-                    time.sleep(2)
+            # 没有低价值数据，处理所有三级类目
+            self.log_ui("未检测到小于150的搜索人气，处理所有三级类目")
 
-                    # 获取三级类目
-                    self.current_level = 3
-                    level3_cats = self.get_categories_by_level(3)
+            # 获取三级类目（有类目树时直接读取，否则再次点击二级类目显示其下的三级类目）
+            self.current_level = 3
+            level3_cats = self.list_categories(3)
 
-                    if level3_cats:
-                        for level3_idx, level3_cat in enumerate(level3_cats, 1):
-                            # 检查是否已结束
-                            if self.stop_event.is_set():
-                                break
+            if level3_cats:
+                for level3_idx, level3_cat in enumerate(level3_cats, 1):
+                    # 检查是否已结束
+                    if self.stop_event.is_set():
+                        break
 
-                            # 检查暂停状态
-                            self.check_pause_state()
-                            if self.stop_event.is_set():
-                                break
+                    # 检查暂停状态
+                    self.check_pause_state()
+                    if self.stop_event.is_set():
+                        break
 
-                            self.log_ui(f"\n----- 开始处理第{level3_idx}个三级类目: {level3_cat['name']} -----")
+                    self.log_ui(f"\n----- 开始处理第{level3_idx}个三级类目: {level3_cat['name']} -----")
 
-                            # 点击三级类目
-                            if not self.click_category(3, level3_idx, level3_cat['name']):
-                                continue
+                    # 进入三级类目（已知cateId时按地址直接跳转）
+                    if not self.open_category(3, level3_cat):
+                        continue
 
-                            # 提取三级类目数据
-                            data_collected = self.collect_data_across_pages()
-                            if not data_collected:
-                                self.log_ui("当前三级类目数据为空，处理下一个三级类目")
-                                continue
+                    # 提取三级类目数据
+                    data_collected = self.collect_data_across_pages()
+                    if not data_collected:
+                        self.log_ui("当前三级类目数据为空，处理下一个三级类目")
+                        continue
 
-                        # 恢复到二级类目层级
-                        self.current_level = 2
-                    else:
-                        self.log_ui("该二级类目下没有三级类目，提取当前二级类目数据")
-                        data_collected = self.collect_data_across_pages()
-                        if not data_collected:
-                            self.log_ui("当前二级类目数据为空，处理完成")
-                            return
+                # 恢复到二级类目层级
+                self.current_level = 2
+            else:
+                self.log_ui("该二级类目下没有三级类目，提取当前二级类目数据")
+                data_collected = self.collect_data_across_pages()
+                if not data_collected:
+                    self.log_ui("当前二级类目数据为空，处理完成")
+                    return
         else:
             # 没有三级类目，提取这个二级类目的所有大于等于150的数据
             self.log_ui("该二级类目下没有三级类目，提取所有符合条件的数据（最多6页）")
@@ -2357,37 +4452,24 @@ class CategoryAutoExtractor(tk.Tk):
             time.sleep(0.1)
 
     def get_max_page_number(self):
-        """获取最大页码数"""
-        try:
-            # 查找所有页码按钮
-            page_elements = self.browser.find_elements(
-                By.CSS_SELECTOR,
-                "li.ant-pagination-item:not(.ant-pagination-item-active)"
-            )
-
-            # 加上当前激活的页码
-            active_page = self.browser.find_element(
-                By.CSS_SELECTOR,
-                "li.ant-pagination-item.ant-pagination-item-active"
-            )
-            page_elements.append(active_page)
-
-            # 提取所有页码数字
-            page_numbers = []
-            for elem in page_elements:
-                try:
-                    num = int(elem.text.strip())
-                    page_numbers.append(num)
-                except ValueError:
-                    continue
-
-            if page_numbers:
-                return max(page_numbers)
-            else:
-                return None
+        """获取最大页码数（同一类目内优先使用最近一次页面快照的结果）"""
+        state = self._get_active_state()
+        snapshot = state.last_snapshot
+        if snapshot and snapshot["path"] == state.category_path and snapshot["maxPage"]:
+            return snapshot["maxPage"]
 
-        except NoSuchElementException:
-            return None
+        try:
+            # 一次脚本读取所有页码，避免逐个元素读取.text
+            return self.browser.execute_script("""
+                var maxPage = null;
+                document.querySelectorAll('li.ant-pagination-item').forEach(function (item) {
+                    var num = parseInt(item.textContent.trim(), 10);
+                    if (!isNaN(num) && (maxPage === null || num > maxPage)) {
+                        maxPage = num;
+                    }
+                });
+                return maxPage;
+            """)
         except Exception as e:
             self.log_console(f"获取最大页码失败: {str(e)}")
             return None
@@ -2402,7 +4484,13 @@ class CategoryAutoExtractor(tk.Tk):
             )
 
             if page_element:
-                page_element.click()
+                capturing = self._begin_network_capture()
+                if capturing:
+                    page_element.click()
+                    self._await_rank_response()
+                elif not self.click_and_wait_for_table(page_element, expected_page=page_num):
+                    return False
+                self._get_active_state().current_page = page_num
                 return True
             else:
                 return False
@@ -2413,16 +4501,120 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_console(f"点击页码{page_num}失败: {str(e)}")
             return False
 
+    def click_and_wait_for_table(self, element, expected_page=None, timeout=10):
+        """点击元素并在页面内等待表格指纹变化，新页渲染完成即返回；超时返回False"""
+        started = time.perf_counter()
+        try:
+            self._ensure_script_timeout(timeout + 5)
+            result = self.call_helper_async("tableChange", element, expected_page, int(timeout * 1000))
+        except Exception as exc:  # pylint: disable=broad-except
+            self.log_console(f"等待表格更新时出错: {exc}")
+            self._record_wait("翻页表格刷新", started, False)
+            return False
+
+        self._record_wait("翻页表格刷新", started, bool(result and result.get("changed")))
+
+        if not result or not result.get("changed"):
+            self.log_ui(f"点击后表格在{timeout}秒内未变化（{(result or {}).get('before')}），避免重复读取上一页")
+            return False
+        self.log_console(f"表格已更新: {result['before']} -> {result['after']}（{result['elapsed']}ms）")
+        return True
+
+    def call_helper(self, name, *args):
+        """按名称调用页面辅助函数库中的同步函数，库缺失时补装一次"""
+        script = (f"var h = window.__sycm; if (!h || h.version !== '{SYCM_HELPERS_VERSION}') "
+                  f"{{ return {{__sycmMissing: true}}; }} return h.{name}.apply(h, arguments);")
+        result = self.browser.execute_script(script, *args)
+        if isinstance(result, dict) and result.get("__sycmMissing"):
+            self._install_helpers()
+            result = self.browser.execute_script(script, *args)
+        return result
+
+    def call_helper_async(self, name, *args):
+        """按名称调用页面辅助函数库中的异步函数（最后一个参数为回调），库缺失时补装一次"""
+        script = (f"var h = window.__sycm; if (!h || h.version !== '{SYCM_HELPERS_VERSION}') "
+                  f"{{ arguments[arguments.length - 1]({{__sycmMissing: true}}); return; }} "
+                  f"h.{name}.apply(h, arguments);")
+        result = self.browser.execute_async_script(script, *args)
+        if isinstance(result, dict) and result.get("__sycmMissing"):
+            self._install_helpers()
+            result = self.browser.execute_async_script(script, *args)
+        return result
+
+    def _install_helpers(self):
+        """当前文档尚无辅助函数库（如注入前已打开的页面）时直接安装"""
+        self.log_console("当前页面未安装辅助函数库，正在补装")
+        self.browser.execute_script(SYCM_HELPERS_JS)
+
+    def wait_in_page(self, site, selector=None, xpath=None, timeout=10, visible=False, gone=False,
+                     ready_state=False, predicate=None, return_element=False):
+        """页面内等待：条件满足立即返回，整个等待只占一次WebDriver命令
+
+        site为调用点名称，用于统计各处等待耗时；predicate为以el为参数的JS函数体片段。
+        return_element为True时返回匹配元素（超时返回None），否则返回是否满足。
+        """
+        if not self.browser:
+            return None if return_element else False
+
+        script = PAGE_WAIT_JS
+        if predicate:
+            script = script.replace("/*PREDICATE*/", predicate)
+        options = {"timeoutMs": int(timeout * 1000), "visible": visible, "gone": gone, "readyState": ready_state}
+        started = time.perf_counter()
+        try:
+            self._ensure_script_timeout(timeout + 5)
+            result = self.browser.execute_async_script(script, selector, xpath, options)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.log_console(f"[{site}] 页面内等待出错: {exc}")
+            result = None
+
+        found = bool(result and result.get("found"))
+        self._record_wait(site, started, found)
+        if return_element:
+            return result.get("element") if found else None
+        return found
+
+    def _ensure_script_timeout(self, seconds):
+        """异步脚本超时只在需要更长时间时才调整，避免每次等待多一次命令往返"""
+        state = self._get_active_state()
+        if state.script_timeout < seconds:
+            self.browser.set_script_timeout(seconds)
+            state.script_timeout = seconds
+
+    def _record_wait(self, site, started, found):
+        """按调用点累计等待次数、耗时与超时次数"""
+        elapsed = time.perf_counter() - started
+        stats = self._get_active_state().wait_stats.setdefault(
+            site, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        if not found:
+            stats["timeouts"] += 1
+
+    def _log_wait_stats(self):
+        """输出各调用点的等待耗时统计（按总耗时降序）"""
+        stats = self._get_active_state().wait_stats
+        if not stats:
+            return
+        self.log_session("等待耗时统计（累计）：")
+        for site, item in sorted(stats.items(), key=lambda kv: kv[1]["total"], reverse=True):
+            self.log_session(
+                f"  {site}: {item['count']}次，共{item['total']:.2f}秒，"
+                f"平均{item['total'] / item['count'] * 1000:.0f}ms，最长{item['max'] * 1000:.0f}ms，"
+                f"超时{item['timeouts']}次")
+
     def create_root_excel_file(self, index, name):
-        """创建根类目Excel文件"""
+        """创建根类目汇总文件：Excel程序方式初始化xlsx，其余格式通过结果输出接口打开"""
+        self._drain_result_writer()
         try:
             # 处理名称中的非法字符
-            safe_name = name.replace('/', '-').replace('\\', '-').replace(':', '-').replace('*', '-').replace('?',
-                                                                                                              '-').replace(
-                '"', '-').replace('<', '-').replace('>', '-').replace('|', '-')
+            safe_name = sanitize_filename(name)
+            output_format = self._get_active_state().output_format
 
             # 构建文件名
-            filename = f"{index}_{safe_name}.xlsx"
+            extension = ".xlsx" if output_format == "excel" else RESULT_SINKS[output_format].extension
+            filename = f"{index}_{safe_name}{extension}"
 
             # 获取当前输出目录
             output_dir = self.output_dir or os.getcwd()
@@ -2430,8 +4622,13 @@ class CategoryAutoExtractor(tk.Tk):
             excel_path = os.path.join(output_dir, filename)
 
             # 初始化Excel文件
-            if self.init_excel(excel_path):
+            if output_format == "excel":
+                created = self.init_excel(excel_path)
+            else:
+                created = self._open_result_sink(excel_path, output_format)
+            if created:
                 self.log_ui(f"已创建根类目汇总表格: {excel_path}")
+                self._open_threshold_views(excel_path, output_format)
                 self.excel_filepath = excel_path
                 return excel_path
             else:
@@ -2443,62 +4640,43 @@ class CategoryAutoExtractor(tk.Tk):
             return None
 
     def init_excel(self, excel_filename):
-        """初始化Excel文件"""
+        """初始化Excel文件：新文件以只写模式直接生成；已存在时清空"生意参谋"工作表并补齐表头，只读写一次"""
         if self.stop_event.is_set():
             return False
 
-        # 若文件存在，清空所有内容
-        if os.path.exists(excel_filename):
-            try:
-                wb = openpyxl.load_workbook(excel_filename)
-
-                # 清空"生意参谋"工作表
-                if "生意参谋" in wb.sheetnames:
-                    ws1 = wb["生意参谋"]
-                    ws1.delete_rows(1, ws1.max_row)
-
-                wb.save(excel_filename)
-                self.log_console(f"已清空Excel汇总表内容：{excel_filename}")
-            except Exception as e:
-                self.log_console(f"清空Excel文件失败：{e}")
-                return False
-
-        # 创建表头
+        # 上次未提交的中转数据属于旧内容，一并清除
+        self._discard_result_sink(excel_filename)
         try:
-            wb = openpyxl.load_workbook(excel_filename) if os.path.exists(excel_filename) else openpyxl.Workbook()
+            if not os.path.exists(excel_filename):
+                write_keyword_workbook(excel_filename, [])
+                return True
 
-            # 处理"生意参谋"工作表
-            if "生意参谋" not in wb.sheetnames:
-                ws1 = wb.create_sheet(title="生意参谋")
-            else:
+            wb = openpyxl.load_workbook(excel_filename)
+            if "生意参谋" in wb.sheetnames:
                 ws1 = wb["生意参谋"]
-            ws1["A1"] = "搜索词"
-            ws1["B1"] = "搜索人气"
+                ws1.delete_rows(1, ws1.max_row)
+            else:
+                ws1 = wb.create_sheet(title="生意参谋")
+            ws1.append(KEYWORD_SHEET_HEADER)
 
-            # 处理"衍生关键词"工作表
             if "衍生关键词" not in wb.sheetnames:
-                ws2 = wb.create_sheet(title="衍生关键词")
-            else:
-                ws2 = wb["衍生关键词"]
-            ws2["A1"] = "相关关键词"
-            ws2["B1"] = "搜索人数"
-            ws2["C1"] = "支付转化率"
-            ws2["D1"] = "支付人数"
-            ws2["E1"] = "需求供给比"
-            ws2["F1"] = "天猫商品点击占比"
+                wb.create_sheet(title="衍生关键词").append(DERIVED_SHEET_HEADER)
 
             # 如果是新建的工作簿，删除默认的Sheet
             if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
                 del wb["Sheet"]
 
             wb.save(excel_filename)
+            self.log_console(f"已清空Excel汇总表内容：{excel_filename}")
             return True
         except Exception as e:
-            self.log_console(f"初始化Excel表头失败：{e}")
+            self.log_console(f"初始化Excel文件失败：{e}")
             return False
 
     def open_excel_file(self):
-        """打开当前根类目Excel文件"""
+        """打开当前根类目Excel文件（仅Excel程序输出方式）"""
+        if self._get_active_state().output_format != "excel":
+            return
         if not self.current_excel_root or not os.path.exists(self.current_excel_root):
             self.log_ui("根类目Excel文件不存在，无法打开")
             return
@@ -2565,6 +4743,8 @@ class CategoryAutoExtractor(tk.Tk):
         """将数据写入Excel；commit=True时执行保存"""
         if not self.current_excel_root:
             return False
+        if self._get_active_state().output_format != "excel":
+            return self.save_page_data_to_excel_fallback(page_data, commit)
 
         has_rows = bool(page_data)
         if not has_rows and not commit:
@@ -2617,36 +4797,104 @@ class CategoryAutoExtractor(tk.Tk):
             return self.save_page_data_to_excel_fallback(page_data, commit)
 
     def save_page_data_to_excel_fallback(self, page_data, commit=False):
-        """备用的Excel保存方法（使用openpyxl，自动保存到文件）"""
+        """不经过Excel程序的写入：通过结果输出接口追加数据；Excel程序方式连接失败时流式写入当前xlsx"""
         if not self.current_excel_root:
             return False
+        state = self._get_active_state()
         try:
-            wb = openpyxl.load_workbook(self.current_excel_root) if os.path.exists(self.current_excel_root) else openpyxl.Workbook()
-            if "生意参谋" not in wb.sheetnames:
-                ws = wb.create_sheet(title="生意参谋")
-                ws["A1"] = "搜索词"
-                ws["B1"] = "搜索人气"
-            else:
-                ws = wb["生意参谋"]
+            sink = state.result_sink
+            if sink is None or sink.path != self.current_excel_root:
+                if sink is not None:
+                    sink.close()
+                sink = state.result_sink = XlsxSink()
+                sink.open(self.current_excel_root, truncate=False)
 
             if page_data:
-                last_row = ws.max_row
-                start_row = last_row + 1
-                for i, item in enumerate(page_data):
-                    row = start_row + i
-                    ws.cell(row=row, column=1, value=item['keyword'])
-                    ws.cell(row=row, column=2, value=item['popularity_text'])
-                self.log_ui(f"备用方法写入{len(page_data)}条数据")
+                sink.append(page_data)
+                state.excel_dirty = True
+                self.log_ui(f"已写入{len(page_data)}条数据（待提交）")
 
-            wb.save(self.current_excel_root)
-            state = self._get_active_state()
-            state.excel_dirty = False
             if commit:
-                self.log_ui("备用方法已保存Excel文件")
+                total = sink.commit()
+                state.excel_dirty = False
+                self.log_ui(f"已保存 {os.path.basename(sink.path)}（共{total}条数据）")
             return True
         except Exception as e:
-            self.log_ui(f"备用方法保存失败: {str(e)}")
+            self.log_ui(f"写入结果文件失败: {str(e)}")
+            return False
+
+    def _open_result_sink(self, path, output_format):
+        """通过结果输出接口新建根类目文件"""
+        if self.stop_event.is_set():
+            return False
+        state = self._get_active_state()
+        if state.result_sink is not None:
+            state.result_sink.close()
+            state.result_sink = None
+        try:
+            sink = make_result_sink(output_format)
+            sink.open(path)
+        except Exception as e:
+            self.log_console(f"创建结果文件失败：{e}")
             return False
+        state.result_sink = sink
+        return True
+
+    def _view_thresholds(self):
+        """多阈值采集中需要另存筛选文件的阈值（最低阈值的数据即根类目文件本身，其余阈值文件为其本地筛选）"""
+        return self._get_active_state().run_thresholds[1:]
+
+    def _log_popularity_thresholds(self):
+        views = self._view_thresholds()
+        if views:
+            self.log_session(f"多阈值采集：按最低阈值 {self.min_popularity_threshold:g} 采集，另存阈值 "
+                             f"{'、'.join(f'{value:g}' for value in views)} 的筛选文件")
+
+    def _open_threshold_views(self, path, output_format):
+        """多阈值采集：为根类目文件打开各较高阈值的筛选文件（存档格式保存原始页面，不适用）"""
+        state = self._get_active_state()
+        if state.threshold_views is not None:
+            state.threshold_views.close()
+            state.threshold_views = None
+        thresholds = self._view_thresholds()
+        if not thresholds or output_format == "capture":
+            return
+        views = ThresholdViewSink(thresholds, "xlsx" if output_format == "excel" else output_format)
+        try:
+            views.open(path)
+        except Exception as e:  # pylint: disable=broad-except
+            self.log_ui(f"创建阈值筛选文件失败: {e}")
+            views.close()
+            return
+        state.threshold_views = views
+        self.log_ui(f"已创建阈值筛选文件: {'、'.join(os.path.basename(item) for item in views.paths())}")
+
+    def _write_threshold_views(self, page_data, commit=False):
+        """把写入根类目文件的数据按各阈值筛选后写入对应文件"""
+        views = self._get_active_state().threshold_views
+        if views is None or not self.current_excel_root or views.path != self.current_excel_root:
+            return
+        try:
+            if page_data:
+                views.append(page_data)
+            if commit:
+                views.commit()
+        except Exception as e:  # pylint: disable=broad-except
+            self.log_ui(f"写入阈值筛选文件失败: {str(e)}")
+
+    def _discard_result_sink(self, path):
+        """丢弃指定文件未提交的数据"""
+        state = self._get_active_state()
+        views = state.threshold_views
+        if views is not None and views.path == path:
+            state.threshold_views = None
+            views.discard()
+        sink = state.result_sink
+        if sink is not None and sink.path == path:
+            state.result_sink = None
+            sink.discard()
+        else:
+            StreamingXlsxWriter(path).discard()
 
     def collect_data_across_pages(self):
         """跨分页收集数据（优化停止检查点）"""
@@ -2695,174 +4943,69 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_ui(f"共收集到 {total_collected} 条符合条件的数据")
             return True
 
+        except PageNavigationError:
+            raise
         except Exception as e:
             self.log_ui(f"处理数据时出错: {str(e)}")
             return False
 
     def extract_data_from_page(self):
         """从当前页面表格中提取关键词和搜索人气数据（修复转义序列警告）"""
-        try:
-            try:
-                # 检查第一条数据的元素是否存在
-                self.browser.find_element(
-                    By.CSS_SELECTOR,
-                    "tr.ant-table-row.oui-table-row-tree-node-1.ant-table-row-level-0"
-                )
-            except NoSuchElementException:
-                self.log_ui("未找到任何数据行，判定为空数据")
-                return [], False  # 返回空数据
-
-            # 等待表格加载完成
-            WebDriverWait(self.browser, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "tr.ant-table-row.oui-table-row-tree-node-1"))
-            )
-
-            # 使用JavaScript提取数据，修复转义序列警告
-            result = self.browser.execute_script("""
-                var results = [];
-                var foundLowValue = false;
-                var minThreshold = arguments[0];
-                var debugLogs = []; // 用于调试的日志数组
-
-                // 转换包含"万"的数值为实际数字
-                function convertWanValue(valueText) {
-                    // 移除所有空格 - 使用双重转义避免Python解释器警告
-                    valueText = valueText.replace(/\\s+/g, '');
-
-                    // 检查是否包含"万"
-                    if (valueText.includes('万')) {
-                        // 提取数字部分
-                        var numPart = valueText.replace('万', '');
-                        // 尝试转换为浮点数
-                        var num = parseFloat(numPart);
-                        // 有效数字则乘以10000
-                        if (!isNaN(num)) {
-                            return num * 10000;
-                        }
-                    } else {
-                        // 普通数字，直接转换
-                        var num = parseFloat(valueText);
-                        if (!isNaN(num)) {
-                            return num;
-                        }
-                    }
-                    return null; // 无法转换
-                }
-
-                // 遍历所有符合条件的行
-                for (var i = 1; i <= 50; i++) {
-                    var rowSelector = 'tr.ant-table-row.oui-table-row-tree-node-' + i + '.ant-table-row-level-0';
-                    var row = document.querySelector(rowSelector);
-
-                    if (!row) {
-                        continue;
-                    }
-
-                    try {
-                        // 提取关键词和搜索人气
-                        var tds = row.querySelectorAll('td');
-                        if (tds.length < 3) {
-                            continue;
-                        }
-
-                        // 关键词在第二个td
-                        var keyword = tds[1].textContent.trim();
-
-                        // 搜索人气在第三个td
-                        var popularityElement = tds[2].querySelector('.alife-dt-card-common-table-sortable-value span');
-                        if (!popularityElement) {
-                            debugLogs.push(`未找到搜索人气元素: 关键词=${keyword}`);
-                            continue;
-                        }
-
-                        var popularityText = popularityElement.textContent.trim();
-                        var popularityValue = 0;
-                        var parsingSuccess = true;
-
-                        // 处理范围值，如"1万 ~ 2万"，取最小值
-                        if (popularityText.includes('~')) {
-                            var parts = popularityText.split('~').map(p => p.trim());
-
-                            // 转换两边的值
-                            var value1 = convertWanValue(parts[0]);
-                            var value2 = convertWanValue(parts[1]);
-
-                            // 确保两边都是有效数字
-                            if (value1 !== null && value2 !== null) {
-                                popularityValue = Math.min(value1, value2);
-                            } else {
-                                parsingSuccess = false;
-                                debugLogs.push(`范围值解析失败: "${popularityText}" 部分值无法转换`);
-                            }
-                        } 
-                        // 处理单个带"万"的值，如"1.5万"
-                        else if (popularityText.includes('万')) {
-                            var value = convertWanValue(popularityText);
-                            if (value !== null) {
-                                popularityValue = value;
-                            } else {
-                                parsingSuccess = false;
-                                debugLogs.push(`单值解析失败: "${popularityText}" 无法转换`);
-                            }
-                        }
-                        // 处理普通数字值
-                        else {
-                            var num = parseFloat(popularityText);
-                            if (!isNaN(num)) {
-                                popularityValue = num;
-                            } else {
-                                parsingSuccess = false;
-                                debugLogs.push(`数字解析失败: "${popularityText}" 不是有效数字`);
-                            }
-                        }
-
-                        // 调试日志：记录原始文本和解析结果
-                        debugLogs.push(`关键词: ${keyword}, 原始值: "${popularityText}", 解析值: ${popularityValue}, 解析成功: ${parsingSuccess}`);
+        captured = self._get_active_state().captured_page
+        if self._network_capture_active() and captured is not None:
+            self.log_console(f"使用网络捕获的第{captured['page']}页数据（{len(captured['rows'])}条）")
+            return list(captured['rows']), captured['foundLowValue']
 
-                        // 只有解析成功的情况下才判断是否为低价值
-                        if (parsingSuccess) {
-                            // 严格判断：只有确实小于阈值才标记
-                            if (popularityValue < minThreshold) {
-                                foundLowValue = true;
-                                debugLogs.push(`>>> 发现低价值数据: ${keyword} (${popularityValue} < ${minThreshold})`);
-                            }
-
-                            results.push({
-                                keyword: keyword,
-                                search_popularity: popularityValue,
-                                popularity_text: popularityText
-                            });
-                        }
-                    } catch (e) {
-                        debugLogs.push(`提取第${i}行数据失败: ${e.message}`);
-                    }
-                }
+        snapshot = self.page_snapshot()
+        if snapshot is None:
+            return [], False
+        if not snapshot['data']:
+            self.log_ui("未找到任何数据行，判定为空数据")
+            return [], False
 
-                // 返回结果和调试信息
-                return {
-                    data: results,
-                    foundLowValue: foundLowValue,
-                    debugLogs: debugLogs
-                };
-            """, self.min_popularity_threshold)
+        # 页面脚本只负责取出文本，数值与低价值判断统一由Python端解析器给出
+        rows, found_low_value = normalize_page_rows(snapshot['data'], self.min_popularity_threshold)
+        if found_low_value:
+            _, low_count = split_rows_by_threshold(rows, self.min_popularity_threshold)
+            self.log_ui(f"检测到{low_count}条低价值数据")
 
-            # 输出调试日志到控制台，方便排查问题
-            for log in result['debugLogs']:
-                self.log_console(log)
+        return rows, found_low_value
 
-            # 验证低价值判断
-            if result['foundLowValue']:
-                low_count = len([d for d in result['data'] if d['search_popularity'] < self.min_popularity_threshold])
-                self.log_ui(f"检测到{low_count}条低价值数据")
+    def page_snapshot(self, timeout=15, helper="snapshot"):
+        """一次WebDriver调用取回当前页的行数据、低价值标志、分页状态与验证码标志（helper="captureTable"时取表格HTML）"""
+        state = self._get_active_state()
+        try:
+            self._ensure_script_timeout(timeout + 5)
+            snapshot = self.call_helper_async(
+                helper, self.min_popularity_threshold, int(timeout * 1000), self.debug_level > 0)
+        except Exception as e:  # pylint: disable=broad-except
+            self.log_ui(f"提取页面数据时出错: {str(e)}")
+            return None
 
-            return result['data'], result['foundLowValue']
+        # 输出调试日志到控制台，方便排查问题（逐行日志仅在调试级别开启时返回）
+        for log in snapshot['debugLogs']:
+            self.log_console(log)
 
-        except Exception as e:
-            self.log_ui(f"提取页面数据时出错: {str(e)}")
-            return [], False
+        if snapshot.get('captcha'):
+            self._report_captcha("数据提取", snapshot['captcha'])
+        if snapshot.get('activePage'):
+            state.current_page = snapshot['activePage']
+        # 分页信息随快照缓存，同一类目内获取最大页码无需再访问浏览器
+        state.last_snapshot = {"path": state.category_path, "maxPage": snapshot.get('maxPage'),
+                               "nextEnabled": snapshot.get('nextEnabled')}
+        return snapshot
 
     def collect_data_across_pages(self):
         """跨分页收集数据（修复版：增强低价值判断准确性）"""
+        if self._get_active_state().output_format == "capture":
+            return self._capture_pages()
+        if self._get_active_state().extract_engine == "rankjson":
+            collected = self._collect_data_via_rank_api()
+            if collected is not None:
+                return collected
+        if self.page_pipeline:
+            return self._collect_pages_pipelined()
+
         try:
             current_page = 1
             max_pages = self.max_pages
@@ -2877,8 +5020,8 @@ class CategoryAutoExtractor(tk.Tk):
 
                 self.log_ui(f"\n===== 开始处理第 {current_page} 页数据 =====")
 
-                # 收集当前页数据
-                page_data, found_low_value = self.extract_data_from_page()
+                # 收集当前页数据（同一类目已提取过的页直接复用）
+                page_data, found_low_value = self.get_page_data(current_page)
 
                 # 检查是否为空数据
                 if not page_data:
@@ -2886,28 +5029,25 @@ class CategoryAutoExtractor(tk.Tk):
                     break
 
                 # 筛选并保存符合条件的数据（≥150）
-                filtered_data = [item for item in page_data if
-                                 item['search_popularity'] >= self.min_popularity_threshold]
+                filtered_data, low_count = split_rows_by_threshold(page_data, self.min_popularity_threshold)
                 total_collected += len(filtered_data)
 
                 self.log_ui(
                     f"第 {current_page} 页共找到 {len(page_data)} 条数据，筛选出 {len(filtered_data)} 条符合条件的数据")
 
                 # 验证低价值判断是否准确
-                actual_low_values = [item for item in page_data if
-                                     item['search_popularity'] < self.min_popularity_threshold]
-                if found_low_value and len(actual_low_values) == 0:
+                if found_low_value and low_count == 0:
                     self.log_ui(
                         f"警告：检测到低价值标记，但实际未发现小于{self.min_popularity_threshold}的数据，将继续提取")
                     found_low_value = False  # 修正误判
 
                 if filtered_data:
-                    self._append_collected_data(filtered_data)
+                    self._append_collected_data(filtered_data, current_page)
 
                 # 遇到小于阈值的数据则停止提取
                 if found_low_value:
                     self.log_ui(
-                        f"在第 {current_page} 页发现{len(actual_low_values)}条小于 {self.min_popularity_threshold} 的搜索人气，停止提取当前类目")
+                        f"在第 {current_page} 页发现{low_count}条小于 {self.min_popularity_threshold} 的搜索人气，停止提取当前类目")
                     stop_extraction = True
                     break
 
@@ -2924,8 +5064,7 @@ class CategoryAutoExtractor(tk.Tk):
                     self.log_ui("已到达最后一页，停止处理")
                     break
 
-                current_page += 1
-                time.sleep(2)  # 等待页面加载
+                current_page += 1  # 翻页时已等到新页渲染完成，无需固定等待
 
             # 检查是否收集到数据
             if total_collected == 0:
@@ -2935,19 +5074,346 @@ class CategoryAutoExtractor(tk.Tk):
             self.log_ui(f"共收集到 {total_collected} 条符合条件的数据")
             return True
 
+        except PageNavigationError:
+            raise
         except Exception as e:
             self.log_ui(f"处理数据时出错: {str(e)}")
             return False
 
-    def get_current_page_number(self):
-        """获取当前页码"""
+    def _capture_record(self, kind, page, payload):
+        return {"path": list(self._journal_key()), "page": page, "kind": kind, "payload": payload,
+                "captured_at": time.time()}
+
+    def _capture_pages(self):
+        """存档模式：逐页保存原始表格HTML（接口直取模式为rank.json响应）到存档文件，不做解析，之后用parse-archive批量解析"""
+        state = self._get_active_state()
+        if state.extract_engine == "rankjson":
+            result = self.fetch_rank_pages(range(1, self.max_pages + 1), stop_on_low=True, raw=True)
+            records = [self._capture_record("rank", item["page"], item["raw"])
+                       for item in result.get("pages") or [] if item.get("raw")]
+            if records:
+                if result.get("error"):
+                    self.log_session(f"接口直取在第{len(records) + 1}页中断（{result['error']}），仅存档已获取的页")
+                self._append_collected_data(records)
+                self.log_ui(f"已存档 {len(records)} 页接口数据")
+                return True
+            self.log_session(f"接口直取失败（{result.get('error')}），回退为存档表格HTML")
+
+        captured = 0
+        current_page = 1
+        while current_page <= self.max_pages and not self.stop_event.is_set():
+            self.check_pause_state()
+            if self.stop_event.is_set():
+                break
+            if state.current_page != current_page and not self._goto_page(current_page):
+                self.log_ui(f"跳转至第{current_page}页失败（当前在第{state.current_page}页）")
+                raise PageNavigationError(current_page)
+
+            capture = self.page_snapshot(helper="captureTable")
+            if not capture or not capture.get('html'):
+                self.log_ui("当前页未提取到任何数据")
+                break
+            self._append_collected_data([self._capture_record("html", current_page, capture['html'])])
+            captured += 1
+
+            # 低价值标志由页面脚本给出，Python端不解析即可决定是否翻页
+            if capture['foundLowValue']:
+                self.log_ui(f"第 {current_page} 页存在小于 {self.min_popularity_threshold} 的搜索人气，停止翻页")
+                break
+            if current_page >= self.max_pages:
+                break
+            if not self.click_next_page():
+                break
+            current_page += 1
+
+        if captured:
+            self.log_ui(f"已存档 {captured} 页表格HTML")
+        return captured > 0
+
+    def _get_page_pipeline(self):
+        """会话的分页流水线：首次使用时启动筛选与写出线程，之后各类目复用，任务结束时关闭"""
+        state = self._get_active_state()
+        if state.pipeline is None:
+            # 写出线程先于下游阶段启动，写出阶段与采集线程使用同一个写出线程
+            self._get_result_writer()
+            state.pipeline = PagePipeline(self._append_collected_data, log=self.log_ui,
+                                          maxsize=self.pipeline_queue_size)
+            state.pipeline_metrics = state.pipeline.metrics
+            self._run_in_session_thread(state, state.pipeline.run_filter)
+            self._run_in_session_thread(state, state.pipeline.run_sink)
+        return state.pipeline
+
+    def _close_page_pipeline(self):
+        state = self._get_active_state()
+        if state.pipeline is not None:
+            state.pipeline.close()
+            state.pipeline = None
+
+    def _collect_pages_pipelined(self):
+        """流水线方式跨分页收集：当前线程只取页和翻页，筛选与写出交给会话的下游线程"""
+        pipeline = self._get_page_pipeline()
+        pipeline.begin(self.min_popularity_threshold)
         try:
-            # 查找当前激活的页码元素
-            page_element = self.browser.find_element(
-                By.CSS_SELECTOR,
-                "li.ant-pagination-item.ant-pagination-item-active"
+            current_page = 1
+            while current_page <= self.max_pages and not self.stop_event.is_set():
+                self.check_pause_state()
+                if self.stop_event.is_set():
+                    break
+
+                self.log_ui(f"\n===== 开始处理第 {current_page} 页数据 =====")
+                started = time.perf_counter()
+                page_data, found_low_value = self.get_page_data(current_page)
+                if not page_data:
+                    self.log_ui("当前页未提取到任何数据")
+                    break
+                pipeline.submit(current_page, page_data, time.perf_counter() - started)
+
+                if pipeline.should_stop(current_page, found_low_value):
+                    break
+                if current_page >= self.max_pages:
+                    self.log_ui(f"已达到最大页数限制 ({self.max_pages}页)，停止处理")
+                    break
+
+                self.log_ui("尝试点击下一页...")
+                started = time.perf_counter()
+                has_next_page = self.click_next_page()
+                pipeline.add_browser_seconds(time.perf_counter() - started)
+                if not has_next_page:
+                    self.log_ui("已到达最后一页，停止处理")
+                    break
+                current_page += 1
+        except PageNavigationError:
+            raise
+        except Exception as e:  # pylint: disable=broad-except
+            self.log_ui(f"处理数据时出错: {str(e)}")
+            return False
+        finally:
+            pipeline.finish()
+
+        if pipeline.failed:
+            self.log_ui("分页流水线出错，当前类目采集中止")
+            return False
+        if pipeline.duplicates:
+            self.log_ui(f"跨页去重：跳过 {pipeline.duplicates} 条重复关键词")
+        if pipeline.total_collected == 0:
+            self.log_ui("未收集到任何符合条件的数据")
+            return False
+        self.log_ui(f"共收集到 {pipeline.total_collected} 条符合条件的数据")
+        return True
+
+    def _auto_pause_session(self, reason):
+        """检测到验证码等情况时自动暂停当前会话（界面更新切回主线程执行）"""
+        state = self._get_active_state()
+        if state.paused or not state.processing:
+            return
+        state.pause_event.clear()
+        state.paused = True
+        self.log_session(f"⏸️ {reason}，已自动暂停，请处理后点击继续")
+
+        def update_ui(sid=state.session_id):
+            panel = getattr(self, "session_panels", {}).get(sid)
+            if panel:
+                panel["pause_btn"].config(text="继续")
+            self.set_session_status(sid, "已暂停")
+
+        self.after(0, update_ui)
+
+    def fetch_rank_pages(self, pages, stop_on_low=True, raw=False):
+        """在已登录页面内调用rank.json接口，一次往返取回多页数据；raw=True时每页附带原始响应文本"""
+        pages = list(pages)
+        if not self.browser:
+            return {"pages": [], "total": None, "error": "浏览器未初始化", "captcha": False}
+        try:
+            self._ensure_script_timeout(max(30, 10 * len(pages)))
+            result = self.browser.execute_async_script(
+                RANK_FETCH_JS,
+                f"{self.sycm_base_url}{RANK_API_PATH}",
+                dict(RANK_API_DEFAULT_PARAMS),
+                pages,
+                self.min_popularity_threshold,
+                stop_on_low,
+                raw,
             )
-            return int(page_element.text)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.log_console(f"rank.json请求脚本执行失败: {exc}")
+            return {"pages": [], "total": None, "error": str(exc), "captcha": False}
+
+        result = result or {"pages": [], "total": None, "error": "脚本无返回", "captcha": False}
+        for item in result.get("pages") or []:
+            item["rows"], item["foundLowValue"] = normalize_page_rows(item["rows"], self.min_popularity_threshold)
+        if result.get("captcha"):
+            self._auto_pause_session("接口请求触发验证码")
+        return result
+
+    def _extract_page_via_rank_api(self, page):
+        """接口直取单页数据，失败时返回(None, False)由调用方回退到页面解析"""
+        result = self.fetch_rank_pages([page], stop_on_low=False)
+        pages = result.get("pages") or []
+        if not pages:
+            self.log_session(f"接口直取第{page}页失败（{result.get('error')}），回退为页面解析")
+            return None, False
+        return pages[0]["rows"], pages[0]["foundLowValue"]
+
+    def _collect_data_via_rank_api(self):
+        """接口直取模式：一次往返取回最多max_pages页数据并按阈值保存，接口不可用时返回None"""
+        pending = list(range(1, self.max_pages + 1))
+        fetched_pages = []
+        for _ in range(2):
+            result = self.fetch_rank_pages(pending, stop_on_low=self.stop_on_low_value)
+            fetched_pages.extend(result.get("pages") or [])
+            if not result.get("error"):
+                break
+            if not result.get("captcha"):
+                break
+            # 验证码：等待用户处理后补取剩余页
+            self.check_pause_state()
+            if self.stop_event.is_set():
+                return False
+            fetched = {item["page"] for item in fetched_pages}
+            pending = [page for page in pending if page not in fetched]
+
+        if result.get("error"):
+            if not fetched_pages:
+                self.log_session(f"接口直取失败（{result['error']}），回退为页面解析")
+                return None
+            self.log_session(f"接口直取在第{len(fetched_pages) + 1}页中断（{result['error']}），仅保存已获取的页")
+
+        total_collected = 0
+        for item in fetched_pages:
+            if self.stop_event.is_set():
+                self.log_ui("检测到结束指令，不处理当前页数据")
+                return False
+
+            current_page = item["page"]
+            page_data = item["rows"]
+            if not page_data:
+                self.log_ui(f"第 {current_page} 页未提取到任何数据")
+                break
+
+            filtered_data, _ = split_rows_by_threshold(page_data, self.min_popularity_threshold)
+            total_collected += len(filtered_data)
+            self.log_ui(
+                f"[接口] 第 {current_page} 页共找到 {len(page_data)} 条数据，筛选出 {len(filtered_data)} 条符合条件的数据")
+
+            state = self._get_active_state()
+            state.page_extractions += 1
+            state.page_cache[state.category_path + (current_page,)] = (list(page_data), item["foundLowValue"])
+            self._record_journal(self.crawl_journal.record_page, self.get_yesterday_date(), self._journal_key(),
+                                 current_page, list(page_data), item["foundLowValue"])
+
+            if filtered_data:
+                self._append_collected_data(filtered_data, current_page)
+
+            if item["foundLowValue"] and self.stop_on_low_value:
+                self.log_ui(
+                    f"在第 {current_page} 页发现小于 {self.min_popularity_threshold} 的搜索人气，停止提取当前类目")
+                break
+
+        if total_collected == 0:
+            self.log_ui("未收集到任何符合条件的数据")
+            return False
+
+        self.log_ui(f"共收集到 {total_collected} 条符合条件的数据")
+        return True
+
+    def _network_capture_active(self):
+        """当前会话是否处于网络捕获模式（需浏览器启动时已开启性能日志）"""
+        state = self._get_active_state()
+        return state.extract_engine == "cdp" and state.network_capture and state.browser is not None
+
+    def _drain_network_log(self):
+        """读取并清空浏览器性能日志，返回其中的Network事件"""
+        try:
+            entries = self.browser.get_log("performance")
+        except Exception as exc:  # pylint: disable=broad-except
+            self.log_console(f"读取性能日志失败: {exc}")
+            return []
+        events = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError, TypeError):
+                continue
+            if message.get("method", "").startswith("Network."):
+                events.append(message)
+        return events
+
+    def _begin_network_capture(self):
+        """翻页或点击类目前调用：丢弃旧的网络事件并清除上一页的捕获结果"""
+        if not self._network_capture_active():
+            return False
+        self._drain_network_log()
+        self._get_active_state().captured_page = None
+        return True
+
+    def _settle_after_navigation(self, capturing, fallback_seconds):
+        """导航后的等待：网络捕获模式等到rank.json响应即返回，否则按原有固定时长等待"""
+        if capturing:
+            self._await_rank_response()
+        else:
+            time.sleep(fallback_seconds)
+
+    def _await_rank_response(self, timeout=10):
+        """等待rank.json响应完成并解析，响应到达即返回"""
+        state = self._get_active_state()
+        pending = {}
+        deadline = time.time() + timeout
+        while time.time() < deadline and not self.stop_event.is_set():
+            for event in self._drain_network_log():
+                method = event.get("method")
+                params = event.get("params", {})
+                request_id = params.get("requestId")
+                if method == "Network.responseReceived":
+                    url = params.get("response", {}).get("url", "")
+                    if RANK_API_PATH in url:
+                        pending[request_id] = url
+                elif method == "Network.loadingFailed":
+                    pending.pop(request_id, None)
+                elif method == "Network.loadingFinished" and request_id in pending:
+                    url = pending.pop(request_id)
+                    if "action=captcha" in url:
+                        self._auto_pause_session("网络捕获到验证码请求")
+                        return None
+                    page = self._read_rank_response(request_id, url)
+                    if page is not None:
+                        state.captured_page = page
+                        return page
+            time.sleep(0.05)
+        self.log_console(f"等待rank.json响应超时（{timeout}秒），回退为页面解析")
+        return None
+
+    def _read_rank_response(self, request_id, url):
+        """通过Network.getResponseBody读取并解析rank.json响应体"""
+        try:
+            body = self.browser.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8")
+            payload = json.loads(text)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.log_console(f"读取rank.json响应失败: {exc}")
+            return None
+
+        parsed = parse_rank_payload(payload, self.min_popularity_threshold)
+        if parsed is None:
+            self.log_console("rank.json响应结构无法识别，回退为页面解析")
+            return None
+        rows, found_low_value, total = parsed
+        try:
+            page = int(parse_qs(urlparse(url).query).get("page", ["1"])[0])
+        except ValueError:
+            page = 1
+        return {"page": page, "rows": rows, "foundLowValue": found_low_value, "total": total}
+
+    def get_current_page_number(self):
+        """获取当前页码"""
+        try:
+            # 查找当前激活的页码元素（一次脚本调用直接取文本）
+            text = self.browser.execute_script("""
+                var active = document.querySelector('li.ant-pagination-item.ant-pagination-item-active');
+                return active ? active.textContent.trim() : null;
+            """)
+            return int(text)
         except Exception as e:
             self.log_console(f"获取当前页码失败: {str(e)}")
             return 1  # 默认返回1
@@ -2956,9 +5422,9 @@ class CategoryAutoExtractor(tk.Tk):
         """点击下一页（新增备用方案：点击页码翻页）"""
         try:
             # 主要方案：尝试点击"下一页"按钮
-            WebDriverWait(self.browser, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "li.ant-pagination-next"))
-            )
+            if not self.wait_in_page("下一页按钮", "li.ant-pagination-next", timeout=10):
+                self.log_ui("等待下一页按钮超时，尝试备用方案（点击页码）")
+                return self._next_page_fallback()
 
             # 使用完整的CSS选择器点击下一页
             selector = "li.ant-pagination-next:not(.ant-pagination-disabled)"
@@ -2970,18 +5436,21 @@ class CategoryAutoExtractor(tk.Tk):
                 return self._next_page_fallback()  # 调用备用方案
 
             # 点击下一页
-            try:
-                next_page.click()
-                self.log_ui("使用主要方案点击下一页成功")
-                time.sleep(1)
-                return True
-            except:
-                # 尝试点击内部的a标签
-                link = next_page.find_element(By.TAG_NAME, "a")
-                link.click()
-                self.log_ui("使用主要方案点击下一页成功")
-                time.sleep(1)
-                return True
+            state = self._get_active_state()
+            if self._begin_network_capture():
+                try:
+                    next_page.click()
+                except:
+                    # 尝试点击内部的a标签
+                    link = next_page.find_element(By.TAG_NAME, "a")
+                    link.click()
+                self._await_rank_response()
+            elif not self.click_and_wait_for_table(next_page, expected_page=state.current_page + 1):
+                self.log_ui("点击下一页后表格未更新，尝试备用方案（点击页码）")
+                return self._next_page_fallback()
+            state.current_page += 1
+            self.log_ui("使用主要方案点击下一页成功")
+            return True
 
         except NoSuchElementException:
             self.log_ui("未找到下一页按钮，尝试备用方案（点击页码）")
@@ -3006,7 +5475,6 @@ class CategoryAutoExtractor(tk.Tk):
             success = self.click_page_number(next_page_num)
 
             if success:
-                time.sleep(2)  # 等待页面加载
                 self.log_ui(f"备用方案：成功切换到第 {next_page_num} 页")
                 return True
             else:
@@ -3033,15 +5501,7 @@ class CategoryAutoExtractor(tk.Tk):
                 self.log_ui(f"未找到cookie.txt（尝试路径: {self.cookie_path}）")
                 return
 
-        with open(cookie_path, 'r', encoding='utf-8') as f:
-            raw = f.read().strip().split('; ')
-
-        cookies = []
-        for item in raw:
-            if '=' in item:
-                name, value = item.split('=', 1)
-                cookies.append((name, value))
-
+        cookies = read_cookie_pairs(cookie_path)
         if not cookies:
             self.log_ui("Cookie文件无有效内容，无法登录")
             return
@@ -3052,7 +5512,7 @@ class CategoryAutoExtractor(tk.Tk):
     def _apply_cookies_to_session(self, cookies):
         state = self._get_active_state()
         try:
-            self.browser.get("https://sycm.taobao.com/")
+            self.browser.get(f"{self.sycm_base_url}/")
             for name, value in cookies:
                 try:
                     self.browser.add_cookie({
@@ -3314,10 +5774,1749 @@ class CategoryAutoExtractor(tk.Tk):
     #         self.log_console(f"清理WPS进程时出错: {str(e)}")
 
 
+# ===== 无浏览器HTTP抓取（复用导出的Cookie） =====
+def read_cookie_pairs(cookie_path):
+    """读取cookie.txt（name=value; ...格式），返回[(name, value), ...]"""
+    with open(cookie_path, 'r', encoding='utf-8') as f:
+        raw = f.read().strip().split('; ')
+    cookies = []
+    for item in raw:
+        if '=' in item:
+            name, value = item.split('=', 1)
+            cookies.append((name, value))
+    return cookies
+
+
+def sanitize_filename(name):
+    """替换文件名中的非法字符"""
+    for char in '/\\:*?"<>|':
+        name = name.replace(char, '-')
+    return name
+
+
+def write_keyword_workbook(excel_path, rows):
+    """按根类目汇总表的格式一次性写出Excel文件（openpyxl只写模式，rows可为迭代器）"""
+    wb = openpyxl.Workbook(write_only=True)
+    ws1 = wb.create_sheet(title="生意参谋")
+    ws1.append(KEYWORD_SHEET_HEADER)
+    count = 0
+    for item in rows:
+        ws1.append([item['keyword'], item['popularity_text']])
+        count += 1
+    ws2 = wb.create_sheet(title="衍生关键词")
+    ws2.append(DERIVED_SHEET_HEADER)
+    wb.save(excel_path)
+    return count
+
+
+class ResultSink:
+    """结果输出接口：open(路径)后可多次append(数据批)，commit()提交已追加的数据，最后close()"""
+
+    extension = ""
+
+    def __init__(self):
+        self.path = None
+        self.count = 0
+
+    def open(self, path, truncate=True):
+        """打开输出文件；truncate=False时在已有内容后继续追加"""
+        self.path = path
+        self.count = 0
+
+    def append(self, rows):
+        raise NotImplementedError
+
+    def commit(self):
+        """提交已追加的数据，返回写出的行数"""
+        return self.count
+
+    def close(self):
+        pass
+
+    def discard(self):
+        """放弃未提交的数据"""
+        self.close()
+
+
+class CsvSink(ResultSink):
+    """CSV输出（UTF-8带BOM，Excel可直接打开）"""
+
+    extension = ".csv"
+
+    def open(self, path, truncate=True):
+        super().open(path, truncate)
+        write_header = truncate or not os.path.exists(path)
+        self._file = open(path, 'w' if truncate else 'a', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(KEYWORD_SHEET_HEADER)
+
+    def append(self, rows):
+        self._writer.writerows((keyword, text) for keyword, _, text in iter_row_fields(rows))
+        self.count += len(rows)
+
+    def commit(self):
+        self._file.flush()
+        return self.count
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class JsonlSink(ResultSink):
+    """JSONL输出：每行一条数据，保留数值形式的搜索人气"""
+
+    extension = ".jsonl"
+
+    def open(self, path, truncate=True):
+        super().open(path, truncate)
+        self._file = open(path, 'w' if truncate else 'a', encoding='utf-8')
+
+    def append(self, rows):
+        self._file.writelines(json.dumps({
+            "keyword": keyword,
+            "search_popularity": value,
+            "popularity_text": text,
+        }, ensure_ascii=False) + "\n" for keyword, value, text in iter_row_fields(rows))
+        self.count += len(rows)
+
+    def commit(self):
+        self._file.flush()
+        return self.count
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class SqliteSink(ResultSink):
+    """SQLite输出：数据写入keywords表，commit时提交事务"""
+
+    extension = ".sqlite3"
+
+    def open(self, path, truncate=True):
+        super().open(path, truncate)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if truncate:
+            self._conn.execute("DROP TABLE IF EXISTS keywords")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS keywords (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           "keyword TEXT, search_popularity REAL, popularity_text TEXT)")
+        self._conn.commit()
+
+    def append(self, rows):
+        self._conn.executemany(
+            "INSERT INTO keywords (keyword, search_popularity, popularity_text) VALUES (?, ?, ?)",
+            iter_row_fields(rows))
+        self.count += len(rows)
+
+    def commit(self):
+        self._conn.commit()
+        return self.count
+
+    def close(self):
+        self._conn.close()
+
+    def discard(self):
+        self._conn.rollback()
+        self.close()
+
+
+class XlsxSink(ResultSink):
+    """xlsx输出：数据先流式写入中转文件，commit时用openpyxl只写模式生成表格"""
+
+    extension = ".xlsx"
+
+    def open(self, path, truncate=True):
+        super().open(path, truncate)
+        self._writer = StreamingXlsxWriter(path)
+        if truncate:
+            self._writer.discard()
+            write_keyword_workbook(path, [])
+
+    def append(self, rows):
+        self._writer.append(rows)
+        self.count += len(rows)
+
+    def commit(self):
+        return self._writer.commit()
+
+    def close(self):
+        self._writer.close()
+
+    def discard(self):
+        self._writer.discard()
+
+
+class CaptureArchiveSink(ResultSink):
+    """原始页面存档：每条记录为一页的原始表格HTML或rank.json响应，gzip压缩的JSONL；每次提交结束一个gzip成员，中断时已提交部分仍可读取"""
+
+    extension = ".capture.jsonl.gz"
+
+    def open(self, path, truncate=True):
+        super().open(path, truncate)
+        self._file = gzip.open(path, 'wt' if truncate else 'at', encoding='utf-8')
+
+    def append(self, rows):
+        self._file.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in rows)
+        self.count += len(rows)
+
+    def commit(self):
+        self._file.close()
+        self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        return self.count
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def parse_thresholds(text):
+    """解析逗号分隔的阈值列表（如"100,150,300"），返回升序去重的列表"""
+    return sorted({float(item) for item in str(text).replace("，", ",").split(",") if item.strip()})
+
+
+def threshold_view_path(path, extension, threshold):
+    """阈值筛选文件路径：在根类目文件名后加"_阈值N"（扩展名不变）"""
+    base = path[:-len(extension)] if extension and path.endswith(extension) else os.path.splitext(path)[0]
+    return f"{base}_阈值{threshold:g}{extension}"
+
+
+class ThresholdViewSink(ResultSink):
+    """多阈值输出：同一批数据按各阈值本地筛选后分别写入"{文件名}_阈值N"文件（数据须带数值形式的搜索人气）
+
+    筛选文件只是最低阈值采集结果的本地筛选；二级类目是否进入三级类目按最低阈值判断，与单独按较高阈值采集的结果可能不同。
+    """
+
+    def __init__(self, thresholds, output_format):
+        super().__init__()
+        self.thresholds = sorted(set(thresholds))
+        self.output_format = output_format
+        self.extension = RESULT_SINKS[output_format].extension
+        self._sinks = []
+
+    def open(self, path, truncate=True):
+        super().open(path, truncate)
+        self._sinks = []
+        for threshold in self.thresholds:
+            sink = make_result_sink(self.output_format)
+            sink.open(threshold_view_path(path, self.extension, threshold), truncate)
+            self._sinks.append((threshold, sink))
+
+    def paths(self):
+        return [sink.path for _, sink in self._sinks]
+
+    def append(self, rows):
+        for threshold, sink in self._sinks:
+            kept, _ = split_rows_by_threshold(rows, threshold)
+            if kept:
+                sink.append(kept)
+        self.count += len(rows)
+
+    def commit(self):
+        for _, sink in self._sinks:
+            sink.commit()
+        return self.count
+
+    def counts(self):
+        """各阈值文件已写出的行数"""
+        return [(threshold, sink.count) for threshold, sink in self._sinks]
+
+    def close(self):
+        for _, sink in self._sinks:
+            sink.close()
+
+    def discard(self):
+        for _, sink in self._sinks:
+            sink.discard()
+
+
+def write_result_file(path, output_format, rows, view_thresholds=()):
+    """一次性写出根类目结果文件，并按view_thresholds另存各阈值的筛选文件；返回写出的行数"""
+    sink = make_result_sink(output_format)
+    sink.open(path)
+    try:
+        sink.append(rows)
+        count = sink.commit()
+    finally:
+        sink.close()
+    if view_thresholds:
+        views = ThresholdViewSink(view_thresholds, output_format)
+        views.open(path)
+        try:
+            views.append(rows)
+            views.commit()
+        finally:
+            views.close()
+    return count
+
+
+RESULT_SINKS = {
+    "xlsx": XlsxSink,
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "sqlite": SqliteSink,
+    "capture": CaptureArchiveSink,
+}
+
+# 输出解析后数据行的格式（存档格式保存的是原始页面，不能直接接收数据行）
+ROW_OUTPUT_FORMATS = [name for name in RESULT_SINKS if name != "capture"]
+
+
+def make_result_sink(output_format):
+    """按输出格式创建结果输出接口实例"""
+    return RESULT_SINKS[output_format]()
+
+
+def read_keyword_workbook(excel_path):
+    """读取根类目汇总表"生意参谋"工作表中的数据行"""
+    wb = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        if "生意参谋" not in wb.sheetnames:
+            return []
+        return [{"keyword": keyword, "popularity_text": text}
+                for keyword, text, *_ in wb["生意参谋"].iter_rows(min_row=2, values_only=True)
+                if keyword is not None]
+    finally:
+        wb.close()
+
+
+class StreamingXlsxWriter:
+    """根类目表格的流式写入：每页数据追加到JSONL中转文件（耗时与表格大小无关），提交时一次性生成xlsx"""
+
+    def __init__(self, excel_path):
+        self.excel_path = excel_path
+        self.spool_path = excel_path + ".rows.jsonl"
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            seed = not os.path.exists(self.spool_path)
+            self._file = open(self.spool_path, 'a', encoding='utf-8')
+            if seed and os.path.exists(self.excel_path):
+                # 表格中已有的数据（此前提交过的部分）先转入中转文件，提交时一并写出
+                self._write_lines(read_keyword_workbook(self.excel_path))
+        return self._file
+
+    def _write_lines(self, rows):
+        self._file.writelines(
+            json.dumps({"keyword": keyword, "popularity_text": text}, ensure_ascii=False) + "\n"
+            for keyword, _, text in iter_row_fields(rows))
+
+    def append(self, rows):
+        self._open()
+        self._write_lines(rows)
+        self._file.flush()
+
+    def _iter_spool(self):
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def commit(self):
+        """生成最终的xlsx（先写临时文件再替换），成功后删除中转文件，返回写出的行数"""
+        self._open()
+        self.close()
+        temp_path = self.excel_path + ".tmp.xlsx"
+        count = write_keyword_workbook(temp_path, self._iter_spool())
+        os.replace(temp_path, self.excel_path)
+        os.remove(self.spool_path)
+        return count
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """丢弃未提交的数据"""
+        self.close()
+        if os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+
+
+class RankTableParser(HTMLParser):
+    """解析存档的表格HTML，取值方式与页面脚本extractRows一致：第二列为关键词，第三列排序值中的span为搜索人气"""
+
+    VOID_TAGS = {"br", "img", "input", "hr", "meta", "link", "col", "wbr"}
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._cells = None
+        self._stack = []
+        self._value_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        classes = (dict(attrs).get("class") or "").split()
+        if tag == "tr" and "ant-table-row" in classes and "ant-table-row-level-0" in classes:
+            self._cells, self._stack, self._value_depth = [], [], None
+            return
+        if self._cells is None or tag in self.VOID_TAGS:
+            return
+        if tag == "td" and not self._stack:
+            self._cells.append({"text": [], "value": None})
+        self._stack.append((tag, "alife-dt-card-common-table-sortable-value" in classes))
+        cell = self._cells[-1] if self._cells else None
+        if (tag == "span" and cell is not None and cell["value"] is None and self._value_depth is None
+                and any(is_value for _, is_value in self._stack)):
+            cell["value"] = []
+            self._value_depth = len(self._stack)
+
+    def handle_data(self, data):
+        if self._cells:
+            self._cells[-1]["text"].append(data)
+            if self._value_depth is not None:
+                self._cells[-1]["value"].append(data)
+
+    def handle_endtag(self, tag):
+        if self._cells is None:
+            return
+        if tag == "tr":
+            self._finish_row()
+            return
+        while self._stack:
+            if self._value_depth is not None and len(self._stack) <= self._value_depth:
+                self._value_depth = None
+            if self._stack.pop()[0] == tag:
+                break
+
+    def _finish_row(self):
+        cells, self._cells = self._cells, None
+        if len(cells) < 3 or cells[2]["value"] is None:
+            return
+        keyword = "".join(cells[1]["text"]).strip()
+        parsed = parse_popularity_value("".join(cells[2]["value"]))
+        if parsed is not None:
+            self.rows.append({"keyword": keyword, "search_popularity": parsed[0], "popularity_text": parsed[1]})
+
+
+def parse_capture_page(record, min_threshold):
+    """解析一条存档记录，返回(rows, found_low_value)；无法解析时返回None"""
+    if record.get("kind") == "html":
+        parser = RankTableParser()
+        parser.feed(record.get("payload") or "")
+        parser.close()
+        _, low_count = split_rows_by_threshold(parser.rows, min_threshold)
+        return parser.rows, low_count > 0
+    if record.get("kind") == "rank":
+        try:
+            parsed = parse_rank_payload(json.loads(record.get("payload") or ""), min_threshold)
+        except ValueError:
+            return None
+        return None if parsed is None else parsed[:2]
+    return None
+
+
+def read_capture_archive(archive_path):
+    """按类目路径分组读取存档，返回[(路径, {页码: 记录})]（保持首次出现顺序，同一页以最后一次存档为准）；
+    文件末尾因中断而不完整时保留已读出的部分"""
+    groups = {}
+    try:
+        with gzip.open(archive_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                groups.setdefault(tuple(record.get("path") or ()), {})[record.get("page")] = record
+    except (EOFError, OSError) as exc:
+        print(f"{os.path.basename(archive_path)} 读取中断（{exc}），仅解析已读出的部分")
+    return list(groups.items())
+
+
+def parse_capture_archive(task):
+    """解析一个存档文件并写出结果文件（在进程池中执行），按采集时的规则逐页筛选，遇到低于阈值的页即停止该类目"""
+    archive_path, out_path, output_format, min_threshold, view_thresholds = task
+    started = time.time()
+    stats = {"archive": archive_path, "out": out_path, "pages": 0, "rows": 0, "failed": 0}
+    collected = []
+    for _, pages in read_capture_archive(archive_path):
+        for page in sorted(pages, key=lambda value: value or 0):
+            parsed = parse_capture_page(pages[page], min_threshold)
+            if parsed is None:
+                stats["failed"] += 1
+                break
+            rows, found_low_value = parsed
+            stats["pages"] += 1
+            if not rows:
+                break
+            collected.extend(split_rows_by_threshold(rows, min_threshold)[0])
+            if found_low_value:
+                break
+
+    stats["rows"] = write_result_file(out_path, output_format, collected, view_thresholds)
+    stats["seconds"] = time.time() - started
+    return stats
+
+
+def run_parse_archive(args):
+    """批量解析原始页面存档：每个存档文件（对应一个一级类目）交给进程池中的一个进程"""
+    archives = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            archives.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                            if name.endswith(CaptureArchiveSink.extension))
+        else:
+            archives.append(path)
+    if not archives:
+        print("未找到存档文件（*.capture.jsonl.gz）")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    extension = RESULT_SINKS[args.format].extension
+    thresholds = parse_thresholds(args.thresholds) if args.thresholds else [args.threshold]
+    tasks = [(path, os.path.join(args.out, os.path.basename(path)[:-len(CaptureArchiveSink.extension)] + extension),
+              args.format, thresholds[0], thresholds[1:]) for path in archives]
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(tasks)))
+    started = time.time()
+    if workers == 1:
+        results = map(parse_capture_archive, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(parse_capture_archive, tasks)
+    try:
+        total_pages = total_rows = 0
+        for stats in results:
+            total_pages += stats["pages"]
+            total_rows += stats["rows"]
+            failed = f"，{stats['failed']}页无法解析" if stats["failed"] else ""
+            print(f"已输出 {stats['out']}（{stats['pages']}页，{stats['rows']}条{failed}，{stats['seconds']:.1f}秒）")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print(f"解析完成：{len(tasks)}个存档，{total_pages}页，{total_rows}条，{workers}个进程，"
+          f"耗时{time.time() - started:.1f}秒")
+
+
+def category_tree_cache_path(cache_dir, account, date):
+    """类目树缓存文件路径：按账号与统计日期区分"""
+    return os.path.join(cache_dir, f"category_tree_{sanitize_filename(account)}_{date}.json")
+
+
+def load_category_tree_cache(path, ttl_hours=CATEGORY_TREE_TTL_HOURS):
+    """读取类目树缓存，文件不存在、损坏或超过有效期时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - payload.get("created_at", 0) > ttl_hours * 3600:
+        return None
+    return payload.get("tree") or None
+
+
+def save_category_tree_cache(path, account, date, tree):
+    """写入类目树缓存（先写临时文件再替换，避免中断时留下半个文件）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"account": account, "date": date, "created_at": time.time(), "tree": tree}, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def load_category_nodes(path):
+    """读取类目文件：JSON列表（节点含cateId/id、name、index、children）、类目树缓存文件，或每行"序号,cateId,名称"的文本"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+
+    def normalize(node, position):
+        cate_id = node.get("cateId", node.get("cate_id", node.get("id")))
+        return {
+            "cate_id": str(cate_id),
+            "name": node.get("name") or str(cate_id),
+            "index": node.get("index", position),
+            "children": [normalize(child, i) for i, child in enumerate(node.get("children") or [], 1)],
+        }
+
+    if content.startswith("{"):
+        content = json.dumps(json.loads(content).get("tree") or [])
+    if content.startswith("["):
+        return [normalize(node, i) for i, node in enumerate(json.loads(content), 1)]
+
+    nodes = []
+    for position, line in enumerate(content.splitlines(), 1):
+        parts = [part.strip() for part in line.split(",", 2)]
+        if len(parts) == 3 and parts[1]:
+            nodes.append({"cate_id": parts[1], "name": parts[2], "index": int(parts[0] or position), "children": []})
+    return nodes
+
+
+def category_path_key(cats):
+    """类目路径键：各级类目名称以" > "连接"""
+    return " > ".join(cat['name'] for cat in cats if cat)
+
+
+class CrawlCostModel:
+    """采集成本历史：按类目路径与统计日期记录页数、三级类目数、数据条数与耗时，并据此预测任务耗时"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.records = {}
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.records = json.load(f).get("records") or {}
+            except (OSError, ValueError):
+                self.records = {}
+
+    def record(self, key, date, pages, level3, rows, seconds, partial=False):
+        with self._lock:
+            self.records.setdefault(key, {})[date] = {
+                "pages": pages, "level3": level3, "rows": rows,
+                "seconds": round(seconds, 1), "partial": partial,
+            }
+
+    def save(self):
+        """写入历史文件（先写临时文件再替换），每个路径只保留最近COST_HISTORY_KEEP次记录"""
+        if not self.path:
+            return
+        with self._lock:
+            for history in self.records.values():
+                for date in sorted(history)[:-COST_HISTORY_KEEP]:
+                    del history[date]
+            payload = json.dumps({"records": self.records}, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(temp_path, self.path)
+
+    def _average(self, key):
+        """该路径最近几次的平均耗时及最近一次是否只含自身部分，无记录返回None"""
+        with self._lock:
+            history = self.records.get(key)
+            if not history:
+                return None
+            recent = [history[date] for date in sorted(history)[-COST_HISTORY_KEEP:]]
+        return sum(item["seconds"] for item in recent) / len(recent), recent[-1].get("partial", False)
+
+    def estimate(self, cats, children=()):
+        """预测类目耗时（秒）：优先取该路径的平均耗时；记录只含自身部分或没有记录时累加子类目的预测；完全无历史返回None"""
+        own = self._average(category_path_key(cats))
+        if own is not None and not own[1]:
+            return own[0]
+        child_estimates = [self.estimate(list(cats) + [child], child.get('children') or ()) for child in children]
+        known = [value for value in child_estimates if value is not None]
+        if own is None and not known:
+            return None
+        # 没有历史的子类目按已知子类目的平均值估计
+        fill = sum(known) / len(known) if known else 0
+        return (own[0] if own else 0) + sum(fill if value is None else value for value in child_estimates)
+
+
+def journal_key(names):
+    """断点日志中的类目路径：(一级名, 二级名, 三级名)，缺少的层级为空字符串"""
+    names = list(names)[:3]
+    return tuple(names + [""] * (3 - len(names)))
+
+
+class CrawlJournal:
+    """断点日志（SQLite WAL模式）：按统计日期记录已提取的页面、已写出的数据与已完成的类目，中断后续采时跳过已完成部分"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            stat_date TEXT, level1 TEXT, level2 TEXT, level3 TEXT, page INTEGER, rows TEXT, found_low INTEGER,
+            PRIMARY KEY (stat_date, level1, level2, level3, page));
+        CREATE TABLE IF NOT EXISTS outputs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, stat_date TEXT, level1 TEXT, level2 TEXT, level3 TEXT, rows TEXT,
+            page INTEGER, threshold REAL);
+        CREATE INDEX IF NOT EXISTS outputs_level1 ON outputs (stat_date, level1);
+        CREATE TABLE IF NOT EXISTS done (
+            stat_date TEXT, level1 TEXT, level2 TEXT, level3 TEXT, finished_at REAL,
+            PRIMARY KEY (stat_date, level1, level2, level3));
+    """
+
+    def __init__(self, path, keep_days=JOURNAL_KEEP_DAYS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._execute("PRAGMA table_info(outputs)")}
+        for column, kind in (("page", "INTEGER"), ("threshold", "REAL")):
+            if column not in columns:
+                self._execute(f"ALTER TABLE outputs ADD COLUMN {column} {kind}")
+        self._prune(keep_days)
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _prune(self, keep_days):
+        """只保留最近keep_days个统计日期的记录"""
+        dates = [row[0] for row in self._execute(
+            "SELECT stat_date FROM pages UNION SELECT stat_date FROM outputs UNION SELECT stat_date FROM done "
+            "ORDER BY 1 DESC")]
+        for date in dates[keep_days:]:
+            for table in ("pages", "outputs", "done"):
+                self._execute(f"DELETE FROM {table} WHERE stat_date = ?", (date,))
+
+    def record_page(self, date, key, page, rows, found_low):
+        self._execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                      (date, *key, page, json.dumps(rows, ensure_ascii=False), int(bool(found_low))))
+
+    def page(self, date, key, page):
+        """已提取页面的(rows, found_low)，未记录时返回None"""
+        result = self._execute("SELECT rows, found_low FROM pages WHERE stat_date = ? AND level1 = ? AND level2 = ? "
+                               "AND level3 = ? AND page = ?", (date, *key, page))
+        if not result:
+            return None
+        return json.loads(result[0][0]), bool(result[0][1])
+
+    def record_output(self, date, key, rows, page=None, threshold=None):
+        """记录已写出的数据；rows为None表示数据即pages表中该页达到threshold的行，只保存页码引用"""
+        payload = None if rows is None else json.dumps(rows, ensure_ascii=False)
+        self._execute("INSERT INTO outputs (stat_date, level1, level2, level3, rows, page, threshold) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)", (date, *key, payload, page, threshold))
+
+    def _outputs(self, date, level1):
+        """按写出顺序返回该一级类目的(seq, level2, level3, 数据)，页码引用从pages表还原"""
+        result = []
+        for seq, level2, level3, payload, threshold, page_rows in self._execute(
+                "SELECT o.seq, o.level2, o.level3, o.rows, o.threshold, p.rows FROM outputs o "
+                "LEFT JOIN pages p ON p.stat_date = o.stat_date AND p.level1 = o.level1 AND p.level2 = o.level2 "
+                "AND p.level3 = o.level3 AND p.page = o.page "
+                "WHERE o.stat_date = ? AND o.level1 = ? ORDER BY o.seq", (date, level1)):
+            if payload is not None:
+                rows = json.loads(payload)
+            else:
+                rows = [row for row in json.loads(page_rows or "[]") if row['search_popularity'] >= threshold]
+            result.append((seq, level2, level3, rows))
+        return result
+
+    def mark_done(self, date, key):
+        self._execute("INSERT OR REPLACE INTO done VALUES (?, ?, ?, ?, ?)", (date, *key, time.time()))
+
+    def _done_paths(self, date, level1):
+        return {tuple(row) for row in self._execute(
+            "SELECT level1, level2, level3 FROM done WHERE stat_date = ? AND level1 = ?", (date, level1))}
+
+    @staticmethod
+    def _covered(key, done):
+        """该路径本身或其任一上级类目已完成"""
+        return any(key[:depth] + ("",) * (3 - depth) in done for depth in (1, 2, 3) if all(key[:depth]))
+
+    def is_done(self, date, key):
+        return self._covered(key, self._done_paths(date, key[0]))
+
+    def output_rows(self, date, key):
+        """该路径（含其下级类目）已写出的数据，按写出顺序"""
+        rows = []
+        for _, level2, level3, output in self._outputs(date, key[0]):
+            if (not key[1] or key[1] == level2) and (not key[2] or key[2] == level3):
+                rows.extend(output)
+        return rows
+
+    def restore_level1(self, date, level1):
+        """续采前整理一级类目：删除未完成类目已写出的部分数据（它们会重新采集），返回已完成类目的数据"""
+        done = self._done_paths(date, level1)
+        kept, stale = [], []
+        for seq, level2, level3, output in self._outputs(date, level1):
+            if self._covered((level1, level2, level3), done):
+                kept.extend(output)
+            else:
+                stale.append((seq,))
+        if stale:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM outputs WHERE seq = ?", stale)
+        return kept
+
+    def reset(self, date, level1):
+        """重新采集一级类目前清空其记录"""
+        for table in ("pages", "outputs", "done"):
+            self._execute(f"DELETE FROM {table} WHERE stat_date = ? AND level1 = ?", (date, level1))
+
+
+def plan_task_costs(tasks, model, default_seconds=DEFAULT_TASK_SECONDS):
+    """预测每个任务单元的耗时：无历史的任务取有历史任务的中位数，全部无历史时取default_seconds"""
+    estimates = []
+    for task in tasks:
+        cats = [task['level1'], task.get('level2'), task.get('level3')]
+        cats = [cat for cat in cats if cat]
+        estimates.append(model.estimate(cats, cats[-1].get('children') or ()))
+    known = sorted(value for value in estimates if value is not None)
+    fill = known[len(known) // 2] if known else default_seconds
+    return [fill if value is None else value for value in estimates]
+
+
+def lpt_schedule(costs, workers):
+    """最长处理时间优先（LPT）：按预测耗时从大到小依次交给当前负载最小的窗口
+
+    返回(领取顺序, 各窗口预测负载, 各窗口分到的任务下标)。共享队列按领取顺序排队时，各窗口自行领取的结果与此一致。
+    """
+    order = sorted(range(len(costs)), key=lambda i: -costs[i])
+    loads = [0.0] * max(1, workers)
+    assigned = [[] for _ in loads]
+    for i in order:
+        worker = min(range(len(loads)), key=loads.__getitem__)
+        loads[worker] += costs[i]
+        assigned[worker].append(i)
+    return order, loads, assigned
+
+
+def format_schedule_forecast(tasks, costs, loads, assigned):
+    """预估各窗口用时的文本：对比按数量平均切分一级类目（原有方式）的预计总耗时"""
+    lines = [f"按历史耗时预估（{len(tasks)}个任务单元，{len(loads)}个窗口）："]
+    for worker, (load, indices) in enumerate(zip(loads, assigned)):
+        lines.append(f"  窗口{worker + 1}: {len(indices)}个任务，预计 {load / 60:.1f} 分钟")
+
+    # 原有方式：一级类目按顺序平均切分，每个窗口处理连续的若干个一级类目
+    level1_costs = {}
+    for task, cost in zip(tasks, costs):
+        level1_costs[task['level1']['index']] = level1_costs.get(task['level1']['index'], 0) + cost
+    ordered = [level1_costs[index] for index in sorted(level1_costs)]
+    base, extra = divmod(len(ordered), len(loads))
+    even_loads, start = [], 0
+    for worker in range(len(loads)):
+        length = base + (1 if worker < extra else 0)
+        even_loads.append(sum(ordered[start:start + length]))
+        start += length
+    lines.append(f"预计总耗时（最慢窗口）{max(loads) / 60:.1f} 分钟，"
+                 f"按一级类目平均切分预计 {max(even_loads) / 60:.1f} 分钟")
+    return lines
+
+
+def run_schedule_plan(args):
+    """离线输出群控分配预估：读取类目树缓存文件与采集成本历史"""
+    nodes = load_category_nodes(args.categories)
+    if args.only:
+        wanted = {int(part) for part in args.only.split(",") if part.strip()}
+        nodes = [node for node in nodes if node['index'] in wanted]
+    tasks = plan_group_tasks(nodes, split=args.windows > 1)
+    costs = plan_task_costs(tasks, CrawlCostModel(args.history))
+    _, loads, assigned = lpt_schedule(costs, args.windows)
+    for line in format_schedule_forecast(tasks, costs, loads, assigned):
+        print(line)
+
+
+class HttpRankCrawler:
+    """无浏览器抓取rank.json：复用Cookie与长连接池，按账号限制并发请求数"""
+
+    def __init__(self, cookies, base_url=SYCM_BASE_URL, concurrency=4, min_threshold=150, max_pages=6,
+                 date=None, log=print, output_format="xlsx", view_thresholds=()):
+        self.base_url = base_url.rstrip("/")
+        self.output_format = output_format
+        self.view_thresholds = list(view_thresholds)
+        self.concurrency = max(1, concurrency)
+        self.min_threshold = min_threshold
+        self.max_pages = max_pages
+        date = date or (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        self.date_range = f"{date}|{date}"
+        self.log = log
+        self.headers = {
+            "Cookie": "; ".join(f"{name}={value}" for name, value in cookies),
+            "Accept": "application/json, text/plain, */*",
+            "Referer": f"{self.base_url}/mc/free/search_rank",
+            "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                           "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
+        }
+        # 长连接池大小与并发数一致，block=True保证连接数不超过上限
+        self.pool = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=self.concurrency,
+            block=True,
+            timeout=urllib3.Timeout(connect=5, read=20),
+            retries=urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), redirect=False),
+        )
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+        self.captcha_event = threading.Event()
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.page_count = 0
+
+    def fetch_page(self, cate_id, page):
+        """请求单页数据，返回与页面内接口直取一致的结构"""
+        if self.captcha_event.is_set():
+            return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                    "error": "账号已触发验证码", "captcha": True}
+
+        params = dict(RANK_API_DEFAULT_PARAMS)
+        params.update({"cateId": cate_id, "dateRange": self.date_range, "page": page,
+                       "_": int(time.time() * 1000)})
+        with self.slots:
+            with self.stats_lock:
+                self.request_count += 1
+            try:
+                resp = self.pool.request("GET", f"{self.base_url}{RANK_API_PATH}", fields=params,
+                                         headers=self.headers)
+            except Exception as exc:  # pylint: disable=broad-except
+                return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                        "error": str(exc), "captcha": False}
+
+        location = resp.headers.get("Location", "")
+        if "captcha" in location or "punish" in location:
+            self.captcha_event.set()
+            return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                    "error": "接口返回验证码", "captcha": True}
+        if resp.status != 200:
+            return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                    "error": f"HTTP {resp.status}", "captcha": False}
+        try:
+            payload = json.loads(resp.data.decode("utf-8"))
+        except ValueError:
+            return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                    "error": "响应不是JSON（Cookie可能已失效）", "captcha": False}
+        if isinstance(payload, dict) and payload.get("rgv587_flag"):
+            self.captcha_event.set()
+            return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                    "error": "接口返回验证码", "captcha": True}
+
+        parsed = parse_rank_payload(payload, self.min_threshold)
+        if parsed is None:
+            return {"page": page, "rows": [], "foundLowValue": False, "total": None,
+                    "error": "接口返回结构无法识别", "captcha": False}
+        rows, found_low_value, total = parsed
+        with self.stats_lock:
+            self.page_count += 1
+        return {"page": page, "rows": rows, "foundLowValue": found_low_value, "total": total,
+                "error": None, "captcha": False}
+
+    def last_page_number(self, total):
+        if not total:
+            return 1
+        return max(1, math.ceil(total / RANK_API_DEFAULT_PARAMS["pageSize"]))
+
+    def collect_pages(self, cate_id, first_page=None):
+        """与collect_data_across_pages一致：从第一页起最多max_pages页，遇到低于阈值的数据即停止"""
+        collected = []
+        for page in range(1, self.max_pages + 1):
+            result = first_page if (page == 1 and first_page is not None) else self.fetch_page(cate_id, page)
+            if result["error"]:
+                raise RuntimeError(f"类目{cate_id}第{page}页请求失败: {result['error']}")
+            if not result["rows"]:
+                break
+            collected.extend(split_rows_by_threshold(result["rows"], self.min_threshold)[0])
+            if result["foundLowValue"]:
+                break
+            if page >= self.last_page_number(result["total"]):
+                break
+        return collected
+
+    def crawl_level2(self, node):
+        """与process_secondary_with_tertiary一致的二级类目处理逻辑"""
+        if not node["children"]:
+            return self.collect_pages(node["cate_id"])
+
+        first = self.fetch_page(node["cate_id"], 1)
+        if first["error"]:
+            raise RuntimeError(f"类目{node['name']}请求失败: {first['error']}")
+        if not first["rows"]:
+            return []
+        if first["foundLowValue"]:
+            # 第一页已有低于阈值的数据：仅保存第一页
+            return split_rows_by_threshold(first["rows"], self.min_threshold)[0]
+
+        last_page = self.last_page_number(first["total"])
+        last = first if last_page == 1 else self.fetch_page(node["cate_id"], last_page)
+        if last["error"]:
+            raise RuntimeError(f"类目{node['name']}请求失败: {last['error']}")
+        if last["foundLowValue"]:
+            return self.collect_pages(node["cate_id"], first_page=first)
+
+        rows = []
+        for child in node["children"]:
+            rows.extend(self.collect_pages(child["cate_id"]))
+        return rows
+
+    def run(self, level1_nodes, output_dir):
+        """并发抓取所有一级类目，按一级类目汇总输出{序号}_{名称}（扩展名取决于输出格式）"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        os.makedirs(output_dir, exist_ok=True)
+        started = time.time()
+        summary = {"files": [], "failed": []}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            jobs = []
+            for level1 in level1_nodes:
+                units = level1["children"] or [dict(level1, children=[])]
+                jobs.append((level1, [executor.submit(self.crawl_level2, unit) for unit in units]))
+
+            for level1, futures in jobs:
+                rows = []
+                try:
+                    for future in futures:
+                        rows.extend(future.result())
+                except Exception as exc:  # pylint: disable=broad-except
+                    self.log(f"一级类目 {level1['index']}_{level1['name']} 抓取失败: {exc}")
+                    summary["failed"].append(level1)
+                    continue
+                excel_path = os.path.join(output_dir, f"{level1['index']}_{sanitize_filename(level1['name'])}"
+                                                      f"{RESULT_SINKS[self.output_format].extension}")
+                write_result_file(excel_path, self.output_format, rows, self.view_thresholds)
+                summary["files"].append(excel_path)
+                self.log(f"已输出 {excel_path}（{len(rows)}条）")
+
+        elapsed = time.time() - started
+        self.log(f"HTTP抓取完成：{len(summary['files'])}个文件，{self.page_count}页/{self.request_count}次请求，"
+                 f"耗时{elapsed:.1f}秒")
+        if self.captcha_event.is_set():
+            self.log("账号触发验证码，请在浏览器中完成验证并重新导出Cookie后重试失败的类目")
+        return summary
+
+
+def run_http_crawl(args):
+    cookies = read_cookie_pairs(args.cookie)
+    if not cookies:
+        print("Cookie文件无有效内容")
+        return
+    nodes = load_category_nodes(args.categories)
+    if args.only:
+        wanted = {int(item) for item in args.only.split(",") if item.strip()}
+        nodes = [node for node in nodes if int(node["index"]) in wanted]
+
+    def log(message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+    thresholds = parse_thresholds(args.thresholds) if args.thresholds else [args.threshold]
+    crawler = HttpRankCrawler(cookies, base_url=args.base_url or SYCM_BASE_URL, concurrency=args.concurrency,
+                              min_threshold=thresholds[0], max_pages=args.max_pages, date=args.date, log=log,
+                              output_format=args.format, view_thresholds=thresholds[1:])
+    crawler.run(nodes, args.out)
+
+
+# ===== 本地桩服务器（离线调试接口直取等模式） =====
+STUB_PAGE_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>search_rank stub</title>
+<style>
+.tree-menu { display: inline-block; vertical-align: top; width: 220px; height: 320px; overflow-y: auto; margin: 0 8px; }
+.tree-item { cursor: pointer; padding: 0 4px; line-height: 24px; box-sizing: border-box; overflow: hidden; white-space: nowrap; }
+.tree-spacer { list-style: none; }
+.ant-pagination li { display: inline-block; margin: 0 4px; cursor: pointer; }
+.ant-pagination-item-active { font-weight: bold; }
+.ant-pagination-disabled { color: #bbb; }
+</style></head>
+<body>
+<div class="oui-pro-common-picker isready">
+  <ul class="tree-menu common-menu tree-scroll-menu-level-1"></ul>
+  <ul class="tree-menu common-menu tree-scroll-menu-level-2"></ul>
+  <ul class="tree-menu common-menu tree-scroll-menu-level-3"></ul>
+</div>
+<div class="ant-select-sm oui-select oui-page-size-select ant-select ant-select-enabled">
+  <span>page size</span>
+  <ul class="size-options" style="display:none"><li>10</li><li>20</li><li>50</li></ul>
+</div>
+<table><tbody id="rows"></tbody></table>
+<ul class="ant-pagination" id="pager"></ul>
+<script>
+var state = {tree: [], pageSize: 10, page: 1, total: 0};
+var query = new URLSearchParams(location.search);
+
+function setCate(node) {
+    query.set('cateId', node.id);
+    query.set('parentCateId', node.parent_id || 0);
+    history.replaceState(null, '', location.pathname + '?' + query.toString());
+    loadPage(1);
+}
+
+// 超长列表按虚拟列表渲染：只渲染可视区附近的条目，滚到已加载末尾时延迟追加下一批（模拟懒加载）
+var ITEM_HEIGHT = 24;
+var LAZY_BATCH = 60;
+var lazyLists = {};
+
+function renderVirtual(level) {
+    var list = lazyLists[level];
+    var ul = document.querySelector('ul.tree-scroll-menu-level-' + level);
+    var first = Math.max(0, Math.floor(ul.scrollTop / ITEM_HEIGHT) - 5);
+    var last = Math.min(list.loaded, first + Math.ceil(ul.clientHeight / ITEM_HEIGHT) + 10);
+    var top = document.createElement('li');
+    top.className = 'tree-spacer';
+    top.style.height = (first * ITEM_HEIGHT) + 'px';
+    var bottom = document.createElement('li');
+    bottom.className = 'tree-spacer';
+    bottom.style.height = ((list.loaded - last) * ITEM_HEIGHT) + 'px';
+    ul.innerHTML = '';
+    ul.appendChild(top);
+    list.nodes.slice(first, last).forEach(function (node) {
+        ul.appendChild(makeItem(level, node));
+    });
+    ul.appendChild(bottom);
+    if (list.loaded < list.nodes.length && last >= list.loaded && !list.pending) {
+        list.pending = true;
+        setTimeout(function () {
+            list.pending = false;
+            list.loaded = Math.min(list.nodes.length, list.loaded + LAZY_BATCH);
+            renderVirtual(level);
+        }, 150);
+    }
+}
+
+function renderLevel(level, nodes) {
+    var ul = document.querySelector('ul.tree-scroll-menu-level-' + level);
+    ul.innerHTML = '';
+    ul.onscroll = null;
+    if (nodes.length > LAZY_BATCH) {
+        lazyLists[level] = {nodes: nodes, loaded: LAZY_BATCH, pending: false};
+        ul.scrollTop = 0;
+        ul.onscroll = function () { renderVirtual(level); };
+        renderVirtual(level);
+        return;
+    }
+    nodes.forEach(function (node) {
+        ul.appendChild(makeItem(level, node));
+    });
+}
+
+function makeItem(level, node) {
+    var li = document.createElement('li');
+    li.className = 'tree-item common-item';
+    li.style.height = ITEM_HEIGHT + 'px';
+    li.setAttribute('title', node.name);
+    li.setAttribute('data-cate-id', node.id);
+    li.setAttribute('data-parent-id', node.parent_id || 0);
+    li.textContent = node.name;
+    if (level === 2 && node.children && node.children.length) {
+        var icon = document.createElement('i');
+        icon.className = 'anticon anticon-angle-right oui-canary-icon oui-canary-icon-angle-right sub-tree-icon sub-common-icon';
+        li.appendChild(icon);
+    }
+    li.addEventListener('click', function () {
+        if (level < 3) {
+            renderLevel(level + 1, node.children || []);
+        }
+        if (level === 1) {
+            renderLevel(3, []);
+        }
+        setCate(node);
+    });
+    return li;
+}
+
+function renderRows(records) {
+    var body = document.getElementById('rows');
+    body.innerHTML = '';
+    records.forEach(function (record, i) {
+        var tr = document.createElement('tr');
+        tr.className = 'ant-table-row oui-table-row-tree-node-' + (i + 1) + ' ant-table-row-level-0';
+        tr.innerHTML = '<td>' + ((state.page - 1) * state.pageSize + i + 1) + '</td><td></td>' +
+            '<td><div class="alife-dt-card-common-table-sortable-value"><span></span></div></td>';
+        tr.children[1].textContent = record.searchWord;
+        tr.querySelector('span').textContent = record.seIpvUvHits;
+        body.appendChild(tr);
+    });
+}
+
+function renderPager() {
+    var pager = document.getElementById('pager');
+    var maxPage = Math.max(1, Math.ceil(state.total / state.pageSize));
+    pager.innerHTML = '';
+    for (var p = 1; p <= maxPage; p++) {
+        var li = document.createElement('li');
+        li.className = 'ant-pagination-item' + (p === state.page ? ' ant-pagination-item-active' : '');
+        li.textContent = p;
+        li.addEventListener('click', (function (target) { return function () { loadPage(target); }; })(p));
+        pager.appendChild(li);
+    }
+    var next = document.createElement('li');
+    next.className = 'ant-pagination-next' + (state.page >= maxPage ? ' ant-pagination-disabled' : '');
+    next.innerHTML = '<a>&gt;</a>';
+    next.addEventListener('click', function () {
+        if (state.page < maxPage) {
+            loadPage(state.page + 1);
+        }
+    });
+    pager.appendChild(next);
+}
+
+function loadPage(page) {
+    var params = new URLSearchParams(query.toString());
+    params.set('page', page);
+    params.set('pageSize', state.pageSize);
+    fetch('RANK_API_PATH?' + params.toString()).then(function (r) { return r.json(); }).then(function (json) {
+        state.page = page;
+        state.total = json.data.recordCount;
+        // 模拟真实页面的异步渲染延迟
+        setTimeout(function () {
+            renderRows(json.data.data);
+            renderPager();
+        }, 150 + Math.random() * 250);
+    });
+}
+
+document.querySelector('.oui-page-size-select').addEventListener('click', function () {
+    this.querySelector('.size-options').style.display = 'block';
+});
+document.querySelectorAll('.size-options li').forEach(function (li) {
+    li.addEventListener('click', function (event) {
+        event.stopPropagation();
+        state.pageSize = parseInt(li.textContent, 10);
+        li.parentNode.style.display = 'none';
+        document.querySelector('.oui-page-size-select > span').textContent = li.textContent + ' 条/页';
+        loadPage(1);
+    });
+});
+
+fetch('/stub/tree.json').then(function (r) { return r.json(); }).then(function (tree) {
+    state.tree = tree;
+    renderLevel(1, tree);
+    loadPage(1);
+});
+</script>
+</body></html>
+""".replace("RANK_API_PATH", RANK_API_PATH)
+
+
+def _format_stub_popularity(value):
+    """按生意参谋页面的展示习惯格式化搜索人气"""
+    if value >= 100000:
+        low = int(value // 10000)
+        return f"{low}万 ~ {low + 1}万"
+    if value >= 10000:
+        return f"{value / 10000:.1f}万"
+    return str(int(value))
+
+
+def build_stub_dataset(seed=20240101, level1_count=8, large_level3_count=320):
+    """生成确定性的类目树与按类目的搜索词数据（人气降序）
+
+    第一个一级类目下额外附带一个拥有large_level3_count个三级类目的二级类目，页面中按虚拟列表懒加载渲染。
+    """
+    rng = random.Random(seed)
+    tree = []
+    rows = {}
+    next_id = 1000
+
+    def add_rows(cate_id):
+        count = rng.randint(20, 320)
+        top = rng.uniform(2000, 300000)
+        decay = rng.uniform(0.92, 0.995)
+        rows[str(cate_id)] = [
+            {"searchWord": f"词{cate_id}_{i + 1}", "seIpvUvHits": _format_stub_popularity(max(1.0, top * decay ** i))}
+            for i in range(count)
+        ]
+
+    for i in range(level1_count):
+        level1 = {"id": next_id, "parent_id": 0, "name": f"一级类目{i + 1}", "children": []}
+        next_id += 1
+        add_rows(level1["id"])
+        for j in range(rng.randint(3, 6)):
+            level2 = {"id": next_id, "parent_id": level1["id"], "name": f"{level1['name']}-二级{j + 1}", "children": []}
+            next_id += 1
+            add_rows(level2["id"])
+            if rng.random() < 0.5:
+                for k in range(rng.randint(3, 8)):
+                    level3 = {"id": next_id, "parent_id": level2["id"],
+                              "name": f"{level2['name']}-三级{k + 1}", "children": []}
+                    next_id += 1
+                    add_rows(level3["id"])
+                    level2["children"].append(level3)
+            level1["children"].append(level2)
+        tree.append(level1)
+
+    if tree and large_level3_count:
+        level1 = tree[0]
+        level2 = {"id": next_id, "parent_id": level1["id"], "name": f"{level1['name']}-超长三级列表", "children": []}
+        next_id += 1
+        add_rows(level2["id"])
+        for k in range(large_level3_count):
+            level3 = {"id": next_id, "parent_id": level2["id"], "name": f"{level2['name']}-三级{k + 1}", "children": []}
+            next_id += 1
+            add_rows(level3["id"])
+            level2["children"].append(level3)
+        level1["children"].append(level2)
+    return tree, rows
+
+
+class RankStubServer:
+    """本地rank.json桩服务器：提供录制或合成的接口数据及简化的搜索排行页面"""
+
+    def __init__(self, host="127.0.0.1", port=8765, record_path=None, seed=20240101):
+        self.tree, self.rows = build_stub_dataset(seed)
+        if record_path:
+            with open(record_path, "r", encoding="utf-8") as f:
+                recorded = json.load(f)
+            # 录制文件格式：{cateId: [接口原始记录, ...]}
+            for cate_id, records in recorded.items():
+                self.rows[str(cate_id)] = records
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def rank_payload(self, params):
+        """按查询参数生成与线上结构一致的rank.json响应"""
+        cate_id = (params.get("cateId") or [""])[0]
+        records = self.rows.get(cate_id)
+        if records is None:
+            records = next(iter(self.rows.values()), [])
+        try:
+            page = max(1, int((params.get("page") or ["1"])[0]))
+            page_size = max(1, int((params.get("pageSize") or ["50"])[0]))
+        except ValueError:
+            page, page_size = 1, 50
+        start = (page - 1) * page_size
+        return {
+            "code": 0,
+            "message": "操作成功",
+            "data": {"data": records[start:start + page_size], "recordCount": len(records)},
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body, content_type):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+                self.send_header("Access-Control-Allow-Credentials", "true")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                server.request_count += 1
+                if parsed.path == RANK_API_PATH:
+                    self._send(200, json.dumps(server.rank_payload(params), ensure_ascii=False),
+                               "application/json; charset=utf-8")
+                elif parsed.path == "/stub/tree.json":
+                    self._send(200, json.dumps(server.tree, ensure_ascii=False), "application/json; charset=utf-8")
+                elif parsed.path in ("/", "/mc/free/search_rank"):
+                    self._send(200, STUB_PAGE_HTML, "text/html; charset=utf-8")
+                else:
+                    self._send(404, "not found", "text/plain; charset=utf-8")
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        return Handler
+
+    def start(self):
+        """后台线程启动服务，返回自身便于链式调用"""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def run_stub_server(args):
+    server = RankStubServer(args.host, args.port, args.record)
+    print(f"桩服务器已启动: {server.base_url}")
+    print(f"使用 --base-url {server.base_url} 启动工具即可离线调试")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+# ===== 基准测试 =====
+class WindowedPaginator:
+    """基准测试用的模拟分页表格：人气降序；与ant分页器一样，页数较多时只渲染第一页、最后一页和当前页附近的页码"""
+
+    def __init__(self, popularity, page_size=50, threshold=150, window=2):
+        self.popularity = popularity
+        self.page_size = page_size
+        self.threshold = threshold
+        self.window = window
+        self.current_page = 1
+        self.extractions = 0
+        self.page_clicks = 0
+        self.next_clicks = 0
+
+    @property
+    def last_page(self):
+        return max(1, math.ceil(len(self.popularity) / self.page_size))
+
+    def rendered_pages(self):
+        """当前渲染出的页码按钮"""
+        last = self.last_page
+        if last <= 5 + 2 * self.window:
+            return set(range(1, last + 1))
+        lo = max(1, min(self.current_page - self.window, last - 2 * self.window))
+        hi = min(last, max(self.current_page + self.window, 1 + 2 * self.window))
+        return {1, last, *range(lo, hi + 1)}
+
+    def click(self, page):
+        if page not in self.rendered_pages():
+            return False
+        if page != self.current_page:
+            self.page_clicks += 1
+            self.current_page = page
+        return True
+
+    def next(self):
+        if self.current_page >= self.last_page:
+            return False
+        self.next_clicks += 1
+        self.current_page += 1
+        return True
+
+    def rows(self, page):
+        start = (page - 1) * self.page_size
+        values = self.popularity[start:start + self.page_size]
+        rows = [{"keyword": f"w{start + i}", "search_popularity": v, "popularity_text": str(v)}
+                for i, v in enumerate(values)]
+        return rows, any(v < self.threshold for v in values)
+
+    def extract(self):
+        self.extractions += 1
+        return self.rows(self.current_page)
+
+    def expected(self, max_pages):
+        """应得的(决策, 关键词, 必需提取的页)：收集截止页（含）之前所有达到阈值的数据，
+        必需的页为第一页、第一页无低价值数据时用于判断的最后一页，以及收集范围内的页"""
+        rows, found_low_value = self.rows(1)
+        if not rows:
+            return "empty", [], {1}
+        needed = {1}
+        if not found_low_value:
+            needed.add(self.last_page)
+            if not self.rows(self.last_page)[1]:
+                return "descend", [], needed
+        keywords = []
+        for page in range(1, min(self.last_page, max_pages) + 1):
+            needed.add(page)
+            rows, found_low_value = self.rows(page)
+            keywords.extend(row["keyword"] for row in rows if row["search_popularity"] >= self.threshold)
+            if found_low_value:
+                break
+        return "collect", keywords, needed
+
+
+class CutoffBenchHost:
+    """基准测试宿主：直接调用CategoryAutoExtractor的截止页判断、收集、取页与跳转方法，浏览器操作由模拟分页器完成"""
+
+    locate_secondary_cutoff = CategoryAutoExtractor.locate_secondary_cutoff
+    collect_located_pages = CategoryAutoExtractor.collect_located_pages
+    get_page_data = CategoryAutoExtractor.get_page_data
+    _goto_page = CategoryAutoExtractor._goto_page
+    _journal_key = CategoryAutoExtractor._journal_key
+    _command_count = CategoryAutoExtractor._command_count
+
+    def __init__(self, paginator, journal, name, threshold, max_pages):
+        self.paginator = paginator
+        self.crawl_journal = journal
+        self.min_popularity_threshold = threshold
+        self.max_pages = max_pages
+        self.browser = None
+        self.stop_event = threading.Event()
+        self.state = BrowserSessionState(session_id=0, port=0, profile_path="")
+        self.state.category_path = ((1, name), None, None)
+        self.collected = []
+
+    def _get_active_state(self):
+        return self.state
+
+    def log_ui(self, message):
+        pass
+
+    log_console = log_ui
+
+    def check_pause_state(self):
+        return True
+
+    def get_yesterday_date(self):
+        return "bench"
+
+    def get_max_page_number(self):
+        return self.paginator.last_page
+
+    def click_page_number(self, page_num):
+        if not self.paginator.click(page_num):
+            return False
+        self.state.current_page = page_num
+        return True
+
+    def click_next_page(self):
+        if not self.paginator.next():
+            return False
+        self.state.current_page += 1
+        return True
+
+    def extract_data_from_page(self):
+        return self.paginator.extract()
+
+    def _append_collected_data(self, page_data, page=None):
+        self.collected.extend(row["keyword"] for row in page_data)
+
+    def _record_journal(self, write, *args):
+        write(*args)
+
+
+def run_cutoff_benchmark(args):
+    """用只渲染部分页码的模拟分页器驱动实际的locate_secondary_cutoff/collect_located_pages，
+    统计页面提取、翻页点击与多余提取（既不是决策所需、也不在收集范围内的页）"""
+    rng = random.Random(args.seed)
+    journal = CrawlJournal(":memory:")
+    per_decision = {}
+    failures = mismatches = 0
+    for n in range(args.categories):
+        count = 0 if rng.random() < 0.05 else rng.randint(1, 1200)
+        top = rng.uniform(100, 400000)
+        decay = rng.uniform(0.95, 0.9995)
+        popularity = [round(top * decay ** i, 1) for i in range(count)]
+
+        paginator = WindowedPaginator(popularity, threshold=args.threshold)
+        host = CutoffBenchHost(paginator, journal, f"类目{n}", args.threshold, args.max_pages)
+        expected_decision, expected_keywords, needed = paginator.expected(args.max_pages)
+        try:
+            decision, pages = host.locate_secondary_cutoff()
+            if decision == "collect":
+                host.collect_located_pages(pages)
+        except PageNavigationError:
+            failures += 1
+            continue
+        if decision != expected_decision or host.collected != expected_keywords:
+            mismatches += 1
+
+        bucket = per_decision.setdefault(decision, [0, 0, 0, 0, 0])
+        bucket[0] += 1
+        bucket[1] += paginator.extractions
+        bucket[2] += paginator.extractions - len(needed)
+        bucket[3] += paginator.page_clicks
+        bucket[4] += paginator.next_clicks
+
+    n = max(1, args.categories)
+    print(f"模拟类目数: {args.categories}，阈值: {args.threshold}，最多页数: {args.max_pages}")
+    totals = [sum(bucket[i] for bucket in per_decision.values()) for i in range(5)]
+    print(f"平均每类目 提取 {totals[1] / n:.2f} 页（多余 {totals[2] / n:.2f} 页），"
+          f"点击页码 {totals[3] / n:.2f} 次，点击下一页 {totals[4] / n:.2f} 次")
+    for decision, (count, extractions, wasted, page_clicks, next_clicks) in sorted(per_decision.items()):
+        print(f"  {decision:8s} {count:6d} 个类目，每类目提取 {extractions / count:.2f} 页（多余 {wasted / count:.2f} 页），"
+              f"点击页码 {page_clicks / count:.2f} 次，点击下一页 {next_clicks / count:.2f} 次")
+    print(f"跳转失败 {failures} 个类目，结果与逐页采集不一致 {mismatches} 个类目")
+
+
+def legacy_append_page(excel_path, rows):
+    """原有备用写入方式：每页加载整个表格、追加后整表保存（用于基准对比）"""
+    wb = openpyxl.load_workbook(excel_path)
+    ws = wb["生意参谋"]
+    start_row = ws.max_row + 1
+    for i, item in enumerate(rows):
+        ws.cell(row=start_row + i, column=1, value=item['keyword'])
+        ws.cell(row=start_row + i, column=2, value=item['popularity_text'])
+    wb.save(excel_path)
+
+
+def run_writer_benchmark(args):
+    """对比每页写入耗时随已写行数的变化：流式中转写入应保持平稳，原方式随表格增大线性增长"""
+    rng = random.Random(args.seed)
+
+    def page_rows(page):
+        return [{"keyword": f"关键词{page}_{i}", "popularity_text": f"{rng.randint(150, 90000):,}"}
+                for i in range(args.page_size)]
+
+    def measure(append, total_rows, path):
+        write_keyword_workbook(path, [])
+        samples = []
+        written = 0
+        page = 0
+        while written < total_rows:
+            rows = page_rows(page)
+            started = time.perf_counter()
+            append(rows)
+            samples.append((written + len(rows), time.perf_counter() - started))
+            written += len(rows)
+            page += 1
+        return samples
+
+    def report(name, samples, buckets=10):
+        print(name)
+        size = max(1, len(samples) // buckets)
+        for start in range(0, len(samples), size):
+            chunk = samples[start:start + size]
+            avg = sum(cost for _, cost in chunk) / len(chunk)
+            print(f"  已写 {chunk[-1][0]:>7d} 行  平均每页 {avg * 1000:8.2f} ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stream_path = os.path.join(workdir, "stream.xlsx")
+        writer = StreamingXlsxWriter(stream_path)
+        samples = measure(writer.append, args.rows, stream_path)
+        started = time.perf_counter()
+        count = writer.commit()
+        commit_cost = time.perf_counter() - started
+        report(f"流式写入（每页 {args.page_size} 行，共 {args.rows} 行）", samples)
+        print(f"  提交生成xlsx：{count} 行，耗时 {commit_cost:.2f} 秒")
+
+        if args.legacy_rows:
+            legacy_path = os.path.join(workdir, "legacy.xlsx")
+            samples = measure(lambda rows: legacy_append_page(legacy_path, rows), args.legacy_rows, legacy_path)
+            report(f"原方式（每页加载并保存整个表格，共 {args.legacy_rows} 行）", samples)
+
+
+def run_parser_benchmark(args):
+    """搜索人气解析的微基准：逐条不缓存、逐条缓存与批量换算的每条耗时（文本分布按页面展示习惯生成，区间档位大量重复）"""
+    rng = random.Random(args.seed)
+    texts = []
+    for _ in range(args.rows):
+        roll = rng.random()
+        if roll < 0.01:
+            texts.append(rng.choice(["", "-", "--", "1万 ~", "暂无数据"]))
+        elif roll < 0.02:
+            texts.append(f"{rng.randint(1, 30) / 10}亿")
+        else:
+            texts.append(_format_stub_popularity(rng.paretovariate(1.1) * 100))
+    print(f"共 {len(texts)} 条，不同文本 {len(set(texts))} 种")
+
+    def measure(name, func):
+        started = time.perf_counter()
+        result = func()
+        cost = time.perf_counter() - started
+        print(f"  {name:<12s} 总耗时 {cost * 1000:8.1f} ms  每条 {cost / len(texts) * 1e9:7.0f} ns")
+        return result
+
+    uncached = parse_popularity_text.__wrapped__
+    measure("逐条不缓存", lambda: [uncached(text) for text in texts])
+    parse_popularity_text.cache_clear()
+    measure("逐条缓存", lambda: [parse_popularity_text(text) for text in texts])
+    info = parse_popularity_text.cache_info()
+    print(f"  缓存命中 {info.hits}，未命中 {info.misses}（命中率 {info.hits / max(1, info.hits + info.misses):.1%}）")
+    columns = measure("批量换算", lambda: parse_popularity_batch(texts))
+    kept = measure("阈值筛选", lambda: columns.at_least(args.threshold))
+    print(f"  无法解析 {columns.invalid} 条，达到阈值 {args.threshold:g} 的 {len(kept)} 条；"
+          f"数值列占用 {sum(col.itemsize * len(col) for col in (columns.low, columns.high, columns.mid)) / 1e6:.1f} MB")
+
+
+def run_rowstore_benchmark(args):
+    """对比数据行的内存占用与筛选、输出耗时：原有行字典列表与紧凑行存储（内存含字符串与数值对象本身）"""
+    chars = "的一是在不了有人这中大为上个我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学"
+
+    def generate():
+        rng = random.Random(args.seed)
+        for _ in range(args.rows):
+            keyword = "".join(rng.choices(chars, k=rng.randint(3, 10)))
+            value = rng.paretovariate(1.1) * 100
+            # 与页面提取一致：每行的文本都是独立的字符串对象
+            yield {"keyword": keyword, "search_popularity": value, "popularity_text": _format_stub_popularity(value)}
+
+    def measure(name, build):
+        started = time.perf_counter()
+        rows = build()
+        elapsed = time.perf_counter() - started
+        size = row_storage_footprint(rows)
+        print(f"  {name:<10s} 内存 {size / 1e6:8.1f} MB（每行 {size / args.rows:6.1f} 字节），构建 {elapsed:.1f} 秒")
+        started = time.perf_counter()
+        kept, _ = split_rows_by_threshold(rows, args.threshold)
+        filter_cost = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in iter_row_fields(rows):
+            pass
+        print(f"  {'':<10s} 阈值筛选 {filter_cost * 1000:.0f} ms（保留 {len(kept)} 行），"
+              f"逐行读取 {(time.perf_counter() - started) * 1000:.0f} ms")
+        return size
+
+    print(f"共 {args.rows} 行")
+    dict_size = measure("行字典列表", lambda: list(generate()))
+    store_size = measure("紧凑行存储", lambda: RowStore(generate()))
+    print(f"  紧凑行存储占用为行字典列表的 {store_size / dict_size:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生意参谋关键词获取工具")
+    parser.add_argument("--base-url", default=None, help="站点地址，可指向本地桩服务器")
+    parser.add_argument("--debug", action="count", default=0, help="输出页面提取的逐行调试日志")
+    subparsers = parser.add_subparsers(dest="command")
+
+    stub_parser = subparsers.add_parser("stub-server", help="启动本地rank.json桩服务器")
+    stub_parser.add_argument("--host", default="127.0.0.1")
+    stub_parser.add_argument("--port", type=int, default=8765)
+    stub_parser.add_argument("--record", default=None, help="录制的接口数据JSON：{cateId: [记录, ...]}")
+
+    http_parser = subparsers.add_parser("http-crawl", help="不启动浏览器，使用cookie.txt直接抓取rank.json")
+    # 默认SUPPRESS：子命令未给出时保留写在子命令之前的全局--base-url
+    http_parser.add_argument("--base-url", default=argparse.SUPPRESS, help="站点地址，可指向本地桩服务器")
+    http_parser.add_argument("--cookie", default="cookie.txt", help="Cookie文件（保存Cookie功能导出的格式）")
+    http_parser.add_argument("--categories", required=True, help="类目文件：JSON节点列表或\"序号,cateId,名称\"文本")
+    http_parser.add_argument("--only", default="", help="仅抓取指定序号，逗号分隔")
+    http_parser.add_argument("--out", default=".", help="输出目录")
+    http_parser.add_argument("--concurrency", type=int, default=4, help="单账号最大并发请求数")
+    http_parser.add_argument("--threshold", type=float, default=150, help="搜索人气阈值")
+    http_parser.add_argument("--max-pages", type=int, default=6, help="每个类目最多抓取页数")
+    http_parser.add_argument("--date", default=None, help="统计日期YYYY-MM-DD，默认昨天")
+    http_parser.add_argument("--format", default="xlsx", choices=ROW_OUTPUT_FORMATS, help="输出格式")
+    http_parser.add_argument("--thresholds", default="", help="多阈值，逗号分隔：按最低阈值抓取，其余阈值另存筛选文件（最低阈值结果的本地筛选）")
+
+    archive_parser = subparsers.add_parser("parse-archive", help="用进程池批量解析原始页面存档，输出结果文件")
+    archive_parser.add_argument("paths", nargs="+", help="存档文件（*.capture.jsonl.gz）或所在目录")
+    archive_parser.add_argument("--out", default=".", help="输出目录")
+    archive_parser.add_argument("--format", default="xlsx", choices=ROW_OUTPUT_FORMATS, help="输出格式")
+    archive_parser.add_argument("--threshold", type=float, default=150, help="搜索人气阈值")
+    archive_parser.add_argument("--thresholds", default="", help="多阈值，逗号分隔：根据最低阈值解析，其余阈值另存筛选文件（最低阈值结果的本地筛选）")
+    archive_parser.add_argument("--workers", type=int, default=0, help="进程数，默认为CPU核数")
+
+    bench_parser = subparsers.add_parser("bench-cutoff", help="基准测试：截止页判断与收集流程在分页页码部分渲染时的页面提取与翻页次数")
+    bench_parser.add_argument("--categories", type=int, default=2000)
+    bench_parser.add_argument("--seed", type=int, default=1)
+    bench_parser.add_argument("--threshold", type=float, default=150)
+    bench_parser.add_argument("--max-pages", type=int, default=6)
+
+    plan_parser = subparsers.add_parser("plan", help="按采集成本历史预估群控各窗口用时（不启动浏览器）")
+    plan_parser.add_argument("--categories", required=True, help="类目文件（可直接使用category_cache中的类目树缓存）")
+    plan_parser.add_argument("--history", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "category_cache", "crawl_costs.json"),
+                             help="采集成本历史文件")
+    plan_parser.add_argument("--windows", type=int, default=1, help="窗口数")
+    plan_parser.add_argument("--only", default="", help="仅预估指定的一级类目序号，逗号分隔")
+
+    writer_bench_parser = subparsers.add_parser("bench-writer", help="基准测试：备用写入方式每页耗时随表格增大的变化")
+    writer_bench_parser.add_argument("--rows", type=int, default=100000)
+    writer_bench_parser.add_argument("--legacy-rows", type=int, default=5000, help="原方式写入的行数（0为不测）")
+    writer_bench_parser.add_argument("--page-size", type=int, default=50)
+    writer_bench_parser.add_argument("--seed", type=int, default=1)
+
+    parser_bench_parser = subparsers.add_parser("bench-parser", help="基准测试：搜索人气解析（缓存与批量换算）的每条耗时")
+    parser_bench_parser.add_argument("--rows", type=int, default=1000000)
+    parser_bench_parser.add_argument("--threshold", type=float, default=150)
+    parser_bench_parser.add_argument("--seed", type=int, default=1)
+
+    store_bench_parser = subparsers.add_parser("bench-rowstore", help="基准测试：数据行存储的内存占用（行字典列表与紧凑行存储）")
+    store_bench_parser.add_argument("--rows", type=int, default=1000000)
+    store_bench_parser.add_argument("--threshold", type=float, default=150)
+    store_bench_parser.add_argument("--seed", type=int, default=1)
+
+    args = parser.parse_args(argv)
+    if args.command == "bench-rowstore":
+        run_rowstore_benchmark(args)
+        return
+    if args.command == "bench-parser":
+        run_parser_benchmark(args)
+        return
+    if args.command == "bench-writer":
+        run_writer_benchmark(args)
+        return
+    if args.command == "plan":
+        run_schedule_plan(args)
+        return
+    if args.command == "bench-cutoff":
+        run_cutoff_benchmark(args)
+        return
+    if args.command == "stub-server":
+        run_stub_server(args)
+        return
+    if args.command == "http-crawl":
+        run_http_crawl(args)
+        return
+    if args.command == "parse-archive":
+        run_parse_archive(args)
+        return
+
+    app = CategoryAutoExtractor()
+    if args.base_url:
+        app.sycm_base_url = args.base_url.rstrip("/")
+        app.log_ui(f"站点地址: {app.sycm_base_url}")
+    app.debug_level = args.debug
+    app.mainloop()
+
+
 if __name__ == "__main__":
     try:
-        app = CategoryAutoExtractor()
-        app.mainloop()
+        main()
     except Exception as e:
         print(f"程序启动失败: {str(e)}")
         traceback.print_exc()